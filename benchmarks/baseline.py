@@ -0,0 +1,86 @@
+"""
+Measurements for the benchmark suite, and their comparison with a baseline.
+
+``measure()`` times a function over several runs and reports the median wall
+time, then runs it once more to count its database queries and its peak
+Python memory use. That run is kept apart because tracing allocations and
+queries slows the code down.
+
+A baseline is a JSON file of measurements by benchmark name, written with
+``--benchmark-save`` (see ``benchmarks/conftest.py``). ``compare()`` lists
+what got worse than the baseline: wall time and memory beyond a relative
+tolerance, as they vary between runs, and any extra query at all.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+
+from mysite.query_budget import record_queries
+
+# Relative increase of wall time or memory allowed over the baseline
+DEFAULT_TOLERANCE = 0.25
+
+
+def measure(func, setup=None, repeat=5):
+    """
+    Return the median wall time of ``repeat`` calls of ``func``, and the
+    queries and peak memory of one more call. ``setup`` is called before each
+    call, outside the measurement.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        with record_queries() as log:
+            func()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'wall_seconds': statistics.median(timings),
+        'queries': len(log),
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+def format_measurement(name, measurement):
+    return (
+        f"{name}: {measurement['wall_seconds'] * 1e3:.1f}ms, "
+        f"{measurement['queries']} queries, "
+        f"{measurement['peak_memory_bytes'] / 1024 ** 2:.1f}MiB peak"
+    )
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(measurement, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Return a description of each regression of ``measurement`` from ``baseline``."""
+    regressions = []
+    if measurement['queries'] > baseline['queries']:
+        regressions.append(f"{measurement['queries']} queries, {baseline['queries']} before")
+    for key, unit, scale in (('wall_seconds', 'ms', 1e3), ('peak_memory_bytes', 'KiB', 1 / 1024)):
+        if measurement[key] > baseline[key] * (1 + tolerance):
+            regressions.append(
+                f"{key} {measurement[key] * scale:.1f}{unit}, "
+                f"{baseline[key] * scale:.1f}{unit} before"
+            )
+    return regressions
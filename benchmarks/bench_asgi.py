@@ -0,0 +1,200 @@
+"""
+Benchmark: slow clients of the lightweight endpoints under WSGI and ASGI.
+
+Sends 200 requests for ``/healthz/``, ``/robots.txt`` and ``/manifest.json``
+from clients that take 50ms to read their response, and measures:
+
+* concurrency: the time to serve every client with 4 sync workers (one
+  request at a time each, as gunicorn's sync workers do) against a single
+  ASGI event loop,
+* memory per connection: the memory held while all 200 connections are
+  open at once, with a thread per connection for WSGI (as gunicorn's
+  ``gthread`` workers do) against a coroutine per connection for ASGI.
+  Resident memory is read from ``/proc``, so this part needs Linux.
+
+Both applications run in-process, so the numbers leave out the servers'
+own overhead. Run with::
+
+    pytest benchmarks/bench_asgi.py -s
+"""
+import asyncio
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.asgi import get_asgi_application
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory
+
+PATHS = ('/healthz/', '/robots.txt', '/manifest.json')
+CLIENTS = 200
+WORKERS = 4
+SLOW_CLIENT_SECONDS = 0.05
+
+
+def get_rss():
+    """Return the resident memory of this process, in bytes."""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def get_paths():
+    return [PATHS[index % len(PATHS)] for index in range(CLIENTS)]
+
+
+def wsgi_request(handler, path, on_response):
+    status = []
+    response = handler(
+        RequestFactory().get(path).environ,
+        lambda code, headers: status.append(code),
+    )
+    body = b''.join(response)
+    on_response()
+    response.close()
+    assert status[0].startswith('200') and body
+
+
+def asgi_scope(path):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver')],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+
+
+async def asgi_request(application, path, on_response):
+    requested = False
+    status = []
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected until the application is done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif not message.get('more_body'):
+            await on_response()
+
+    await application(asgi_scope(path), receive, send)
+    assert status == [200]
+
+
+def time_wsgi():
+    handler = WSGIHandler()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        for future in [
+            executor.submit(wsgi_request, handler, path, lambda: time.sleep(SLOW_CLIENT_SECONDS))
+            for path in get_paths()
+        ]:
+            future.result()
+    return time.perf_counter() - start
+
+
+def time_asgi():
+    application = get_asgi_application()
+
+    async def run():
+        await asyncio.gather(*[
+            asgi_request(application, path, lambda: asyncio.sleep(SLOW_CLIENT_SECONDS))
+            for path in get_paths()
+        ])
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return time.perf_counter() - start
+
+
+def measure_wsgi_connections():
+    """Return the traced and resident memory held per open WSGI connection."""
+    handler = WSGIHandler()
+    all_open = threading.Barrier(CLIENTS + 1)
+    release = threading.Event()
+
+    def hold():
+        all_open.wait()
+        release.wait()
+
+    rss = get_rss()
+    tracemalloc.start()
+    threads = [
+        threading.Thread(target=wsgi_request, args=(handler, path, hold))
+        for path in get_paths()
+    ]
+    for thread in threads:
+        thread.start()
+    all_open.wait()
+    traced = tracemalloc.get_traced_memory()[0]
+    resident = get_rss() - rss
+    tracemalloc.stop()
+    release.set()
+    for thread in threads:
+        thread.join()
+    return traced / CLIENTS, resident / CLIENTS
+
+
+def measure_asgi_connections():
+    """Return the traced and resident memory held per open ASGI connection."""
+    application = get_asgi_application()
+    measured = {}
+
+    async def run():
+        open_connections = 0
+        release = asyncio.Event()
+
+        async def hold():
+            nonlocal open_connections
+            open_connections += 1
+            if open_connections == CLIENTS:
+                measured['traced'] = tracemalloc.get_traced_memory()[0]
+                measured['resident'] = get_rss()
+                release.set()
+            await release.wait()
+
+        await asyncio.gather(*[asgi_request(application, path, hold) for path in get_paths()])
+
+    rss = get_rss()
+    tracemalloc.start()
+    asyncio.run(run())
+    tracemalloc.stop()
+    return measured['traced'] / CLIENTS, (measured['resident'] - rss) / CLIENTS
+
+
+def test_slow_clients():
+    # Warm up imports, URL resolution and templates
+    time_wsgi()
+    time_asgi()
+
+    wsgi_seconds = time_wsgi()
+    asgi_seconds = time_asgi()
+    wsgi_traced, wsgi_resident = measure_wsgi_connections()
+    asgi_traced, asgi_resident = measure_asgi_connections()
+
+    print(
+        f"\n{CLIENTS} clients taking {SLOW_CLIENT_SECONDS * 1e3:.0f}ms to read a response:\n"
+        f"  WSGI, {WORKERS} sync workers: {wsgi_seconds:.2f}s, "
+        f"{CLIENTS * SLOW_CLIENT_SECONDS / wsgi_seconds:.1f} clients served at once\n"
+        f"  ASGI, one event loop: {asgi_seconds:.2f}s, "
+        f"{CLIENTS * SLOW_CLIENT_SECONDS / asgi_seconds:.1f} clients served at once\n"
+        f"Memory per open connection (Python heap / resident):\n"
+        f"  WSGI, thread per connection: "
+        f"{wsgi_traced / 1024:.1f}KiB / {wsgi_resident / 1024:.1f}KiB\n"
+        f"  ASGI, coroutine per connection: "
+        f"{asgi_traced / 1024:.1f}KiB / {asgi_resident / 1024:.1f}KiB"
+    )
+    assert asgi_seconds < wsgi_seconds
@@ -0,0 +1,92 @@
+"""
+Benchmark: autocomplete latency under concurrent search-as-you-type traffic.
+
+Indexes 5,000 landing pages, then sends every prefix of a set of queries
+(as typed one keystroke at a time) from 16 threads at once, first with an
+empty cache and then again with the suggestions cached. Reports p50 and p99
+request latency for both rounds.
+
+Run with::
+
+    pytest benchmarks/bench_autocomplete.py -s
+"""
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from wagtail.search.backends import get_search_backend
+
+from benchmarks.bench_search_backends import WORDS, create_pages, index_pages
+from search.views import AUTOCOMPLETE_MIN_LENGTH
+
+PAGE_COUNT = 5000
+CONCURRENCY = 16
+
+
+def keystrokes():
+    """Return every prefix typed while entering each query, shuffled."""
+    queries = [" ".join(pair) for pair in zip(WORDS, reversed(WORDS))]
+    prefixes = [
+        query[:length]
+        for query in queries
+        for length in range(AUTOCOMPLETE_MIN_LENGTH, len(query) + 1)
+    ]
+    random.Random(0).shuffle(prefixes)
+    return prefixes
+
+
+def send(prefixes):
+    client = Client()
+    url = reverse('search_autocomplete')
+    timings = []
+    try:
+        for prefix in prefixes:
+            start = time.perf_counter()
+            response = client.get(url, {'q': prefix})
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200
+    finally:
+        connection.close()
+    return timings
+
+
+def run_round(prefixes):
+    batches = [prefixes[i::CONCURRENCY] for i in range(CONCURRENCY)]
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        timings = [timing for batch in executor.map(send, batches) for timing in batch]
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99)]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_autocomplete_latency(settings):
+    # Room for every prefix, so the cached round measures hits rather than
+    # the default local memory cache's 300 entry limit
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+    create_pages(PAGE_COUNT)
+    index_pages(get_search_backend())
+    prefixes = keystrokes()
+
+    cache.clear()
+    cold_p50, cold_p99 = run_round(prefixes)
+    warm_p50, warm_p99 = run_round(prefixes)
+
+    print(
+        f"\n{len(prefixes)} requests from {CONCURRENCY} threads on {PAGE_COUNT} pages:\n"
+        f"  uncached p50 {cold_p50 * 1e3:.1f}ms, p99 {cold_p99 * 1e3:.1f}ms\n"
+        f"  cached   p50 {warm_p50 * 1e3:.1f}ms, p99 {warm_p99 * 1e3:.1f}ms"
+    )
+    # Timings include waiting for the GIL behind the other threads, so only
+    # compare the rounds with each other
+    assert warm_p99 < cold_p50
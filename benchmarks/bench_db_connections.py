@@ -0,0 +1,78 @@
+"""
+Benchmark: request latency with and without persistent database connections.
+
+Serves the home page 500 times through Django's WSGI handler, which closes
+or keeps the connection at the end of each request the way gunicorn workers
+do, first with ``CONN_MAX_AGE = 0`` (a new connection per request) and then
+with the configured ``CONN_MAX_AGE``. Reports p50 and p99 latency and the
+connection counts from ``mysite.db.metrics`` for both rounds.
+
+Needs PostgreSQL, as connecting to SQLite costs next to nothing. Run with::
+
+    pytest benchmarks/bench_db_connections.py -s
+"""
+import statistics
+import time
+
+import pytest
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test import RequestFactory
+
+from mysite.db import metrics
+
+REQUESTS = 500
+
+
+def serve(handler, environ):
+    status = []
+    response = handler(environ, lambda code, headers: status.append(code))
+    b''.join(response)
+    # Fires request_finished, which closes connections past their max age
+    response.close()
+    assert status[0].startswith('200')
+
+
+def run_round(conn_max_age):
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    metrics.reset_stats()
+
+    handler = WSGIHandler()
+    environ = RequestFactory().get('/').environ
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        serve(handler, dict(environ))
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.99)], metrics.get_stats()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_connection_reuse_latency():
+    if connection.vendor != 'postgresql':
+        pytest.skip("Needs PostgreSQL")
+
+    conn_max_age = settings.DATABASES['default']['CONN_MAX_AGE']
+    try:
+        results = {
+            'new connection per request': run_round(0),
+            f'CONN_MAX_AGE = {conn_max_age}': run_round(conn_max_age),
+        }
+    finally:
+        connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+
+    print(f"\n{REQUESTS} requests for the home page:")
+    for name, (p50, p99, stats) in results.items():
+        print(
+            f"  {name}: p50 {p50 * 1e3:.2f}ms, p99 {p99 * 1e3:.2f}ms, "
+            f"{stats['connections_opened']} connections opened, "
+            f"{stats['reused_checkouts']}/{stats['checkouts']} checkouts reused, "
+            f"{stats['connect_seconds'] * 1e3:.0f}ms spent connecting"
+        )
+
+    (closed_p50, _, _), (persistent_p50, _, persistent_stats) = results.values()
+    assert persistent_stats['connections_opened'] == 1
+    assert persistent_p50 < closed_p50
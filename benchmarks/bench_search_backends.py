@@ -0,0 +1,143 @@
+"""
+Benchmark: search query latency of the previous and current search settings
+on 10k and 100k landing pages.
+
+Both configurations share the index table, so the pages are indexed once
+per configuration before its queries are timed:
+
+* ``previous`` is the generic ``wagtail.search.backends.database`` backend
+  with no ``SEARCH_CONFIG``, as configured before.
+* ``current`` is the backend configured in ``mysite.settings.base``: the
+  PostgreSQL backend with the ``english`` configuration.
+
+Both use the weights from the current ``LandingPage.search_fields``, as
+weights are derived from the models rather than the backend settings.
+
+Needs PostgreSQL and takes several minutes at 100k pages. Run with::
+
+    pytest benchmarks/bench_search_backends.py -s
+"""
+import random
+import statistics
+import time
+
+import pytest
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from wagtail.models import Locale, Page, Site
+from wagtail.search.backends import get_search_backend
+
+from landing.models import LandingPage
+
+WORDS = (
+    "analytics automation billing cloud compliance dashboard delivery design "
+    "enterprise growth hosting integration marketing mobile onboarding payments "
+    "performance platform pricing privacy reporting security startup support "
+    "team workflow"
+).split()
+
+QUERIES = ("pricing", "cloud security", "mobile payments platform", "onboarding workflow")
+
+BACKENDS = {
+    'previous': {'BACKEND': 'wagtail.search.backends.database'},
+    'current': settings.WAGTAILSEARCH_BACKENDS['default'],
+}
+
+CHUNK_SIZE = 1000
+
+
+def sentence(rng, length):
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize()
+
+
+def create_pages(count):
+    """
+    Create ``count`` live landing pages below a new section of the default
+    site. Page rows are bulk inserted with precomputed tree paths.
+    """
+    rng = random.Random(count)
+    section = Site.objects.get(is_default_site=True).root_page.add_child(
+        instance=Page(title="Benchmark section", slug="benchmark-section")
+    )
+    content_type = ContentType.objects.get_for_model(LandingPage)
+    locale = Locale.get_default()
+
+    for start in range(0, count, CHUNK_SIZE):
+        pages = []
+        for index in range(start, min(start + CHUNK_SIZE, count)):
+            title = sentence(rng, 4)
+            pages.append(Page(
+                title=title,
+                draft_title=title,
+                slug=f"page-{index}",
+                url_path=f"{section.url_path}page-{index}/",
+                path=Page._get_path(section.path, section.depth + 1, index + 1),
+                depth=section.depth + 1,
+                content_type=content_type,
+                locale=locale,
+                live=True,
+            ))
+        landing_pages = [
+            LandingPage(
+                page_ptr=page,
+                description=sentence(rng, 12),
+                body=[('content', {
+                    'title': sentence(rng, 3),
+                    'content': f"<p>{sentence(rng, 80)}</p>",
+                })],
+            )
+            for page in Page.objects.bulk_create(pages)
+        ]
+        # bulk_create() refuses multi-table inheritance, so insert the
+        # LandingPage rows directly. This also skips indexing each page.
+        LandingPage._base_manager._insert(
+            landing_pages, fields=LandingPage._meta.local_concrete_fields
+        )
+
+    Page.objects.filter(id=section.id).update(numchild=count)
+    return section
+
+
+def index_pages(backend):
+    backend.reset_index()
+    pages = LandingPage.objects.live().order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(pages.filter(id__gt=last_id)[:CHUNK_SIZE])
+        if not chunk:
+            return
+        backend.add_bulk(LandingPage, chunk)
+        last_id = chunk[-1].id
+
+
+def time_query(backend, query, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(backend.search(query, LandingPage.objects.live())[:10])
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('page_count', [10000, 100000])
+def test_search_latency(page_count):
+    if connection.vendor != 'postgresql':
+        pytest.skip("Needs PostgreSQL")
+
+    create_pages(page_count)
+
+    results = {}
+    for name, params in BACKENDS.items():
+        params = dict(params)
+        backend = get_search_backend(params.pop('BACKEND'), **params)
+        index_pages(backend)
+        results[name] = {query: time_query(backend, query) for query in QUERIES}
+
+    print(f"\n{page_count} pages, median of 20 runs (first 10 results):")
+    for query in QUERIES:
+        print(
+            f"  {query!r}: previous {results['previous'][query] * 1e3:.1f}ms, "
+            f"current {results['current'][query] * 1e3:.1f}ms"
+        )
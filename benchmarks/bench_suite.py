@@ -0,0 +1,140 @@
+"""
+Benchmark suite: page rendering, sitemap and search at increasing scale.
+
+* ``LandingPage`` rendering with 1, 10 and 100 StreamField blocks, with the
+  page and fragment caches empty,
+* the sitemap index and every shard for 1k, 10k and 100k pages, built from
+  the database and then read from the sitemap cache,
+* ``search.views.search`` on synthetic corpora of 1k and 10k pages, with the
+  result cache empty.
+
+Each benchmark records its median wall time, query count and peak Python
+memory (see ``benchmarks/baseline.py``). Save a baseline on the main branch,
+then compare a branch against it; a regression fails the benchmark::
+
+    pytest benchmarks/bench_suite.py -s --benchmark-save=baseline.json
+    pytest benchmarks/bench_suite.py -s --benchmark-compare=baseline.json
+
+Pages are bulk inserted, but the largest sizes still take a few minutes to
+set up. Select sizes with ``-k``, e.g. ``-k "not 100000"``.
+"""
+import random
+
+import pytest
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+from wagtail.images.models import Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+from wagtail.search.backends import get_search_backend
+
+from benchmarks.bench_search_backends import QUERIES, create_pages, index_pages, sentence
+from landing.models import LandingPage
+
+IMAGE_COUNT = 5
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture
+def client():
+    return Client(HTTP_HOST=Site.objects.get(is_default_site=True).hostname)
+
+
+def build_blocks(count, images, rng):
+    """Return ``count`` StreamField blocks, cycling through every block type."""
+    block_types = [
+        ('hero', lambda image: {
+            'title': sentence(rng, 4), 'subtitle': sentence(rng, 12), 'background_image': image,
+        }),
+        ('features', lambda image: {
+            'title': sentence(rng, 3),
+            'features': [
+                {'title': sentence(rng, 2), 'description': sentence(rng, 20)} for _ in range(4)
+            ],
+        }),
+        ('testimonials', lambda image: {
+            'title': sentence(rng, 3),
+            'testimonials': [
+                {'quote': sentence(rng, 25), 'author': sentence(rng, 2), 'image': image}
+                for _ in range(4)
+            ],
+        }),
+        ('content', lambda image: {
+            'title': sentence(rng, 3), 'content': f"<p>{sentence(rng, 80)}</p>", 'image': image,
+        }),
+        ('cta', lambda image: {'title': sentence(rng, 4), 'text': sentence(rng, 15)}),
+    ]
+    return [
+        (block_types[index % len(block_types)][0],
+         block_types[index % len(block_types)][1](images[index % len(images)]))
+        for index in range(count)
+    ]
+
+
+def read_sitemap(client):
+    """Fetch the sitemap index and every shard it lists."""
+    response = client.get(reverse('sitemap'))
+    assert response.status_code == 200
+    for section in range(response.content.decode('utf-8').count('<sitemap>')):
+        response = client.get(reverse('sitemap_section', args=[section]))
+        assert response.status_code == 200
+        b''.join(response.streaming_content)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('block_count', [1, 10, 100])
+def test_landing_page_rendering(benchmark, client, block_count):
+    rng = random.Random(block_count)
+    images = [
+        Image.objects.create(title=f"Image {index}", file=get_test_image_file())
+        for index in range(IMAGE_COUNT)
+    ]
+    landing_page = LandingPage(
+        title="Benchmark page",
+        slug="benchmark-page",
+        body=build_blocks(block_count, images, rng),
+    )
+    Site.objects.get(is_default_site=True).root_page.add_child(instance=landing_page)
+    landing_page.save_revision().publish()
+    url = landing_page.url
+
+    def render():
+        assert client.get(url).status_code == 200
+
+    # Create the renditions, as the first visitor after a publish would
+    render()
+    benchmark(f'landing_page_rendering[{block_count} blocks]', render, setup=cache.clear)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('page_count', [1000, 10000, 100000])
+def test_sitemap(benchmark, client, page_count):
+    create_pages(page_count)
+
+    benchmark(
+        f'sitemap_uncached[{page_count} pages]',
+        lambda: read_sitemap(client),
+        setup=cache.clear,
+        repeat=3,
+    )
+    read_sitemap(client)
+    benchmark(f'sitemap_cached[{page_count} pages]', lambda: read_sitemap(client))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('page_count', [1000, 10000])
+def test_search(benchmark, client, page_count):
+    create_pages(page_count)
+    index_pages(get_search_backend())
+    url = reverse('search')
+
+    def search():
+        for query in QUERIES:
+            assert client.get(url, {'query': query}).status_code == 200
+
+    benchmark(f'search[{page_count} pages]', search, setup=cache.clear)
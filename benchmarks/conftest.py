@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from benchmarks import baseline
+
+RESULTS = pytest.StashKey[dict]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption(
+        '--benchmark-save',
+        metavar='PATH',
+        help="Write the measurements of this run to a baseline file.",
+    )
+    group.addoption(
+        '--benchmark-compare',
+        metavar='PATH',
+        help="Fail benchmarks that got slower, use more memory or run more "
+        "queries than in this baseline file.",
+    )
+    group.addoption(
+        '--benchmark-tolerance',
+        type=float,
+        default=baseline.DEFAULT_TOLERANCE,
+        help="Relative increase of wall time and memory allowed over the "
+        "baseline (default: %(default)s).",
+    )
+
+
+def pytest_configure(config):
+    config.stash[RESULTS] = {}
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption('--benchmark-save', None)
+    results = session.config.stash.get(RESULTS, None)
+    if path and results:
+        # Keep the benchmarks that weren't run this time
+        saved = baseline.load(path) if os.path.exists(path) else {}
+        saved.update(results)
+        baseline.save(path, saved)
+
+
+@pytest.fixture
+def benchmark(request):
+    """
+    Measure a function with ``baseline.measure()``, record the result under
+    the given name and check it against ``--benchmark-compare``.
+    """
+    config = request.config
+    compare_path = config.getoption('--benchmark-compare')
+    baseline_results = baseline.load(compare_path) if compare_path else {}
+
+    def run(name, func, setup=None, repeat=5):
+        measurement = baseline.measure(func, setup=setup, repeat=repeat)
+        config.stash[RESULTS][name] = measurement
+        print('\n' + baseline.format_measurement(name, measurement))
+
+        if name in baseline_results:
+            regressions = baseline.compare(
+                measurement,
+                baseline_results[name],
+                config.getoption('--benchmark-tolerance'),
+            )
+            if regressions:
+                pytest.fail(f"{name} regressed: " + "; ".join(regressions))
+        return measurement
+
+    return run
@@ -1,4 +1,5 @@
 import pytest
+from django.core.cache import cache
 from django.test import Client
 from django.test.utils import override_settings
 
@@ -23,3 +24,23 @@ def use_static_storage():
         }
     ):
         yield
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache."""
+    cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def query_hits(monkeypatch):
+    """
+    Buffer search query hits without a background thread, so nothing is
+    written outside the test's transaction and tests decide when to flush.
+    """
+    from search import query_log
+
+    buffer = query_log.QueryHitBuffer(background=False)
+    monkeypatch.setattr(query_log, "query_hits", buffer)
+    return buffer
@@ -0,0 +1,25 @@
+"""
+Gunicorn settings, read automatically when gunicorn is started from the
+project root.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set, every worker writes its metrics to
+files in that directory (see ``mysite/metrics.py``). The directory is emptied
+when gunicorn starts, and the files of a worker that exits are marked dead
+so its gauges stop being reported.
+"""
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+def on_starting(server):
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
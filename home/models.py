@@ -20,6 +20,13 @@ class HomePage(Page):
         FieldPanel('banner_subtitle'),
         FieldPanel('body'),
     ]
+
+    # Serve anonymous visitors from the page cache (see landing.page_cache)
+    cache_anonymous_responses = True
+
+    # Send ETag and Last-Modified, and answer revalidation with a 304 (see
+    # landing.conditional)
+    conditional_responses = True
     
     class Meta:
         verbose_name = "Home Page"
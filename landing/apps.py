@@ -1,6 +1,26 @@
+import logging
+
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
 
 class LandingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "landing"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Willow only registers pillow-heif's HEIF plugin; the AVIF encoder
+        # used by the format-avif renditions has to be registered separately.
+        # pillow-heif 1.0 dropped it (see requirements.txt)
+        try:
+            from pillow_heif import register_avif_opener
+        except ImportError:
+            logger.warning(
+                "pillow-heif's AVIF support is missing, so format-avif renditions "
+                "will fail; install pillow-heif<1.0"
+            )
+        else:
+            register_avif_opener()
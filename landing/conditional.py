@@ -0,0 +1,153 @@
+"""
+HTTP validators (``ETag`` and ``Last-Modified``) for public responses, so
+returning visitors and crawlers can revalidate what they already have and
+get a ``304 Not Modified`` instead of the whole body.
+
+Validators are derived from what a response shows rather than from its
+bytes, so they are known before anything is rendered and a conditional
+request is answered without rendering. ETags are weak for the same reason;
+compression may change the bytes of an equivalent response.
+
+Version tokens made by ``new_version()``, such as the ``SEOSettings`` version
+of ``landing.seo`` and the shard versions of ``landing.sitemaps``, start with
+the time they were made, so a single token gives both an ETag and a
+``Last-Modified`` date.
+
+Every ETag also holds the deployed release (see ``mysite.release``), and no
+``Last-Modified`` date is older than the release, as a deploy can change any
+response through its templates and static files.
+
+Wagtail pages opt in by setting ``conditional_responses = True``. Their
+validators come from ``last_published_at``, the URL path, the site's
+``SEOSettings`` version and the page cache tokens of the page and site,
+which ``landing.signals`` also replace when an image the page uses changes.
+Between them they change whenever the page's HTML does. The
+``before_serve_page`` hook in ``landing.wagtail_hooks`` answers a
+matching conditional request before the page is rendered, and otherwise
+leaves the validators on the request for ``ConditionalGetMiddleware`` to add
+to the response. Like the page cache, this only applies to anonymous
+visitors of public pages, as anyone else may be shown something different.
+"""
+import hashlib
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+from mysite.release import get_release_id, get_release_time
+
+
+def new_version():
+    """Return a random version token that records when it was made."""
+    return '%d-%s' % (time.time(), uuid.uuid4().hex)
+
+
+def get_version_time(version):
+    """Return the timestamp a ``new_version()`` token was made at, or None."""
+    timestamp, separator, _ = version.partition('-')
+    if separator and timestamp.isdigit():
+        return int(timestamp)
+    return None
+
+
+def make_etag(*parts):
+    """Return a weak ETag identifying the given parts in the deployed release."""
+    key = ':'.join(str(part) for part in (*parts, get_release_id()))
+    return 'W/"%s"' % hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def get_last_modified(*timestamps):
+    """Return the latest of the given timestamps (ignoring None) and the release time."""
+    timestamps = (*timestamps, get_release_time())
+    return max(timestamp for timestamp in timestamps if timestamp is not None)
+
+
+def get_version_validators(version, *parts):
+    """Return the ``(etag, last_modified)`` of a response that changes with a version token."""
+    return make_etag(*parts, version), get_last_modified(get_version_time(version))
+
+
+def get_page_validators(page, *versions):
+    """
+    Return the ``(etag, last_modified)`` of a page whose HTML also changes with
+    the given version tokens, or None if the page was never published.
+    """
+    if page.last_published_at is None:
+        return None
+    etag = make_etag('page', page.id, page.url_path, page.last_published_at.isoformat(), *versions)
+
+    # Replacing a token after the page was published changed its HTML too
+    return etag, get_last_modified(
+        int(page.last_published_at.timestamp()),
+        *(get_version_time(version) for version in versions),
+    )
+
+
+def set_validators(response, etag=None, last_modified=None):
+    """Add validators to a response, keeping any it already has."""
+    if etag is not None and not response.has_header('ETag'):
+        response.headers['ETag'] = etag
+    if last_modified is not None and not response.has_header('Last-Modified'):
+        response.headers['Last-Modified'] = http_date(last_modified)
+    # Given a Last-Modified date but no Cache-Control, browsers guess how long
+    # the response stays fresh, and show it without revalidating until then
+    if not response.has_header('Cache-Control'):
+        patch_cache_control(response, max_age=0, must_revalidate=True)
+
+
+def get_not_modified_response(request, etag=None, last_modified=None):
+    """
+    Return the response to a conditional request that the validators settle
+    (a 304, or a 412 for a failed ``If-Match``), or None to serve it in full.
+    """
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def respond_conditionally(request, response):
+    """
+    Return a 304 if a conditional request matches the validators of an
+    already rendered response (such as one from a cache), or the response.
+    """
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(response.get('Last-Modified')),
+        response=response,
+    )
+
+
+class ConditionalGetMiddleware:
+    """
+    Add the validators the ``before_serve_page`` hook worked out for a page
+    to its response.
+
+    Must come after ``PageCacheMiddleware``, so cached responses keep their
+    validators. Supports both sync and async requests.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        validators = getattr(request, 'conditional_validators', None)
+        if validators is not None and response.status_code == 200:
+            set_validators(response, *validators)
+        return response
@@ -0,0 +1,19 @@
+from django.utils.functional import SimpleLazyObject
+
+from wagtail.models import Site
+
+from .seo import SEOSettingsSnapshot, get_seo_settings
+
+
+def _get_request_seo_settings(request):
+    site = Site.find_for_request(request)
+    if site is None:
+        return SEOSettingsSnapshot()
+    return get_seo_settings(site)
+
+
+def seo_settings(request):
+    """Add the SEO settings of the current site as ``seo_settings``."""
+    # Lazy, so templates that don't use the settings (e.g. the admin) don't
+    # look them up
+    return {'seo_settings': SimpleLazyObject(lambda: _get_request_seo_settings(request))}
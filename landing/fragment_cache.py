@@ -0,0 +1,114 @@
+"""
+Fragment cache for the top-level blocks of a StreamField.
+
+The rendered HTML of each block is cached under the block's id and a hash of
+its type and content. Editing a block changes its hash, so only that block's
+fragment is rendered again; every other block on the page keeps hitting the
+cache. The content only holds the ids of its images, so the hash also covers
+the file and focal point of each image the block shows, whose renditions
+(and so their URLs) change with them, and the release of the deployed code
+(see ``mysite.release``), for template changes. Hit and miss counts are
+kept per process and can be read with ``get_stats()``.
+"""
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from wagtail.blocks import StreamValue, StructValue
+from wagtail.blocks.list_block import ListValue
+from wagtail.images.models import AbstractImage
+
+from mysite.release import get_release_id
+
+# How long a rendered block is kept, in seconds
+BLOCK_CACHE_TIMEOUT = 60 * 60 * 24
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def get_stats():
+    """Return the number of cache hits and misses in this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        for outcome in _stats:
+            _stats[outcome] = 0
+
+
+def iter_images(value):
+    """Yield the images in a block value, at any depth."""
+    if isinstance(value, AbstractImage):
+        yield value
+    elif isinstance(value, StructValue):
+        for child in value.values():
+            yield from iter_images(child)
+    elif isinstance(value, StreamValue):
+        for child in value:
+            yield from iter_images(child.value)
+    elif isinstance(value, (ListValue, list, tuple)):
+        for child in value:
+            yield from iter_images(child)
+
+
+def get_image_fingerprint(image):
+    """Return what identifies the renditions of an image."""
+    return [
+        image.id, image.file.name, image.file_hash,
+        image.focal_point_x, image.focal_point_y,
+        image.focal_point_width, image.focal_point_height,
+    ]
+
+
+def get_block_cache_key(bound_block):
+    """Return the cache key for a block, or None if it cannot be cached."""
+    if not bound_block.id:
+        return None
+
+    content = json.dumps(
+        [
+            bound_block.block_type,
+            bound_block.block.get_prep_value(bound_block.value),
+            [get_image_fingerprint(image) for image in iter_images(bound_block.value)],
+            get_release_id(),
+        ],
+        cls=DjangoJSONEncoder,
+        sort_keys=True,
+    )
+    content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()
+    return 'landing:block:%s:%s' % (bound_block.id, content_hash)
+
+
+def render_block(bound_block, context):
+    """
+    Render a block the way ``{% include_block %}`` does, serving the HTML
+    from the cache when the block has not changed.
+    """
+    request = context.get('request')
+    cache_key = get_block_cache_key(bound_block)
+
+    # Previews render unsaved content that should not end up in the cache
+    if cache_key is None or getattr(request, 'is_preview', False):
+        return bound_block.render_as_block(context=context.flatten())
+
+    html = cache.get(cache_key)
+    if html is not None:
+        _count('hits')
+        return html
+
+    _count('misses')
+    html = bound_block.render_as_block(context=context.flatten())
+    timeout = getattr(settings, 'LANDING_BLOCK_CACHE_TIMEOUT', BLOCK_CACHE_TIMEOUT)
+    cache.set(cache_key, html, timeout)
+    return html
@@ -0,0 +1,375 @@
+"""
+HTTP load testing of a running site with scenario profiles.
+
+Each virtual user is a thread with its own keep-alive connection that runs
+one scenario in a loop until the test ends:
+
+* ``browse``: an anonymous visitor reading landing pages, the home page and
+  tag listings,
+* ``crawler``: a crawler reading the sitemap index, every shard and then the
+  pages listed in them, one request at a time,
+* ``search``: a visitor typing a query into the search box, sending an
+  autocomplete request per keystroke and then the search itself,
+* ``publish``: an editor changing and publishing a landing page. This goes
+  through the ORM rather than the admin's forms, so it needs the same
+  database as the site; it measures publishing and its signal handlers
+  (cache, sitemap and tag count updates) under load. Only pages made by
+  ``synthetic.generate_pages()`` below its default parent are edited.
+
+A profile says what share of the users run each scenario. ``PROFILES`` has a
+profile per scenario, ``mixed`` for every kind of read traffic at once, and
+``mixed-writes`` for that with publishing too. Profiles that publish change
+the database, so ``run()`` refuses them unless given ``allow_writes=True``.
+
+Results hold the throughput, error rate and latency percentiles of each
+scenario and of each kind of request in it, and are written as JSON with
+sorted keys so two runs can be diffed or compared with ``compare()``.
+"""
+import http.client
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from django.db import connections
+from django.urls import reverse
+
+from search.views import AUTOCOMPLETE_MIN_LENGTH
+
+from .models import LandingPage, LandingPageTagCount
+from .synthetic import WORDS, get_synthetic_parent, sentence
+
+# Share of the users running each scenario
+PROFILES = {
+    'browse': {'browse': 1},
+    'crawler': {'crawler': 1},
+    'search': {'search': 1},
+    'publish': {'publish': 1},
+    'mixed': {'browse': 0.75, 'search': 0.2, 'crawler': 0.05},
+    'mixed-writes': {'browse': 0.7, 'search': 0.2, 'crawler': 0.05, 'publish': 0.05},
+}
+
+# Scenarios that change the database
+WRITE_SCENARIOS = {'publish'}
+
+# Most pages and tags sampled for browsing and publishing
+SAMPLE_SIZE = 1000
+
+# Seconds to wait for a response
+REQUEST_TIMEOUT = 30
+
+PERCENTILES = (50, 90, 95, 99)
+
+_LOC_RE = re.compile(r'<loc>([^<]+)</loc>')
+
+
+class Deadline(Exception):
+    """Raised when the test is over, to stop a scenario where it is."""
+
+
+class Recorder:
+    """Collects the latency and outcome of every request, from every user."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, scenario, name, latency, status):
+        key = (scenario, name)
+        error = not isinstance(status, int) or status >= 400
+        with self.lock:
+            self.latencies[key].append(latency)
+            self.statuses[key][str(status)] += 1
+            if error:
+                self.errors[key] += 1
+
+
+class Session:
+    """A virtual user: one keep-alive connection to the site, and a clock."""
+
+    def __init__(self, base_url, scenario, recorder, deadline):
+        url = urlsplit(base_url)
+        self.connection_class = (
+            http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        )
+        self.netloc = url.netloc
+        self.prefix = url.path.rstrip('/')
+        self.scenario = scenario
+        self.recorder = recorder
+        self.deadline = deadline
+        self.connection = None
+
+    def check_deadline(self):
+        if time.monotonic() >= self.deadline:
+            raise Deadline
+
+    def get(self, name, path, params=None):
+        """Fetch a path of the site. Return the status (or the error) and the body."""
+        self.check_deadline()
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=REQUEST_TIMEOUT)
+            self.connection.request('GET', self.prefix + path, headers={'User-Agent': 'loadtest'})
+            response = self.connection.getresponse()
+            body = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            status, body = e.__class__.__name__, b''
+        self.recorder.record(self.scenario, name, time.perf_counter() - start, status)
+        return status, body
+
+    def timed(self, name, func):
+        """Run and record an action that isn't a request, such as publishing."""
+        self.check_deadline()
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            status = e.__class__.__name__
+        else:
+            status = 200
+        self.recorder.record(self.scenario, name, time.perf_counter() - start, status)
+
+    def think(self, rng, seconds):
+        """Pause like a person would, for up to ``seconds``."""
+        if seconds:
+            time.sleep(min(rng.uniform(0, seconds), max(0, self.deadline - time.monotonic())))
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class SiteData:
+    """The pages and tags the scenarios pick from."""
+
+    def __init__(self, rng):
+        page_ids = list(LandingPage.objects.live().values_list('id', flat=True))
+        page_ids = rng.sample(page_ids, min(len(page_ids), SAMPLE_SIZE))
+        pages = LandingPage.objects.filter(id__in=page_ids).order_by('id')
+        self.page_paths = [url for url in (page.get_url() for page in pages) if url]
+
+        # Only generated pages are published, never real content
+        self.publish_ids = []
+        parent = get_synthetic_parent(create=False)
+        if parent is not None:
+            publish_ids = list(
+                LandingPage.objects.live().descendant_of(parent).values_list('id', flat=True)
+            )
+            self.publish_ids = rng.sample(publish_ids, min(len(publish_ids), SAMPLE_SIZE))
+        self.tag_paths = [
+            reverse('tag', args=[slug]) for slug in
+            LandingPageTagCount.objects.filter(live_pages__gt=0)
+            .order_by('tag__slug').values_list('tag__slug', flat=True)[:SAMPLE_SIZE]
+        ]
+
+
+def browse(session, rng, data, think_time):
+    choice = rng.random()
+    if choice < 0.1 or not data.page_paths:
+        session.get('home', '/')
+    elif choice < 0.2 and data.tag_paths:
+        session.get('tag', rng.choice(data.tag_paths))
+    else:
+        session.get('page', rng.choice(data.page_paths))
+    session.think(rng, think_time)
+
+
+def crawl(session, rng, data, think_time):
+    _, body = session.get('sitemap_index', reverse('sitemap'))
+    for shard_url in _LOC_RE.findall(body.decode('utf-8', 'replace')):
+        _, shard = session.get('sitemap_shard', urlsplit(shard_url).path)
+        for page_url in _LOC_RE.findall(shard.decode('utf-8', 'replace')):
+            session.get('page', urlsplit(page_url).path)
+            session.think(rng, think_time)
+
+
+def search(session, rng, data, think_time):
+    query = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+    # One autocomplete request per keystroke, as fast as someone types
+    for length in range(AUTOCOMPLETE_MIN_LENGTH, len(query) + 1):
+        session.get('autocomplete', reverse('search_autocomplete'), {'q': query[:length]})
+    session.get('search', reverse('search'), {'query': query})
+    session.think(rng, think_time)
+
+
+def publish(session, rng, data, think_time):
+    if not data.publish_ids:
+        raise Deadline
+    page_id = rng.choice(data.publish_ids)
+
+    def edit_and_publish():
+        page = LandingPage.objects.get(id=page_id)
+        page.description = sentence(rng, 15)
+        page.save_revision().publish()
+
+    session.timed('publish', edit_and_publish)
+    # Editors publish far less often than visitors read
+    session.think(rng, think_time * 10)
+
+
+SCENARIOS = {
+    'browse': browse,
+    'crawler': crawl,
+    'search': search,
+    'publish': publish,
+}
+
+
+def profile_writes(profile):
+    """Return whether a profile runs scenarios that change the database."""
+    return any(weight for name, weight in PROFILES[profile].items() if name in WRITE_SCENARIOS)
+
+
+def assign_scenarios(profile, users):
+    """Split the users between the scenarios of a profile, largest remainder first."""
+    weights = PROFILES[profile]
+    total = sum(weights.values())
+    shares = {name: users * weight / total for name, weight in weights.items()}
+    counts = {name: int(share) for name, share in shares.items()}
+    by_remainder = sorted(shares, key=lambda name: shares[name] - counts[name], reverse=True)
+    for name in by_remainder[:users - sum(counts.values())]:
+        counts[name] += 1
+    return [name for name in weights for _ in range(counts[name])]
+
+
+def run_user(scenario, base_url, recorder, deadline, data, seed, think_time):
+    rng = random.Random(seed)
+    session = Session(base_url, scenario, recorder, deadline)
+    try:
+        while True:
+            SCENARIOS[scenario](session, rng, data, think_time)
+    except Deadline:
+        pass
+    finally:
+        session.close()
+        connections.close_all()
+
+
+def percentile(sorted_values, percent):
+    index = max(0, int(round(percent / 100 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, duration):
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'error_rate': errors / len(latencies) if latencies else 0,
+        'throughput': len(latencies) / duration,
+        'latency_ms': {},
+    }
+    if latencies:
+        summary['latency_ms'] = {
+            **{f'p{percent}': percentile(latencies, percent) * 1e3 for percent in PERCENTILES},
+            'mean': sum(latencies) / len(latencies) * 1e3,
+            'max': latencies[-1] * 1e3,
+        }
+    return summary
+
+
+def get_results(recorder, duration):
+    scenarios = defaultdict(dict)
+    for (scenario, name), latencies in recorder.latencies.items():
+        scenarios[scenario][name] = latencies
+
+    results = {'scenarios': {}}
+    for scenario, endpoints in scenarios.items():
+        all_latencies = [latency for latencies in endpoints.values() for latency in latencies]
+        errors = sum(recorder.errors[(scenario, name)] for name in endpoints)
+        results['scenarios'][scenario] = {
+            **summarize(all_latencies, errors, duration),
+            'endpoints': {
+                name: {
+                    **summarize(latencies, recorder.errors[(scenario, name)], duration),
+                    'statuses': dict(recorder.statuses[(scenario, name)]),
+                }
+                for name, latencies in endpoints.items()
+            },
+        }
+    results['total'] = summarize(
+        [latency for latencies in recorder.latencies.values() for latency in latencies],
+        sum(recorder.errors.values()),
+        duration,
+    )
+    return results
+
+
+def run(base_url, profile='mixed', users=10, duration=60, seed=0, think_time=0,
+        allow_writes=False):
+    """
+    Run a load test against ``base_url`` and return its results. Raise
+    ValueError for a profile that publishes pages unless ``allow_writes``.
+    """
+    if profile_writes(profile) and not allow_writes:
+        raise ValueError(f"The {profile} profile publishes pages, which needs allow_writes")
+    scenarios = assign_scenarios(profile, users)
+    data = SiteData(random.Random(seed))
+    if 'publish' in scenarios and not data.publish_ids:
+        raise ValueError("There are no generated pages to publish; run generate_pages first")
+    recorder = Recorder()
+
+    start = time.monotonic()
+    deadline = start + duration
+    threads = [
+        threading.Thread(
+            target=run_user,
+            args=(scenario, base_url, recorder, deadline, data, seed + index, think_time),
+            name=f'loadtest-{scenario}-{index}',
+        )
+        for index, scenario in enumerate(scenarios)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'config': {
+            'base_url': base_url,
+            'profile': profile,
+            'users': dict(sorted({name: scenarios.count(name) for name in set(scenarios)}.items())),
+            'duration_seconds': duration,
+            'seed': seed,
+            'think_time_seconds': think_time,
+            'allow_writes': allow_writes,
+        },
+        **get_results(recorder, time.monotonic() - start),
+    }
+
+
+def compare(previous, current):
+    """Return lines comparing the throughput, p95 and error rate of two runs."""
+    def change(before, after):
+        if not before:
+            return ''
+        return f" ({(after - before) / before:+.0%})"
+
+    rows = [('total', previous.get('total'), current['total'])] + [
+        (scenario, previous.get('scenarios', {}).get(scenario), summary)
+        for scenario, summary in sorted(current['scenarios'].items())
+    ]
+    lines = []
+    for name, before, after in rows:
+        if not before:
+            lines.append(f"{name}: not in the previous run")
+            continue
+        p95_before = before['latency_ms'].get('p95', 0)
+        p95_after = after['latency_ms'].get('p95', 0)
+        lines.append(
+            f"{name}: {before['throughput']:.1f} -> {after['throughput']:.1f} req/s"
+            f"{change(before['throughput'], after['throughput'])}, "
+            f"p95 {p95_before:.0f} -> {p95_after:.0f}ms{change(p95_before, p95_after)}, "
+            f"errors {before['error_rate']:.2%} -> {after['error_rate']:.2%}"
+        )
+    return lines
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from wagtail.models import Site
+
+from landing import prerender
+
+
+class Command(BaseCommand):
+    help = "Render published pages to static HTML files for nginx to serve."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--site',
+            help="Only export pages of the site with this hostname",
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help="Remove previously exported files of the exported sites first",
+        )
+
+    def handle(self, *args, **options):
+        # Without the publish hooks, exported files would go stale. Not an
+        # error, so a container can run this unconditionally before starting
+        if not prerender.is_enabled():
+            self.stdout.write(self.style.WARNING(
+                "STATIC_PAGES_ENABLED is not set, so no pages were exported"
+            ))
+            return
+
+        sites = Site.objects.select_related('root_page')
+        if options['site']:
+            sites = sites.filter(hostname=options['site'])
+
+        renderer = prerender.PageRenderer()
+        exported = skipped = 0
+
+        for site in sites:
+            if options['clear']:
+                prerender.remove_site(site)
+
+            site_exported, site_skipped = prerender.export_site(site, renderer=renderer)
+            exported += site_exported
+            skipped += site_skipped
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {exported} pages ({skipped} skipped) to {prerender.get_root()}"
+        ))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wagtail.models import Page
+
+from landing import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk create synthetic live landing pages with tags and images, for "
+        "load and scale testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help="Number of pages to create")
+        parser.add_argument(
+            '--parent',
+            type=int,
+            help=(
+                "Id of the page to add them below (default: a draft page with the "
+                f"'{synthetic.PARENT_SLUG}' slug below the default site's root page)"
+            ),
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help="Seed of the generated content; the same seed gives the same pages (default: 0)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=synthetic.BATCH_SIZE,
+            help=f"Number of pages inserted per transaction (default: {synthetic.BATCH_SIZE})",
+        )
+        parser.add_argument(
+            '--no-images',
+            action='store_true',
+            help="Don't create images, and leave the image blocks empty",
+        )
+
+    def handle(self, *args, **options):
+        parent = None
+        if options['parent'] is not None:
+            try:
+                parent = Page.objects.get(id=options['parent'])
+            except Page.DoesNotExist:
+                raise CommandError(f"Page {options['parent']} does not exist")
+
+        start = time.monotonic()
+        created = 0
+        for created in synthetic.generate_pages(
+            options['count'],
+            parent=parent,
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            with_images=not options['no_images'],
+        ):
+            elapsed = time.monotonic() - start
+            self.stdout.write(f"  {created}/{options['count']} pages ({created / elapsed:.0f}/s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} pages in {time.monotonic() - start:.1f}s. "
+            "Run rebuild_search_index to make them searchable."
+        ))
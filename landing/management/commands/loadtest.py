@@ -0,0 +1,124 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from landing import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test a running site with a scenario profile, and report "
+        "throughput, latency percentiles and error rates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            default='http://localhost:8000',
+            help="URL of the site to test (default: http://localhost:8000)",
+        )
+        parser.add_argument(
+            '--profile',
+            choices=sorted(loadtest.PROFILES),
+            default='mixed',
+            help="Scenarios to run (default: mixed)",
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=10,
+            help="Number of concurrent virtual users (default: 10)",
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=60,
+            help="Length of the test in seconds (default: 60)",
+        )
+        parser.add_argument(
+            '--think-time',
+            type=float,
+            default=0,
+            help="Longest pause of a user between actions, in seconds (default: 0)",
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help="Seed of the pages, tags and queries the users pick (default: 0)",
+        )
+        parser.add_argument(
+            '--allow-writes',
+            action='store_true',
+            help=(
+                "Let profiles that publish run; they only edit pages made by "
+                "generate_pages, but do change the database"
+            ),
+        )
+        parser.add_argument(
+            '--output',
+            help="Write the results to this JSON file",
+        )
+        parser.add_argument(
+            '--compare',
+            help="Compare the results with those of an earlier run, from its JSON file",
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError("--users must be at least 1")
+        if loadtest.profile_writes(options['profile']) and not options['allow_writes']:
+            raise CommandError(
+                f"The {options['profile']} profile publishes pages; pass --allow-writes to run it"
+            )
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                previous = json.load(f)
+
+        config = options['profile'], options['users'], options['duration']
+        self.stdout.write("Running the %s profile with %d users for %ss..." % config)
+        try:
+            results = loadtest.run(
+                options['base_url'],
+                profile=options['profile'],
+                users=options['users'],
+                duration=options['duration'],
+                seed=options['seed'],
+                think_time=options['think_time'],
+                allow_writes=options['allow_writes'],
+            )
+        except ValueError as e:
+            raise CommandError(e)
+
+        for scenario, summary in sorted(results['scenarios'].items()):
+            self.stdout.write(self.format_summary(scenario, summary))
+            for name, endpoint in sorted(summary['endpoints'].items()):
+                self.stdout.write(self.format_summary(f"  {name}", endpoint))
+        self.stdout.write(self.format_summary('total', results['total']))
+
+        if previous is not None:
+            self.stdout.write(f"Compared with {options['compare']}:")
+            for line in loadtest.compare(previous, results):
+                self.stdout.write(f"  {line}")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote the results to {options['output']}"))
+
+        if results['total']['errors']:
+            self.stdout.write(self.style.WARNING(
+                f"{results['total']['errors']} requests failed"
+            ))
+
+    def format_summary(self, name, summary):
+        latency = summary['latency_ms']
+        if not latency:
+            return f"{name}: no requests"
+        return (
+            f"{name}: {summary['requests']} requests, {summary['throughput']:.1f}/s, "
+            f"p50 {latency['p50']:.0f}ms, p95 {latency['p95']:.0f}ms, p99 {latency['p99']:.0f}ms, "
+            f"{summary['error_rate']:.2%} errors"
+        )
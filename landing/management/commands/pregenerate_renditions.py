@@ -0,0 +1,40 @@
+import os
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from wagtail.models import Page
+
+from landing import renditions
+
+
+class Command(BaseCommand):
+    help = "Create the image renditions used by every live page ahead of time."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes (default: number of CPUs)",
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        needed = defaultdict(set)
+        for page in Page.objects.live().specific().iterator(chunk_size=200):
+            for image_id, filter_specs in renditions.get_page_renditions(page).items():
+                needed[image_id].update(filter_specs)
+
+        self.stdout.write(f"Generating renditions for {len(needed)} images...")
+        total = 0
+        for done, count in enumerate(renditions.generate_in_pool(needed, options['workers']), 1):
+            total += count
+            if done % 100 == 0:
+                self.stdout.write(f"  {done}/{len(needed)} images")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Requested {total} renditions for {len(needed)} images "
+            f"in {time.monotonic() - start:.1f}s"
+        ))
@@ -0,0 +1,104 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from wagtail.search.backends import get_search_backend
+from wagtail.search.index import get_indexed_models
+
+from landing import search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the search index in place, indexing batches of objects in "
+        "parallel. Can be resumed after being interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend',
+            default='default',
+            help="Search backend to rebuild (default: default)",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes (default: number of CPUs)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=search_index.BATCH_SIZE,
+            help=f"Objects indexed per batch (default: {search_index.BATCH_SIZE})",
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.BASE_DIR, 'search-index-checkpoint.json'),
+            help="File recording the progress of the rebuild",
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help="Skip the objects indexed before the last run was interrupted",
+        )
+
+    def handle(self, *args, **options):
+        backend_name = options['backend']
+        backend = get_search_backend(backend_name)
+        if not backend.rebuilder_class:
+            raise CommandError(f"Backend '{backend_name}' doesn't use an index to rebuild")
+
+        checkpoint_path = options['checkpoint']
+        checkpoint = search_index.load_checkpoint(checkpoint_path) if options['resume'] else {}
+
+        start = time.monotonic()
+        total = 0
+        for model in get_indexed_models():
+            if not backend.get_index_for_model(model):
+                continue
+            total += self.rebuild_model(model, backend_name, checkpoint, checkpoint_path, options)
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        elapsed = time.monotonic() - start
+        rate = total / max(elapsed, 0.001)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} objects in {elapsed:.1f}s ({rate:.0f} objects/s)"
+        ))
+
+    def rebuild_model(self, model, backend_name, checkpoint, checkpoint_path, options):
+        label = search_index.get_model_label(model)
+        key = f"{backend_name}:{label}"
+        after_id = checkpoint.get(key)
+        remaining = model.get_indexed_objects()
+        if after_id is not None:
+            remaining = remaining.filter(pk__gt=after_id)
+        remaining = remaining.count()
+        if not remaining:
+            return 0
+
+        self.stdout.write(f"{label}: indexing {remaining} objects...")
+        jobs = (
+            (backend_name, label, ids)
+            for ids in search_index.iter_id_batches(model, options['batch_size'], after_id)
+        )
+
+        start = time.monotonic()
+        done = 0
+        results = search_index.index_in_pool(jobs, options['workers'])
+        for batches, (last_id, count) in enumerate(results, 1):
+            done += count
+            checkpoint[key] = last_id
+            search_index.save_checkpoint(checkpoint_path, checkpoint)
+            if batches % 10 == 0:
+                self.report_progress(done, remaining, start)
+        self.report_progress(done, remaining, start)
+        return done
+
+    def report_progress(self, done, total, start):
+        rate = done / max(time.monotonic() - start, 0.001)
+        self.stdout.write(f"  {done}/{total} ({rate:.0f} objects/s)")
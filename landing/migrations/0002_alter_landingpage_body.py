@@ -0,0 +1,213 @@
+# Generated by Django 5.0.14 on 2026-10-18 16:29
+
+import wagtail.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("landing", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="landingpage",
+            name="body",
+            field=wagtail.fields.StreamField(
+                [
+                    ("hero", 5),
+                    ("features", 12),
+                    ("testimonials", 19),
+                    ("content", 23),
+                    ("cta", 29),
+                ],
+                blank=True,
+                block_lookup={
+                    0: (
+                        "wagtail.blocks.CharBlock",
+                        (),
+                        {"help_text": "Title for the hero section", "required": True},
+                    ),
+                    1: (
+                        "wagtail.blocks.TextBlock",
+                        (),
+                        {
+                            "help_text": "Subtitle for the hero section",
+                            "required": False,
+                        },
+                    ),
+                    2: (
+                        "wagtail.blocks.CharBlock",
+                        (),
+                        {"help_text": "Call to action button text", "required": False},
+                    ),
+                    3: (
+                        "wagtail.blocks.URLBlock",
+                        (),
+                        {"help_text": "Call to action button link", "required": False},
+                    ),
+                    4: (
+                        "wagtail.images.blocks.ImageChooserBlock",
+                        (),
+                        {
+                            "help_text": "Background image for the hero section",
+                            "required": False,
+                        },
+                    ),
+                    5: (
+                        "wagtail.blocks.StructBlock",
+                        [
+                            [
+                                ("title", 0),
+                                ("subtitle", 1),
+                                ("cta_text", 2),
+                                ("cta_link", 3),
+                                ("background_image", 4),
+                            ]
+                        ],
+                        {},
+                    ),
+                    6: (
+                        "wagtail.blocks.CharBlock",
+                        (),
+                        {"help_text": "Section title", "required": False},
+                    ),
+                    7: (
+                        "wagtail.blocks.CharBlock",
+                        (),
+                        {
+                            "help_text": "Font Awesome icon class",
+                            "required": False,
+                            "search_index": False,
+                        },
+                    ),
+                    8: (
+                        "wagtail.blocks.CharBlock",
+                        (),
+                        {"help_text": "Feature title", "required": True},
+                    ),
+                    9: (
+                        "wagtail.blocks.TextBlock",
+                        (),
+                        {"help_text": "Feature description", "required": True},
+                    ),
+                    10: (
+                        "wagtail.blocks.StructBlock",
+                        [[("icon", 7), ("title", 8), ("description", 9)]],
+                        {},
+                    ),
+                    11: ("wagtail.blocks.ListBlock", (10,), {}),
+                    12: (
+                        "wagtail.blocks.StructBlock",
+                        [[("title", 6), ("features", 11)]],
+                        {},
+                    ),
+                    13: (
+                        "wagtail.blocks.TextBlock",
+                        (),
+                        {"help_text": "Testimonial quote", "required": True},
+                    ),
+                    14: (
+                        "wagtail.blocks.CharBlock",
+                        (),
+                        {"help_text": "Author name", "required": True},
+                    ),
+                    15: (
+                        "wagtail.blocks.CharBlock",
+                        (),
+                        {"help_text": "Author role or company", "required": False},
+                    ),
+                    16: (
+                        "wagtail.images.blocks.ImageChooserBlock",
+                        (),
+                        {"help_text": "Author image", "required": False},
+                    ),
+                    17: (
+                        "wagtail.blocks.StructBlock",
+                        [[("quote", 13), ("author", 14), ("role", 15), ("image", 16)]],
+                        {},
+                    ),
+                    18: ("wagtail.blocks.ListBlock", (17,), {}),
+                    19: (
+                        "wagtail.blocks.StructBlock",
+                        [[("title", 6), ("testimonials", 18)]],
+                        {},
+                    ),
+                    20: (
+                        "wagtail.blocks.RichTextBlock",
+                        (),
+                        {"help_text": "Section content", "required": True},
+                    ),
+                    21: (
+                        "wagtail.images.blocks.ImageChooserBlock",
+                        (),
+                        {"help_text": "Section image", "required": False},
+                    ),
+                    22: (
+                        "wagtail.blocks.ChoiceBlock",
+                        [],
+                        {
+                            "choices": [("left", "Left"), ("right", "Right")],
+                            "help_text": "Position of the image",
+                        },
+                    ),
+                    23: (
+                        "wagtail.blocks.StructBlock",
+                        [
+                            [
+                                ("title", 6),
+                                ("content", 20),
+                                ("image", 21),
+                                ("image_position", 22),
+                            ]
+                        ],
+                        {},
+                    ),
+                    24: (
+                        "wagtail.blocks.CharBlock",
+                        (),
+                        {"help_text": "CTA title", "required": True},
+                    ),
+                    25: (
+                        "wagtail.blocks.TextBlock",
+                        (),
+                        {"help_text": "CTA text", "required": False},
+                    ),
+                    26: (
+                        "wagtail.blocks.CharBlock",
+                        (),
+                        {"help_text": "Button text", "required": True},
+                    ),
+                    27: (
+                        "wagtail.blocks.URLBlock",
+                        (),
+                        {"help_text": "Button link", "required": True},
+                    ),
+                    28: (
+                        "wagtail.blocks.CharBlock",
+                        (),
+                        {
+                            "help_text": "Background color (hex code)",
+                            "required": False,
+                            "search_index": False,
+                        },
+                    ),
+                    29: (
+                        "wagtail.blocks.StructBlock",
+                        [
+                            [
+                                ("title", 24),
+                                ("text", 25),
+                                ("button_text", 26),
+                                ("button_link", 27),
+                                ("background_color", 28),
+                            ]
+                        ],
+                        {},
+                    ),
+                },
+                null=True,
+            ),
+        ),
+    ]
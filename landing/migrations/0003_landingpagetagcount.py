@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-18 16:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def count_tags(apps, schema_editor):
+    LandingPageTag = apps.get_model("landing", "LandingPageTag")
+    LandingPageTagCount = apps.get_model("landing", "LandingPageTagCount")
+
+    counts = (
+        LandingPageTag.objects.filter(content_object__live=True)
+        .values_list("tag_id")
+        .annotate(count=models.Count("content_object_id", distinct=True))
+    )
+    LandingPageTagCount.objects.bulk_create(
+        [LandingPageTagCount(tag_id=tag_id, live_pages=count) for tag_id, count in counts]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("landing", "0002_alter_landingpage_body"),
+        (
+            "taggit",
+            "0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LandingPageTagCount",
+            fields=[
+                (
+                    "tag",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="landing_page_count",
+                        serialize=False,
+                        to="taggit.tag",
+                    ),
+                ),
+                ("live_pages", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Landing Page Tag Count",
+                "verbose_name_plural": "Landing Page Tag Counts",
+            },
+        ),
+        migrations.RunPython(count_tags, migrations.RunPython.noop),
+    ]
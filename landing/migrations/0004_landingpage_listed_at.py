@@ -0,0 +1,52 @@
+# Generated by Django 5.0.14 on 2026-10-18 18:21
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+UNDATED = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def set_listed_at(apps, schema_editor):
+    LandingPage = apps.get_model("landing", "LandingPage")
+    Page = apps.get_model("wagtailcore", "Page")
+
+    dates = Page.objects.filter(id=OuterRef("page_ptr_id")).values(
+        listed_at=Coalesce("first_published_at", "latest_revision_created_at", Value(UNDATED))
+    )
+    LandingPage.objects.update(listed_at=Subquery(dates[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("landing", "0003_landingpagetagcount"),
+        (
+            "taggit",
+            "0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx",
+        ),
+        ("wagtailcore", "0094_alter_page_locale"),
+        ("wagtailimages", "0026_delete_uploadedimage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="landingpage",
+            name="listed_at",
+            field=models.DateTimeField(
+                default=datetime.datetime(
+                    1970, 1, 1, 0, 0, tzinfo=datetime.timezone.utc
+                ),
+                editable=False,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="landingpage",
+            index=models.Index(
+                fields=["-listed_at", "-page_ptr"], name="landing_page_listed_at_idx"
+            ),
+        ),
+        migrations.RunPython(set_listed_at, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
+from datetime import datetime, timezone
+
 from django.db import models
+from django.db.models import prefetch_related_objects
 from django.utils.translation import gettext_lazy as _
 
 from modelcluster.fields import ParentalKey
@@ -39,7 +42,7 @@ class HeroBlock(blocks.StructBlock):
 # Feature Block
 class FeatureBlock(blocks.StructBlock):
     """Feature with icon, title, and description."""
-    icon = blocks.CharBlock(required=False, help_text=_("Font Awesome icon class"))
+    icon = blocks.CharBlock(required=False, search_index=False, help_text=_("Font Awesome icon class"))
     title = blocks.CharBlock(required=True, help_text=_("Feature title"))
     description = blocks.TextBlock(required=True, help_text=_("Feature description"))
     
@@ -80,6 +83,16 @@ class TestimonialsBlock(blocks.StructBlock):
     """Section with multiple testimonials."""
     title = blocks.CharBlock(required=False, help_text=_("Section title"))
     testimonials = blocks.ListBlock(TestimonialBlock())
+
+    def get_context(self, value, parent_context=None):
+        context = super().get_context(value, parent_context=parent_context)
+        # Fetch the renditions of every author image in one query, rather
+        # than one query per testimonial
+        prefetch_related_objects(
+            [testimonial['image'] for testimonial in value['testimonials'] if testimonial['image']],
+            'renditions',
+        )
+        return context
     
     class Meta:
         template = 'landing/blocks/testimonials_block.html'
@@ -94,7 +107,7 @@ class CTABlock(blocks.StructBlock):
     text = blocks.TextBlock(required=False, help_text=_("CTA text"))
     button_text = blocks.CharBlock(required=True, help_text=_("Button text"))
     button_link = blocks.URLBlock(required=True, help_text=_("Button link"))
-    background_color = blocks.CharBlock(required=False, help_text=_("Background color (hex code)"))
+    background_color = blocks.CharBlock(required=False, search_index=False, help_text=_("Background color (hex code)"))
     
     class Meta:
         template = 'landing/blocks/cta_block.html'
@@ -114,6 +127,7 @@ class ContentBlock(blocks.StructBlock):
             ('right', _("Right")),
         ],
         default='right',
+        search_index=False,
         help_text=_("Position of the image")
     )
     
@@ -133,6 +147,26 @@ class LandingPageTag(TaggedItemBase):
     )
 
 
+# Number of live landing pages per tag
+class LandingPageTagCount(models.Model):
+    """Live landing pages per tag, kept up to date by landing.signals."""
+    tag = models.OneToOneField(
+        'taggit.Tag',
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='landing_page_count'
+    )
+    live_pages = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Landing Page Tag Count")
+        verbose_name_plural = _("Landing Page Tag Counts")
+
+
+# Listing date of live pages with no publishing dates at all
+UNDATED = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
 # Landing Page Model
 class LandingPage(Page):
     """Modular landing page model."""
@@ -160,14 +194,26 @@ class LandingPage(Page):
         help_text=_("Open Graph image (1200x630px recommended)")
     )
     tags = ClusterTaggableManager(through=LandingPageTag, blank=True)
+    # When the page was first published, for tag listings (see landing.tags).
+    # A column of its own, so the listings' order can be read from an index
+    listed_at = models.DateTimeField(default=UNDATED, editable=False)
     
-    # Search index configuration
+    # Search index configuration. On PostgreSQL each boost maps to one of the
+    # four tsvector weights (A-D), shared with every other indexed model:
+    # 10 (image and document titles) is A, 2 (Page titles) is B. Keep to
+    # these four values, or weights are assigned by range instead. Titles,
+    # descriptions and tag names are also indexed for prefix matching by the
+    # search autocomplete.
+    # The title field replaces the one inherited from Page.
     search_fields = Page.search_fields + [
-        index.SearchField('description'),
-        index.SearchField('body'),
+        index.SearchField('title', boost=10),
+        index.SearchField('description', boost=2),
+        index.AutocompleteField('description'),
         index.RelatedFields('tags', [
-            index.SearchField('name'),
+            index.SearchField('name', boost=1.5),
+            index.AutocompleteField('name'),
         ]),
+        index.SearchField('body', boost=1),
     ]
     
     # Editor panels configuration
@@ -180,11 +226,34 @@ class LandingPage(Page):
     promote_panels = Page.promote_panels + [
         FieldPanel('og_image'),
     ]
+
+    # Serve anonymous visitors from the page cache (see landing.page_cache)
+    cache_anonymous_responses = True
+
+    # Send ETag and Last-Modified, and answer revalidation with a 304 (see
+    # landing.conditional)
+    conditional_responses = True
     
     # Meta class
     class Meta:
         verbose_name = _("Landing Page")
         verbose_name_plural = _("Landing Pages")
+        indexes = [
+            models.Index(fields=['-listed_at', '-page_ptr'], name='landing_page_listed_at_idx'),
+        ]
+
+    def get_listed_at(self):
+        return self.first_published_at or self.latest_revision_created_at or UNDATED
+
+    def save(self, *args, **kwargs):
+        self.listed_at = self.get_listed_at()
+        # Saving a revision or publishing only saves the fields they change
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {
+            'first_published_at', 'latest_revision_created_at'
+        }.intersection(update_fields):
+            kwargs['update_fields'] = [*update_fields, 'listed_at']
+        return super().save(*args, **kwargs)
 
 
 # SEO Settings
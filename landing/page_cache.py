@@ -0,0 +1,187 @@
+"""
+Full-page response cache for Wagtail pages served to anonymous visitors.
+
+Page models opt in by setting ``cache_anonymous_responses = True``. The
+``before_serve_page`` hook in ``landing.wagtail_hooks`` marks requests for
+those pages, and ``PageCacheMiddleware`` stores their responses under the
+site, path and query string, skipping tracking parameters. Later requests
+for the same URL are answered before Wagtail resolves the route, with a
+``304 Not Modified`` if they match the ``ETag`` or ``Last-Modified`` of the
+stored response (see ``landing.conditional``).
+
+Each entry records the generation tokens of its page and its site at the
+time it was stored. Publishing, unpublishing, moving or deleting a page
+replaces the page's token, and saving the site's ``SEOSettings`` replaces
+the site's token, so stale entries are never served again without having
+to know every URL they were stored under. Tokens are random rather than
+counters, so a token evicted from the cache can't come back with a value
+that matches an old entry. They are ``landing.conditional`` version tokens,
+so the page's validators change with them too. Entries are also stored by
+release, so a deploy doesn't serve pages rendered with the old templates.
+
+The cache is only active when the ``PAGE_CACHE_ENABLED`` setting is true.
+"""
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from wagtail.models import Site
+
+from mysite.release import get_release_id
+
+from .conditional import new_version, respond_conditionally
+
+# How long a cached response is kept, in seconds
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Query parameters that never change the content of a page
+IGNORED_QUERY_PARAMS = ('utm_source', 'utm_medium', 'utm_campaign', 'utm_term',
+                        'utm_content', 'fbclid', 'gclid')
+
+PAGE_TOKEN_KEY = 'pagecache:page:%d'
+SITE_TOKEN_KEY = 'pagecache:site:%d'
+
+
+def is_enabled():
+    return getattr(settings, 'PAGE_CACHE_ENABLED', False)
+
+
+def _new_token():
+    return new_version()
+
+
+def get_tokens(page_id, site_id):
+    """Return the current ``(page token, site token)`` pair."""
+    keys = [PAGE_TOKEN_KEY % page_id, SITE_TOKEN_KEY % site_id]
+    tokens = cache.get_many(keys)
+    missing = {key: _new_token() for key in keys if key not in tokens}
+    if missing:
+        cache.set_many(missing, None)
+        tokens.update(missing)
+    return tokens[keys[0]], tokens[keys[1]]
+
+
+def purge_pages(page_ids):
+    """Invalidate every cached response of the given pages."""
+    cache.set_many({PAGE_TOKEN_KEY % page_id: _new_token() for page_id in page_ids}, None)
+
+
+def purge_site(site_id):
+    """Invalidate every cached response served from the given site."""
+    cache.set(SITE_TOKEN_KEY % site_id, _new_token(), None)
+
+
+def get_cache_key(request, site):
+    ignored = getattr(settings, 'PAGE_CACHE_IGNORED_QUERY_PARAMS', IGNORED_QUERY_PARAMS)
+    params = sorted(
+        (name, value)
+        for name, values in request.GET.lists() if name not in ignored
+        for value in values
+    )
+    url = '%s?%s' % (request.path, params)
+    return 'pagecache:response:%s:%d:%s' % (
+        get_release_id(), site.id, hashlib.sha1(url.encode('utf-8')).hexdigest()
+    )
+
+
+def request_is_cacheable(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Only look up the user (and so the session) if there is a session cookie
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return not request.user.is_authenticated
+    return True
+
+
+def response_is_cacheable(response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    cache_control = response.get('Cache-Control', '')
+    return not any(
+        directive in cache_control for directive in ('private', 'no-cache', 'no-store')
+    )
+
+
+def mark_request(request, page):
+    """
+    Mark a request as serving a page whose response may be cached.
+
+    The tokens are read before the page is rendered, so a publish that
+    happens while rendering leaves the stored entry stale rather than current.
+    """
+    site = Site.find_for_request(request)
+    if site is not None:
+        request.page_cache_entry = {
+            'page_id': page.id,
+            'tokens': get_tokens(page.id, site.id),
+        }
+
+
+class PageCacheMiddleware:
+    """
+    Serve anonymous requests for opted-in Wagtail pages from the page cache.
+
+    Must come after ``AuthenticationMiddleware``. Supports both sync and
+    async requests, so async views aren't moved to a thread under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not is_enabled():
+            return self.get_response(request)
+
+        cache_key, response = self.lookup(request)
+        if response is None:
+            response = self.get_response(request)
+            if cache_key is not None:
+                self.store(request, cache_key, response)
+        return response
+
+    async def __acall__(self, request):
+        if not is_enabled():
+            return await self.get_response(request)
+
+        cache_key, response = await sync_to_async(self.lookup)(request)
+        if response is None:
+            response = await self.get_response(request)
+            if cache_key is not None:
+                await sync_to_async(self.store)(request, cache_key, response)
+        return response
+
+    def lookup(self, request):
+        """
+        Return the cache key of the request, or None if it can't be cached,
+        and the cached response, or None if there is no current one.
+        """
+        if not request_is_cacheable(request):
+            return None, None
+
+        site = Site.find_for_request(request)
+        if site is None:
+            return None, None
+
+        cache_key = get_cache_key(request, site)
+        entry = cache.get(cache_key)
+        if entry is not None and entry['tokens'] == get_tokens(entry['page_id'], site.id):
+            request.page_cache_hit = True
+            # A visitor revalidating their own copy only needs a 304
+            return cache_key, respond_conditionally(request, entry['response'])
+        return cache_key, None
+
+    def store(self, request, cache_key, response):
+        entry = getattr(request, 'page_cache_entry', None)
+        if entry is not None and response_is_cacheable(response):
+            entry['response'] = response
+            timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', PAGE_CACHE_TIMEOUT)
+            cache.set(cache_key, entry, timeout)
@@ -0,0 +1,233 @@
+"""
+Static HTML export of published pages, served directly by nginx.
+
+Pages that opt into the anonymous page cache (``cache_anonymous_responses``)
+are rendered through the full middleware stack, exactly as an anonymous
+visitor would see them, and written to
+``STATIC_PAGES_ROOT/<hostname>/<url path>/index.html`` along with ``.gz``
+and (if the ``brotli`` package is installed) ``.br`` siblings. Files are
+written to a temporary name and renamed into place, so nginx never serves a
+partially written page. Like the page cache, responses that set cookies or
+are marked private or ``no-store`` aren't exported, as they are meant for a
+single visitor.
+
+The signal handlers in ``landing.signals`` export a page when it is
+published and remove it when it stops being servable; the
+``export_static_pages`` management command exports every page. Saving a
+site's ``SEOSettings`` changes every page of the site, so its pages are
+exported again by ``start_site_export()``, in a background thread unless
+``STATIC_PAGES_EXPORT_IN_BACKGROUND`` is false. nginx keeps serving the old
+files until each is replaced. Nothing is written unless the
+``STATIC_PAGES_ENABLED`` setting is true.
+"""
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.db import connections
+from django.core.handlers.wsgi import WSGIRequest
+
+from wagtail.models import Page, Site
+
+from . import page_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def is_enabled():
+    return getattr(settings, 'STATIC_PAGES_ENABLED', False)
+
+
+def get_root():
+    return getattr(settings, 'STATIC_PAGES_ROOT', os.path.join(settings.BASE_DIR, 'prerendered'))
+
+
+def is_exportable(page):
+    """Return whether the page renders the same HTML for every anonymous visitor."""
+    page = page.specific
+    return (
+        getattr(page, 'cache_anonymous_responses', False)
+        and page.live
+        and not page.get_view_restrictions().exists()
+    )
+
+
+def get_page_location(page):
+    """
+    Return the ``(site, page_path)`` a page is served at, or None. Only the
+    page's ``url_path`` is used, so this also works for deleted pages.
+    """
+    url_parts = page.get_url_parts()
+    if url_parts is None or url_parts[2] is None:
+        return None
+    site_id, root_url, page_path = url_parts
+    return Site.objects.get(id=site_id), page_path
+
+
+def get_directory(site, page_path):
+    """Return the directory holding the exported files for a URL path."""
+    return os.path.join(get_root(), site.hostname, *page_path.strip('/').split('/'))
+
+
+def _write_atomic(path, content):
+    directory = os.path.dirname(path)
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+        f.write(content)
+    os.chmod(f.name, 0o644)
+    os.replace(f.name, path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class PageRenderer:
+    """Render pages through the full middleware stack as an anonymous visitor."""
+
+    def __init__(self):
+        self.handler = BaseHandler()
+        self.handler.load_middleware()
+
+    def render(self, site, page_path):
+        if getattr(settings, 'SECURE_SSL_REDIRECT', False) or site.port == 443:
+            scheme = 'https'
+        else:
+            scheme = 'http'
+        http_host = site.hostname
+        if site.port not in (80, 443):
+            http_host = '%s:%d' % (http_host, site.port)
+
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': page_path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': '',
+            'SERVER_NAME': site.hostname,
+            'SERVER_PORT': str(site.port),
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': http_host,
+            'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scheme,
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        })
+        return self.handler.get_response(request)
+
+
+def export_page(page, renderer=None):
+    """
+    Write the static files for a page, or remove them if it can't be
+    exported. Return whether files were written.
+    """
+    location = get_page_location(page)
+    if location is None:
+        return False
+    site, page_path = location
+
+    if not is_exportable(page):
+        remove_page_files(site, page_path)
+        return False
+
+    response = (renderer or PageRenderer()).render(site, page_path)
+    # nginx serves the file to every visitor, so only export what the page
+    # cache would share between them too
+    if not page_cache.response_is_cacheable(response):
+        logger.warning(
+            "Not exporting %s: got status %d, Cache-Control %r, cookies %s",
+            page_path, response.status_code, response.get('Cache-Control', ''),
+            sorted(response.cookies),
+        )
+        remove_page_files(site, page_path)
+        return False
+
+    directory = get_directory(site, page_path)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, 'index.html')
+    content = response.content
+
+    # Write the compressed siblings first, so the page never appears
+    # without them
+    if brotli is not None:
+        _write_atomic(path + '.br', brotli.compress(content))
+    _write_atomic(path + '.gz', gzip.compress(content, mtime=0))
+    _write_atomic(path, content)
+    return True
+
+
+def remove_page_files(site, page_path):
+    """Remove the exported files of a single page, leaving its descendants."""
+    path = os.path.join(get_directory(site, page_path), 'index.html')
+    for suffix in ('', '.gz', '.br'):
+        _remove(path + suffix)
+
+
+def remove_subtree(url_path):
+    """Remove the exported files of the page at ``url_path`` and its descendants."""
+    location = get_page_location(Page(url_path=url_path))
+    if location is not None:
+        shutil.rmtree(get_directory(*location), ignore_errors=True)
+
+
+def remove_site(site):
+    """Remove every exported page of a site."""
+    shutil.rmtree(os.path.join(get_root(), site.hostname), ignore_errors=True)
+
+
+def export_site(site, renderer=None, should_stop=None):
+    """
+    Export every live page of a site, until ``should_stop()`` returns true.
+    Return the numbers of pages exported and skipped.
+    """
+    renderer = renderer or PageRenderer()
+    exported = skipped = 0
+    pages = Page.objects.live().descendant_of(site.root_page, inclusive=True)
+    for page in pages.specific().iterator(chunk_size=100):
+        if should_stop is not None and should_stop():
+            break
+        if export_page(page, renderer=renderer):
+            exported += 1
+        else:
+            skipped += 1
+    return exported, skipped
+
+
+def start_site_export(site, should_stop=None):
+    """Export every page of a site again, in the background by default."""
+    def export():
+        try:
+            exported, skipped = export_site(site, should_stop=should_stop)
+        except Exception:
+            # Pages not exported yet keep their old files until the next export
+            logger.exception("Failed to export the static pages of %s", site.hostname)
+        else:
+            logger.info("Exported %d pages (%d skipped) of %s", exported, skipped, site.hostname)
+
+    if not getattr(settings, 'STATIC_PAGES_EXPORT_IN_BACKGROUND', True):
+        export()
+        return
+
+    def run():
+        try:
+            export()
+        finally:
+            connections.close_all()
+
+    threading.Thread(target=run, name='export-site-%d' % site.id, daemon=True).start()
@@ -0,0 +1,154 @@
+"""
+Ahead-of-time generation of the image renditions pages need.
+
+Templates create renditions lazily, so without this the first visitor after
+a publish waits for every image on the page to be decoded and resized. The
+filter specs each block template uses are listed in ``BLOCK_RENDITION_FILTERS``
+(keep them in sync with the templates in ``landing/templates/landing/blocks``).
+``get_page_renditions`` walks a page's ``body`` for images, adds ``og_image``
+and the site's ``SEOSettings.default_og_image``, and returns the renditions
+to create per image.
+
+When a page is published its renditions are created in a background thread;
+the ``pregenerate_renditions`` management command backfills every live page
+using a process pool.
+"""
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.db import connection, connections
+
+from wagtail import blocks
+from wagtail.images import get_image_model
+from wagtail.images.blocks import ImageChooserBlock
+from wagtail.images.models import Filter
+
+from .models import ContentBlock, HeroBlock, SEOSettings, TestimonialBlock
+from .seo import OG_IMAGE_FILTER
+
+logger = logging.getLogger(__name__)
+
+# Filter specs used by each block template, by block class and child name.
+# Brace expansions are written as in the templates' {% picture %} tags.
+BLOCK_RENDITION_FILTERS = {
+    HeroBlock: {
+        'background_image': Filter.expand_spec(
+            'width-{640,1024,1600,2400} format-{avif,webp,jpeg}'
+        ),
+    },
+    ContentBlock: {
+        'image': Filter.expand_spec('width-{300,600,1200} format-{avif,webp,jpeg}'),
+    },
+    TestimonialBlock: {
+        'image': Filter.expand_spec('fill-{100x100,200x200} format-{avif,webp,jpeg}'),
+    },
+}
+
+# Filter specs used for Open Graph / Twitter images in landing_page.html
+OG_IMAGE_FILTERS = (OG_IMAGE_FILTER,)
+
+
+def _collect_block_images(block, value, renditions):
+    if value is None:
+        return
+
+    if isinstance(block, blocks.StreamBlock):
+        for child in value:
+            _collect_block_images(child.block, child.value, renditions)
+    elif isinstance(block, blocks.ListBlock):
+        for item in value:
+            _collect_block_images(block.child_block, item, renditions)
+    elif isinstance(block, blocks.StructBlock):
+        filters = BLOCK_RENDITION_FILTERS.get(type(block), {})
+        for name, child_block in block.child_blocks.items():
+            child_value = value.get(name)
+            if isinstance(child_block, ImageChooserBlock):
+                if child_value is not None and name in filters:
+                    renditions[child_value.id].update(filters[name])
+            else:
+                _collect_block_images(child_block, child_value, renditions)
+
+
+def get_page_renditions(page):
+    """Return the filter specs a page needs, as a dict of sets keyed by image id."""
+    page = page.specific
+    renditions = defaultdict(set)
+
+    body = getattr(page, 'body', None)
+    if body is not None and hasattr(body, 'stream_block'):
+        _collect_block_images(body.stream_block, body, renditions)
+
+    if getattr(page, 'og_image_id', None):
+        renditions[page.og_image_id].update(OG_IMAGE_FILTERS)
+    else:
+        site = page.get_site()
+        if site is not None:
+            # SEOSettings.for_site() would create the settings if missing
+            default_og_image_id = SEOSettings.objects.filter(site=site).values_list(
+                'default_og_image_id', flat=True
+            ).first()
+            if default_og_image_id:
+                renditions[default_og_image_id].update(OG_IMAGE_FILTERS)
+
+    return renditions
+
+
+def generate_renditions(image_id, filter_specs):
+    """Create any missing renditions of an image. Return how many were requested."""
+    try:
+        image = get_image_model().objects.get(id=image_id)
+    except get_image_model().DoesNotExist:
+        return 0
+    image.get_renditions(*sorted(filter_specs))
+    return len(filter_specs)
+
+
+def _generate_in_background(renditions):
+    try:
+        for image_id, filter_specs in renditions.items():
+            generate_renditions(image_id, filter_specs)
+    except Exception:
+        logger.exception("Failed to pre-generate renditions")
+    finally:
+        connection.close()
+
+
+def pregenerate_page_renditions(page):
+    """Create the renditions a page needs in a background thread."""
+    renditions = get_page_renditions(page)
+    if renditions:
+        threading.Thread(
+            target=_generate_in_background, args=(dict(renditions),), daemon=True
+        ).start()
+
+
+def _init_worker():
+    # Only needed when workers are spawned rather than forked
+    if not apps.ready:
+        django.setup()
+
+
+def _generate_job(job):
+    return generate_renditions(*job)
+
+
+def generate_in_pool(renditions, workers):
+    """
+    Create the renditions for a dict of filter specs keyed by image id using
+    a pool of worker processes. Yield the number of renditions requested as
+    each image is done.
+    """
+    jobs = list(renditions.items())
+    if workers <= 1:
+        for job in jobs:
+            yield _generate_job(job)
+        return
+
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        yield from executor.map(_generate_job, jobs, chunksize=8)
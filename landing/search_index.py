@@ -0,0 +1,108 @@
+"""
+Batched, parallel rebuild of the search index.
+
+``update_index`` indexes one chunk at a time in a single process, and the
+slow part is flattening every ``body`` StreamField into text. The
+``rebuild_search_index`` command instead streams the ids of each indexed
+model in id order, hands batches of ids to a pool of worker processes and
+lets each worker load its batch, flatten it and bulk-write the index entries
+with the backend's ``add_bulk``.
+
+Entries are written in place, so the index keeps answering searches during
+the rebuild and a rebuild can be stopped and resumed. After every batch that
+completes in order, the last indexed id of the model is written to a JSON
+checkpoint file; with ``--resume`` the command skips everything up to it.
+"""
+import json
+import multiprocessing
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+
+from wagtail.search.backends import get_search_backend
+
+# Number of objects loaded and indexed per batch
+BATCH_SIZE = 500
+
+
+def get_model_label(model):
+    return model._meta.label
+
+
+def iter_id_batches(model, batch_size=BATCH_SIZE, after_id=None):
+    """
+    Yield the primary keys of a model's indexed objects in id order, as
+    lists of at most ``batch_size``. Only the ids are read, one batch per
+    query, starting after ``after_id``.
+    """
+    ids = model.get_indexed_objects().order_by('pk').values_list('pk', flat=True)
+    while True:
+        batch = ids if after_id is None else ids.filter(pk__gt=after_id)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+        yield batch
+        after_id = batch[-1]
+
+
+def index_batch(job):
+    """Load, flatten and index a batch of objects. Return ``(last id, count)``."""
+    backend_name, model_label, ids = job
+    model = apps.get_model(model_label)
+    objects = list(model.get_indexed_objects().filter(pk__in=ids))
+    if objects:
+        get_search_backend(backend_name).add_bulk(model, objects)
+    return ids[-1], len(objects)
+
+
+def _init_worker():
+    django.setup()
+
+
+def index_in_pool(jobs, workers):
+    """
+    Index batches of objects using a pool of worker processes. Yield the
+    result of each job in the order the jobs were given.
+
+    Only a few jobs per worker are queued at a time, so ``jobs`` can be a
+    generator reading ids from the database as it goes.
+    """
+    if workers <= 1:
+        for job in jobs:
+            yield index_batch(job)
+        return
+
+    # Workers are spawned rather than forked: the parent keeps reading ids
+    # while workers start, and a forked worker would share its connection
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+    ) as executor:
+        pending = deque()
+        for job in jobs:
+            pending.append(executor.submit(index_batch, job))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def load_checkpoint(path):
+    """Return the last indexed id per ``"<backend>:<model label>"``."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path, checkpoint):
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as f:
+        json.dump(checkpoint, f)
+    os.replace(f.name, path)
@@ -0,0 +1,98 @@
+"""
+Per-site snapshots of ``SEOSettings`` for rendering page heads.
+
+Templates read the SEO settings of the current site many times per render,
+and the default Open Graph image needs an image and a rendition query on
+top. ``get_seo_settings`` resolves all of it once per site into an
+immutable ``SEOSettingsSnapshot``, including the absolute URL of the
+default OG image, and keeps it in a process-level dict.
+
+Each snapshot is tagged with the site's version token from the shared
+cache, so a snapshot held by another process is dropped as soon as the
+settings change there. Saving the settings (or deleting their default OG
+image) replaces the token through the signal handlers in
+``landing.signals``. Serving a snapshot costs a single cache lookup and no
+queries. Tokens record when they were made (see ``landing.conditional``), so
+the version also dates the site's responses for conditional requests.
+
+The ``landing.context_processors.seo_settings`` context processor makes the
+current site's snapshot available to templates as ``seo_settings``.
+"""
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+from .conditional import new_version
+from .models import SEOSettings
+
+VERSION_CACHE_KEY = 'seo-settings:version:%d'
+
+# Filter spec of the rendition used for og:image and twitter:image
+OG_IMAGE_FILTER = 'original'
+
+# Snapshots held by this process, as (version, snapshot) keyed by site id
+_snapshots = {}
+
+
+@dataclass(frozen=True)
+class SEOSettingsSnapshot:
+    google_analytics_id: str = ''
+    google_site_verification: str = ''
+    bing_site_verification: str = ''
+    site_description: str = ''
+    twitter_site: str = ''
+    facebook_app_id: str = ''
+    default_og_image_url: str = ''
+
+
+def get_version(site_id):
+    version = cache.get(VERSION_CACHE_KEY % site_id)
+    if version is None:
+        version = new_version()
+        # Another process may have stored a version in the meantime
+        if not cache.add(VERSION_CACHE_KEY % site_id, version, None):
+            version = cache.get(VERSION_CACHE_KEY % site_id, version)
+    return version
+
+
+def invalidate(site_id):
+    """Make every process rebuild the snapshot of a site on next use."""
+    cache.set(VERSION_CACHE_KEY % site_id, new_version(), None)
+
+
+def build_snapshot(site):
+    """Read a site's SEO settings from the database into a snapshot."""
+    # SEOSettings.for_site() would create the settings if missing
+    seo_settings = SEOSettings.objects.filter(site=site).select_related(
+        'default_og_image'
+    ).first()
+    if seo_settings is None:
+        return SEOSettingsSnapshot()
+
+    default_og_image_url = ''
+    if seo_settings.default_og_image is not None:
+        url = seo_settings.default_og_image.get_rendition(OG_IMAGE_FILTER).url
+        # Renditions on remote storage already have absolute URLs
+        default_og_image_url = site.root_url + url if url.startswith('/') else url
+
+    return SEOSettingsSnapshot(
+        google_analytics_id=seo_settings.google_analytics_id,
+        google_site_verification=seo_settings.google_site_verification,
+        bing_site_verification=seo_settings.bing_site_verification,
+        site_description=seo_settings.site_description,
+        twitter_site=seo_settings.twitter_site,
+        facebook_app_id=seo_settings.facebook_app_id,
+        default_og_image_url=default_og_image_url,
+    )
+
+
+def get_seo_settings(site):
+    """Return the snapshot of a site's SEO settings, building it if stale."""
+    version = get_version(site.id)
+    cached = _snapshots.get(site.id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    snapshot = build_snapshot(site)
+    _snapshots[site.id] = (version, snapshot)
+    return snapshot
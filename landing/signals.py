@@ -0,0 +1,185 @@
+import logging
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from wagtail.images import get_image_model
+from wagtail.models import Page, PageViewRestriction, ReferenceIndex, Site
+from wagtail.signals import (
+    page_published, page_slug_changed, page_unpublished, post_page_move
+)
+
+from . import page_cache, prerender, renditions, seo, sitemaps, tags
+from .models import LandingPageTag, SEOSettings
+
+logger = logging.getLogger(__name__)
+
+
+def get_subtree_ids(page):
+    return list(Page.objects.descendant_of(page, inclusive=True).values_list('id', flat=True))
+
+
+def get_image_page_ids(image):
+    """Return the ids of the pages using an image, from Wagtail's reference index."""
+    references = ReferenceIndex.get_references_to(image).filter(
+        base_content_type=ContentType.objects.get_for_model(Page)
+    )
+    return sorted({int(object_id) for object_id in references.values_list('object_id', flat=True)})
+
+
+def export_static_page(page):
+    if not prerender.is_enabled():
+        return
+    try:
+        prerender.export_page(page)
+    except Exception:
+        # A failed export leaves nginx serving the old file until the next
+        # export, which is better than failing the publish
+        logger.exception("Failed to export static page %s", page.url_path)
+
+
+def pregenerate_renditions(page):
+    try:
+        renditions.pregenerate_page_renditions(page)
+    except Exception:
+        logger.exception("Failed to pre-generate renditions for %s", page.url_path)
+
+
+# Sitemap, page cache, renditions and static pages
+# All are updated once the change has been committed, so nothing is rebuilt
+# from data other requests can't see yet.
+
+@receiver(page_published)
+def page_published_handler(sender, instance, **kwargs):
+    def update():
+        sitemaps.update_pages([instance.id])
+        page_cache.purge_pages([instance.id])
+        pregenerate_renditions(instance)
+        export_static_page(instance)
+
+    transaction.on_commit(update)
+
+
+@receiver(page_unpublished)
+def page_unpublished_handler(sender, instance, **kwargs):
+    def update():
+        sitemaps.update_pages([instance.id])
+        page_cache.purge_pages([instance.id])
+        tags.update_tag_counts(tags.get_page_tag_ids(instance.id))
+        export_static_page(instance)
+
+    transaction.on_commit(update)
+
+
+@receiver(page_slug_changed)
+@receiver(post_page_move)
+def page_url_changed(sender, instance, **kwargs):
+    if 'instance_before' in kwargs:
+        old_url_path = kwargs['instance_before'].url_path
+    else:
+        old_url_path = kwargs['url_path_before']
+
+    # The URLs of every descendant change along with the page's own
+    def update():
+        sitemaps.update_subtree(instance)
+        page_cache.purge_pages(get_subtree_ids(instance))
+        if prerender.is_enabled():
+            # Descendants are served by Wagtail until they are exported again
+            prerender.remove_subtree(old_url_path)
+            export_static_page(instance)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender=PageViewRestriction)
+@receiver(post_delete, sender=PageViewRestriction)
+def page_restriction_changed(sender, instance, **kwargs):
+    page_id = instance.page_id
+
+    def update():
+        # The page may have been deleted along with its restriction
+        page = Page.objects.filter(id=page_id).first()
+        if page:
+            sitemaps.update_subtree(page)
+            page_cache.purge_pages(get_subtree_ids(page))
+            if prerender.is_enabled():
+                prerender.remove_subtree(page.url_path)
+                export_static_page(page)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_delete, sender=Page)
+def page_deleted(sender, instance, **kwargs):
+    # The instance loses its id once the delete has gone through
+    page_id = instance.id
+    url_path = instance.url_path
+
+    def update():
+        sitemaps.remove_pages([page_id])
+        page_cache.purge_pages([page_id])
+        if prerender.is_enabled():
+            prerender.remove_subtree(url_path)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender=LandingPageTag)
+@receiver(post_delete, sender=LandingPageTag)
+def landing_page_tag_changed(sender, instance, **kwargs):
+    # Tags are saved again whenever a page is published, and removed tags
+    # (including those of deleted pages) are deleted one by one
+    tag_id = instance.tag_id
+    transaction.on_commit(lambda: tags.update_tag_counts([tag_id]))
+
+
+def refresh_site(site):
+    """Drop everything that shows a site's SEO settings."""
+    seo.invalidate(site.id)
+    page_cache.purge_site(site.id)
+    if prerender.is_enabled():
+        # Every page of the site shows the settings, so export them again.
+        # A later change starts its own export, which supersedes this one
+        version = seo.get_version(site.id)
+        prerender.start_site_export(
+            site, should_stop=lambda: seo.get_version(site.id) != version
+        )
+
+
+@receiver(post_save, sender=SEOSettings)
+def seo_settings_changed(sender, instance, **kwargs):
+    site = instance.site
+    transaction.on_commit(lambda: refresh_site(site))
+
+
+def refresh_image_users(image):
+    """Drop everything that shows an image, once the change is committed."""
+    # Looked up now, as the references to a deleted image go along with it
+    page_ids = get_image_page_ids(image)
+    sites = list(Site.objects.filter(seosettings__default_og_image=image))
+
+    def update():
+        # Cached blocks are keyed by the image already, but cached pages and
+        # page validators only change along with the page's token
+        page_cache.purge_pages(page_ids)
+        for site in sites:
+            refresh_site(site)
+
+    if page_ids or sites:
+        transaction.on_commit(update)
+
+
+@receiver(post_save, sender=get_image_model())
+def image_saved(sender, instance, created, **kwargs):
+    # Such as a new file or focal point. Nothing uses a new image yet
+    if not created:
+        refresh_image_users(instance)
+
+
+@receiver(pre_delete, sender=get_image_model())
+def image_deleted(sender, instance, **kwargs):
+    # Settings using the image as their default OG image are cleared without
+    # being saved, so look them up before the delete goes through
+    refresh_image_users(instance)
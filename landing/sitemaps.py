@@ -0,0 +1,373 @@
+"""
+Sitemap generation for all live, public pages.
+
+The sitemap is split into shards of at most ``SITEMAP_URLS_PER_SHARD`` URLs
+(50,000 by default, the limit set by the sitemap protocol). A page belongs to
+shard ``page.id // shard_size``, so shard membership never changes when other
+pages are added or removed. ``/sitemap.xml`` is a sitemap index pointing at
+``/sitemap-<n>.xml`` for every shard.
+
+The rendered ``<url>`` entries of each shard are kept in the cache with no
+expiry. Signal handlers in ``landing.signals`` patch the entries of the
+pages that changed, so the views only ever read from the cache. A shard that
+is not cached yet (e.g. after a cache flush) is built on its own by reading
+its pages in path-ordered chunks, so memory use does not grow with the size
+of the tree.
+
+Patches take a per-shard lock in the cache, so two publishes landing in the
+same shard at once can't overwrite each other's changes. A writer that
+can't get the lock in time drops the shard instead, to be rebuilt on the
+next read.
+
+Each shard also has a version token, replaced whenever its pages change
+(whether or not its entries are cached), which the view sends as the
+shard's ``ETag`` and ``Last-Modified`` so crawlers can revalidate it.
+"""
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.urls import NoReverseMatch, reverse
+from django.utils.html import escape
+
+from wagtail.models import Page, Site
+
+from .conditional import new_version
+
+# Maximum number of URLs a single sitemap file may contain
+SITEMAP_MAX_URLS = 50000
+
+# Number of pages fetched from the database per query while streaming
+SITEMAP_CHUNK_SIZE = 2000
+
+SITEMAP_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+SITEMAP_FOOTER = '</urlset>\n'
+
+# Number of entries sent per chunk of a streamed shard
+SITEMAP_STREAM_BATCH_SIZE = 500
+
+# Page fields read when building sitemap entries
+SITEMAP_PAGE_FIELDS = ('id', 'path', 'url_path', 'depth', 'last_published_at')
+
+SHARD_COUNT_CACHE_KEY = 'sitemap:shard-count'
+SHARD_CACHE_KEY = 'sitemap:shard:%d'
+SHARD_VERSION_CACHE_KEY = 'sitemap:shard-version:%d'
+SHARD_LOCK_KEY = 'sitemap:shard-lock:%d'
+
+# Seconds a shard's lock is held at most, and waited for at most
+SHARD_LOCK_TIMEOUT = 30
+SHARD_LOCK_WAIT = 10
+
+
+def get_shard_size():
+    """Return the number of URLs per sitemap shard."""
+    size = getattr(settings, 'SITEMAP_URLS_PER_SHARD', SITEMAP_MAX_URLS)
+    return max(1, min(size, SITEMAP_MAX_URLS))
+
+
+def get_sitemap_pages():
+    """Return the queryset of pages listed in the sitemap."""
+    return Page.objects.live().public().filter(
+        depth__gt=1  # Exclude root page
+    )
+
+
+def count_shards():
+    """Return the number of sitemap shards needed to cover every page."""
+    max_id = get_sitemap_pages().aggregate(max_id=Max('id'))['max_id']
+    if max_id is None:
+        return 0
+    return max_id // get_shard_size() + 1
+
+
+def get_shard_count():
+    """Return the number of sitemap shards, from the cache where possible."""
+    shard_count = cache.get(SHARD_COUNT_CACHE_KEY)
+    if shard_count is None:
+        shard_count = count_shards()
+        cache.set(SHARD_COUNT_CACHE_KEY, shard_count, None)
+    return shard_count
+
+
+async def aget_shard_count():
+    """Async version of ``get_shard_count``, only touching the database on a miss."""
+    shard_count = await cache.aget(SHARD_COUNT_CACHE_KEY)
+    if shard_count is None:
+        shard_count = await sync_to_async(get_shard_count)()
+    return shard_count
+
+
+def iter_shard_pages(shard, chunk_size=SITEMAP_CHUNK_SIZE):
+    """
+    Yield the pages in the given shard in path order, as dicts holding only
+    the fields needed for their sitemap entries.
+
+    Pages are fetched ``chunk_size`` at a time using the last path seen as
+    the starting point for the next query, so no more than one chunk is held
+    in memory and deep chunks cost the same as the first.
+    """
+    shard_size = get_shard_size()
+    pages = get_sitemap_pages().filter(
+        id__gte=shard * shard_size,
+        id__lt=(shard + 1) * shard_size,
+    ).order_by('path').values(*SITEMAP_PAGE_FIELDS)
+
+    last_path = None
+    while True:
+        chunk = pages if last_path is None else pages.filter(path__gt=last_path)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_path = chunk[-1]['path']
+
+
+class PageURLResolver:
+    """
+    Build full page URLs from ``url_path`` alone.
+
+    ``Page.get_full_url`` looks up the site root paths and reverses the
+    ``wagtail_serve`` URL for every page. This does both once, so resolving a
+    page is a prefix check against each site's root path plus string
+    concatenation. Like ``get_full_url`` without a request, the most specific
+    site containing the page wins. Internationalised URLs are not supported.
+    """
+
+    def __init__(self):
+        self.site_root_paths = Site.get_site_root_paths()
+        try:
+            self.serve_prefix = reverse('wagtail_serve', args=('',))
+        except NoReverseMatch:
+            # Wagtail pages are not served, so nothing is routable
+            self.site_root_paths = []
+        self.append_slash = getattr(settings, 'WAGTAIL_APPEND_SLASH', True)
+
+    def get_full_url(self, url_path):
+        """Return the full URL for a page's url_path, or None if not routable."""
+        for site_id, root_path, root_url, language_code in self.site_root_paths:
+            if url_path.startswith(root_path):
+                page_path = self.serve_prefix + url_path[len(root_path):]
+                if not self.append_slash and page_path != '/':
+                    page_path = page_path.rstrip('/')
+                return root_url + page_path
+        return None
+
+
+def render_url(full_url, last_published_at, depth):
+    """Render a single ``<url>`` entry."""
+    entry = '    <url>\n        <loc>%s</loc>\n' % escape(full_url)
+    if last_published_at:
+        entry += '        <lastmod>%s</lastmod>\n' % last_published_at.strftime('%Y-%m-%d')
+    entry += '        <changefreq>weekly</changefreq>\n'
+    entry += '        <priority>%s</priority>\n' % ('1.0' if depth == 2 else '0.8')
+    entry += '    </url>\n'
+    return entry
+
+
+def get_page_entry(page, resolver):
+    """
+    Return the cached form of a page's sitemap entry as a ``(path, xml)``
+    tuple, or None if the page cannot be served from any site.
+    """
+    full_url = resolver.get_full_url(page['url_path'])
+    if not full_url:
+        return None
+    return page['path'], render_url(full_url, page['last_published_at'], page['depth'])
+
+
+def build_shard_entries(shard):
+    """Build the entries of a shard from the database, keyed by page id."""
+    resolver = PageURLResolver()
+    entries = {}
+    for page in iter_shard_pages(shard):
+        entry = get_page_entry(page, resolver)
+        if entry:
+            entries[page['id']] = entry
+    return entries
+
+
+def get_shard_entries(shard):
+    """Return the entries of a shard, building them only if not cached."""
+    entries = cache.get(SHARD_CACHE_KEY % shard)
+    if entries is None:
+        version = get_shard_version(shard)
+        entries = build_shard_entries(shard)
+        # Pages that changed while building may have been read before the
+        # change, so only store entries nothing has touched since
+        if get_shard_version(shard) == version:
+            # Don't overwrite entries a signal handler stored in the meantime
+            cache.add(SHARD_CACHE_KEY % shard, entries, None)
+    return entries
+
+
+def get_shard_version(shard):
+    """Return the version token of a shard, which changes with its entries."""
+    version = cache.get(SHARD_VERSION_CACHE_KEY % shard)
+    if version is None:
+        version = new_version()
+        # Another process may have stored a version in the meantime
+        if not cache.add(SHARD_VERSION_CACHE_KEY % shard, version, None):
+            version = cache.get(SHARD_VERSION_CACHE_KEY % shard, version)
+    return version
+
+
+async def aget_shard_version(shard):
+    """Async version of ``get_shard_version``."""
+    version = await cache.aget(SHARD_VERSION_CACHE_KEY % shard)
+    if version is None:
+        version = await sync_to_async(get_shard_version)(shard)
+    return version
+
+
+def touch_shards(shards):
+    """
+    Give the shards new versions. Called after their entries are stored, so a
+    version is never sent with entries older than it.
+    """
+    cache.set_many({SHARD_VERSION_CACHE_KEY % shard: new_version() for shard in shards}, None)
+
+
+@contextmanager
+def lock_shard(shard):
+    """
+    Hold the lock of a shard while patching its cached entries, waiting up to
+    ``SHARD_LOCK_WAIT`` seconds for it. Yield whether the lock was acquired.
+    """
+    key = SHARD_LOCK_KEY % shard
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + SHARD_LOCK_WAIT
+    acquired = cache.add(key, token, SHARD_LOCK_TIMEOUT)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.05)
+        acquired = cache.add(key, token, SHARD_LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        # Only release the lock if it didn't expire and go to another writer
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
+
+
+def patch_shard(shard, page_ids, get_entries):
+    """
+    Replace the cached entries of ``page_ids`` in a shard with those returned
+    by ``get_entries()``, which is called under the shard's lock.
+    """
+    key = SHARD_CACHE_KEY % shard
+    with lock_shard(shard) as locked:
+        if not locked:
+            # Rather than risk losing another writer's changes, have the
+            # shard rebuilt on its next read
+            cache.delete(key)
+            return
+        entries = cache.get(key)
+        if entries is None:
+            return
+        for page_id in page_ids:
+            entries.pop(page_id, None)
+        entries.update(get_entries())
+        cache.set(key, entries, None)
+
+
+def group_by_shard(page_ids):
+    """Group page ids into a dict of sets keyed by shard number."""
+    shard_size = get_shard_size()
+    ids_by_shard = defaultdict(set)
+    for page_id in page_ids:
+        ids_by_shard[page_id // shard_size].add(page_id)
+    return ids_by_shard
+
+
+def update_pages(page_ids):
+    """
+    Refresh the cached sitemap entries of the given pages.
+
+    Only the shards containing the pages are touched. Pages that are no longer
+    live or public are removed. Shards that are not cached are left alone,
+    as they will pick up the change when they are next built.
+    """
+    resolver = PageURLResolver()
+    ids_by_shard = group_by_shard(page_ids)
+    for shard, ids in ids_by_shard.items():
+        if not cache.has_key(SHARD_CACHE_KEY % shard):
+            continue
+
+        # Read under the lock, so a later writer also reads later data
+        def get_entries():
+            entries = {}
+            for page in get_sitemap_pages().filter(id__in=ids).values(*SITEMAP_PAGE_FIELDS):
+                entry = get_page_entry(page, resolver)
+                if entry:
+                    entries[page['id']] = entry
+            return entries
+
+        patch_shard(shard, ids, get_entries)
+    # Uncached shards change too, once they are built again
+    touch_shards(ids_by_shard)
+
+    if ids_by_shard:
+        shard_count = cache.get(SHARD_COUNT_CACHE_KEY)
+        if shard_count is not None and max(ids_by_shard) >= shard_count:
+            cache.set(SHARD_COUNT_CACHE_KEY, max(ids_by_shard) + 1, None)
+
+
+def update_subtree(page, chunk_size=SITEMAP_CHUNK_SIZE):
+    """Refresh the cached sitemap entries of a page and all its descendants."""
+    page_ids = Page.objects.descendant_of(page, inclusive=True).values_list('id', flat=True)
+
+    chunk = []
+    for page_id in page_ids.iterator(chunk_size=chunk_size):
+        chunk.append(page_id)
+        if len(chunk) == chunk_size:
+            update_pages(chunk)
+            chunk = []
+    update_pages(chunk)
+
+
+def remove_pages(page_ids):
+    """Remove the given pages from the cached sitemap entries."""
+    ids_by_shard = group_by_shard(page_ids)
+    for shard, ids in ids_by_shard.items():
+        if cache.has_key(SHARD_CACHE_KEY % shard):
+            patch_shard(shard, ids, dict)
+    touch_shards(ids_by_shard)
+
+
+async def aget_shard_entries(shard):
+    """Async version of ``get_shard_entries``, only touching the database on a miss."""
+    entries = await cache.aget(SHARD_CACHE_KEY % shard)
+    if entries is None:
+        entries = await sync_to_async(get_shard_entries)(shard)
+    return entries
+
+
+def stream_shard(shard):
+    """
+    Yield the XML for the given shard, ``SITEMAP_STREAM_BATCH_SIZE`` entries
+    at a time, for WSGI servers to send as it is produced.
+    """
+    yield SITEMAP_HEADER
+    yield from _iter_batches(get_shard_entries(shard))
+    yield SITEMAP_FOOTER
+
+
+async def astream_shard(shard):
+    """Async version of ``stream_shard``, which doesn't block the event loop."""
+    yield SITEMAP_HEADER
+    for batch in _iter_batches(await aget_shard_entries(shard)):
+        yield batch
+    yield SITEMAP_FOOTER
+
+
+def _iter_batches(entries):
+    entries = [entry for path, entry in sorted(entries.values())]
+    for start in range(0, len(entries), SITEMAP_STREAM_BATCH_SIZE):
+        yield ''.join(entries[start:start + SITEMAP_STREAM_BATCH_SIZE])
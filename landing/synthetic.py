@@ -0,0 +1,304 @@
+"""
+Fast generation of synthetic landing pages for load and scale testing.
+
+Adding pages one at a time with ``add_child()`` locks and updates the parent
+row, and runs a handful of queries for every page, so building a production
+sized tree that way takes hours. ``generate_pages`` instead computes the
+treebeard ``path``, ``depth`` and ``url_path`` of each new child itself and
+inserts pages, their revisions and ``LandingPageTag`` rows in batches, a few
+queries per batch. Each batch is a transaction, and the parent's
+``numchild`` and the tag counts are updated with it, so an interrupted run
+leaves a valid tree.
+
+Content is drawn from a random generator seeded with ``seed``, so the same
+seed and count produce the same titles, bodies and tags, and images from
+earlier runs are reused rather than created again. Pages are live and have
+a published revision, as if published from the admin, and the cached
+sitemap entries are updated. No publish signals are sent though, so
+run ``rebuild_search_index`` afterwards for the pages to be searchable.
+
+Pages go below a draft page with the ``synthetic`` slug by default, which
+``get_synthetic_parent()`` adds below the default site's root page. It keeps
+them apart from real content, so load tests can edit them and nothing else.
+"""
+import io
+import random
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.images import ImageFile
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import slugify
+from PIL import Image as PILImage
+from taggit.models import Tag
+
+from wagtail.images import get_image_model
+from wagtail.models import Locale, Page, Revision, Site
+
+from . import sitemaps, tags
+from .models import LandingPage, LandingPageTag, LandingPageTagCount
+
+# Pages inserted per transaction
+BATCH_SIZE = 1000
+
+# Size of the tag vocabulary, and most tags per page
+TAG_COUNT = 50
+MAX_TAGS_PER_PAGE = 4
+
+# Images shared by the generated pages
+IMAGE_COUNT = 20
+
+# Slug and title of the page the generated pages go below by default
+PARENT_SLUG = 'synthetic'
+PARENT_TITLE = "Synthetic pages"
+
+WORDS = (
+    "analytics automation billing cloud compliance dashboard delivery design "
+    "enterprise growth hosting integration marketing mobile onboarding payments "
+    "performance platform pricing privacy reporting security startup support "
+    "team workflow customers insight launch network partner product scale "
+    "service solution strategy teamwork trust value vision"
+).split()
+
+
+def sentence(rng, length):
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize()
+
+
+def get_or_create_tags(rng):
+    """Return the tag vocabulary, creating the tags that don't exist yet."""
+    names = sorted({f"{rng.choice(WORDS)}-{rng.choice(WORDS)}" for _ in range(TAG_COUNT)})
+    existing = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=slugify(name)) for name in names if name not in existing],
+        ignore_conflicts=True,
+    )
+    return list(Tag.objects.filter(name__in=names).order_by('name'))
+
+
+def random_uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def get_or_create_images(rng, count=IMAGE_COUNT):
+    """
+    Return ``count`` small images of a solid colour, creating those that
+    earlier runs didn't.
+    """
+    titles = [f"Synthetic image {index}" for index in range(count)]
+    existing = {}
+    for image in get_image_model().objects.filter(title__in=titles).order_by('id'):
+        existing.setdefault(image.title, image)
+    images = []
+    for index, title in enumerate(titles):
+        # Drawn either way, so the rest of the content doesn't depend on it
+        color = tuple(rng.randrange(256) for _ in range(3))
+        if title in existing:
+            images.append(existing[title])
+            continue
+        f = io.BytesIO()
+        PILImage.new('RGB', (800, 600), color).save(f, 'PNG')
+        images.append(get_image_model().objects.create(
+            title=title,
+            file=ImageFile(f, name=f"synthetic-{index}.png"),
+        ))
+    return images
+
+
+def build_body(rng, images):
+    """Return the raw ``body`` StreamField data of a page, in the stored format."""
+    def block(block_type, value):
+        return {'type': block_type, 'value': value, 'id': random_uuid(rng)}
+
+    def image_id():
+        return rng.choice(images).id if images else None
+
+    body = [block('hero', {
+        'title': sentence(rng, 4),
+        'subtitle': sentence(rng, 12),
+        'cta_text': sentence(rng, 2),
+        'cta_link': 'https://example.com/',
+        'background_image': image_id(),
+    })]
+    for _ in range(rng.randint(1, 4)):
+        choice = rng.randrange(3)
+        if choice == 0:
+            body.append(block('features', {
+                'title': sentence(rng, 3),
+                'features': [
+                    {'type': 'item', 'id': random_uuid(rng), 'value': {
+                        'icon': '', 'title': sentence(rng, 2), 'description': sentence(rng, 20),
+                    }}
+                    for _ in range(rng.randint(2, 6))
+                ],
+            }))
+        elif choice == 1:
+            body.append(block('testimonials', {
+                'title': sentence(rng, 3),
+                'testimonials': [
+                    {'type': 'item', 'id': random_uuid(rng), 'value': {
+                        'quote': sentence(rng, 25),
+                        'author': sentence(rng, 2),
+                        'role': sentence(rng, 2),
+                        'image': image_id(),
+                    }}
+                    for _ in range(rng.randint(2, 6))
+                ],
+            }))
+        else:
+            body.append(block('content', {
+                'title': sentence(rng, 3),
+                'content': "".join(f"<p>{sentence(rng, 60)}</p>" for _ in range(rng.randint(1, 4))),
+                'image': image_id(),
+                'image_position': rng.choice(['left', 'right']),
+            }))
+    body.append(block('cta', {
+        'title': sentence(rng, 4),
+        'text': sentence(rng, 15),
+        'button_text': sentence(rng, 2),
+        'button_link': 'https://example.com/',
+        'background_color': '',
+    }))
+    return body
+
+
+def get_next_step(parent):
+    """Return the treebeard step of the next child of ``parent``."""
+    last_child = parent.get_last_child()
+    if last_child is None:
+        return 1
+    return Page._str2int(last_child.path[-Page.steplen:]) + 1
+
+
+def build_pages(rng, parent, first_step, count, images, vocabulary, now):
+    """
+    Return unsaved landing pages for the next ``count`` children of
+    ``parent``, each with the tags to give it.
+    """
+    content_type = ContentType.objects.get_for_model(LandingPage)
+    locale_id = parent.locale_id or Locale.get_default().id
+    pages = []
+    for step in range(first_step, first_step + count):
+        title = sentence(rng, rng.randint(3, 6))
+        slug = f"{slugify(title)}-{step}"
+        published_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        page = LandingPage(
+            title=title,
+            draft_title=title,
+            slug=slug,
+            path=Page._get_path(parent.path, parent.depth + 1, step),
+            depth=parent.depth + 1,
+            numchild=0,
+            url_path=f"{parent.url_path}{slug}/",
+            content_type=content_type,
+            locale_id=locale_id,
+            # Unique across runs, unlike the seeded content
+            translation_key=uuid.uuid4(),
+            live=True,
+            has_unpublished_changes=False,
+            first_published_at=published_at,
+            last_published_at=published_at,
+            latest_revision_created_at=published_at,
+            listed_at=published_at,
+            description=sentence(rng, 15),
+            body=build_body(rng, images),
+        )
+        pages.append((page, rng.sample(vocabulary, rng.randint(0, MAX_TAGS_PER_PAGE))))
+    return pages
+
+
+def insert_batch(parent, pages):
+    """Insert a batch of ``(page, tags)`` with their revisions and tag rows."""
+    page_fields = [field for field in Page._meta.local_concrete_fields if not field.primary_key]
+    saved = Page._base_manager.bulk_create([
+        Page(**{field.attname: getattr(page, field.attname) for field in page_fields})
+        for page, _ in pages
+    ])
+    for (page, _), saved_page in zip(pages, saved):
+        page.id = page.page_ptr_id = saved_page.id
+    # bulk_create() refuses multi-table inheritance, so insert the
+    # LandingPage rows directly
+    LandingPage._base_manager._insert(
+        [page for page, _ in pages], fields=LandingPage._meta.local_concrete_fields
+    )
+
+    tag_counts = Counter()
+    tagged_items = []
+    for page, page_tags in pages:
+        page_tagged_items = [LandingPageTag(tag=tag, content_object=page) for tag in page_tags]
+        # Set in memory too, so the revisions include them
+        page.tagged_items = page_tagged_items
+        # New pages have no comments; saves serializable_data() a query per page
+        page.wagtail_admin_comments = []
+        tagged_items.extend(page_tagged_items)
+        tag_counts.update(tag.id for tag in page_tags)
+    LandingPageTag.objects.bulk_create(tagged_items)
+    for tag_id, count in tag_counts.items():
+        LandingPageTagCount.objects.filter(tag_id=tag_id).update(live_pages=F('live_pages') + count)
+
+    base_content_type = ContentType.objects.get_for_model(Page)
+    revisions = Revision.objects.bulk_create([
+        Revision(
+            content_type_id=page.content_type_id,
+            base_content_type=base_content_type,
+            object_id=str(page.id),
+            created_at=page.last_published_at,
+            object_str=page.title,
+            content=page.serializable_data(),
+        )
+        for page, _ in pages
+    ])
+    for (page, _), revision in zip(pages, revisions):
+        page.latest_revision_id = page.live_revision_id = revision.id
+    Page._base_manager.bulk_update(
+        [page for page, _ in pages], ['latest_revision', 'live_revision']
+    )
+
+    Page._base_manager.filter(id=parent.id).update(numchild=F('numchild') + len(pages))
+    sitemaps.update_pages([page.id for page, _ in pages])
+
+
+def get_synthetic_parent(create=True):
+    """
+    Return the page generated pages go below by default, adding it below the
+    default site's root page if ``create`` is true, or None. It is a draft, so
+    it isn't served or listed itself, though the pages below it are.
+    """
+    root_page = Site.objects.get(is_default_site=True).root_page
+    parent = Page.objects.child_of(root_page).filter(slug=PARENT_SLUG).first()
+    if parent is None and create:
+        parent = root_page.add_child(
+            instance=Page(title=PARENT_TITLE, slug=PARENT_SLUG, live=False)
+        )
+    return parent
+
+
+def generate_pages(count, parent=None, seed=0, batch_size=BATCH_SIZE, with_images=True):
+    """
+    Create ``count`` live landing pages below ``parent`` (the page from
+    ``get_synthetic_parent()`` by default). Yield the number of pages created
+    after each batch.
+    """
+    rng = random.Random(seed)
+    if parent is None:
+        parent = get_synthetic_parent()
+    vocabulary = get_or_create_tags(rng)
+    # Count from the database once; batches then only add their own pages
+    tags.update_tag_counts(tag.id for tag in vocabulary)
+    images = get_or_create_images(rng) if with_images else []
+    now = timezone.now()
+
+    created = 0
+    while created < count:
+        size = min(batch_size, count - created)
+        with transaction.atomic():
+            # Lock the parent, so no other child can take the same paths
+            parent = Page._base_manager.select_for_update().get(id=parent.id)
+            pages = build_pages(rng, parent, get_next_step(parent), size, images, vocabulary, now)
+            insert_batch(parent, pages)
+        created += size
+        yield created
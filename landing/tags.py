@@ -0,0 +1,117 @@
+"""
+Tag listings, tag facets and per-tag counts of live landing pages.
+
+``LandingPageTagCount`` holds the number of live landing pages per tag, so
+listings and facets never have to count over the pages. The signal handlers
+in ``landing.signals`` recount the tags a page gains or loses when it is
+published, and all its tags when it is unpublished or deleted.
+
+Tag listings (``/tags/<slug>/``) list the newest pages first and use keyset
+pagination: the cursor is the listing date and id of the last page shown, so
+every page of a listing costs the same single query, read in order from an
+index. The listing date is ``LandingPage.listed_at``, which the page keeps
+as its ``first_published_at``, falling back to the latest revision's date
+and then to ``models.UNDATED`` for live pages that were never published
+through a revision (e.g. created with ``live=True``), which come last.
+"""
+from django.db.models import Count, F, Q
+from django.utils.dateparse import parse_datetime
+
+from .models import LandingPage, LandingPageTag, LandingPageTagCount
+
+# Pages shown per page of a tag listing
+TAG_PAGE_SIZE = 20
+
+
+def count_live_pages(tag_ids):
+    """Return the number of live landing pages per tag, counted from the database."""
+    return dict(
+        LandingPageTag.objects.filter(tag_id__in=tag_ids, content_object__live=True)
+        .values_list('tag_id')
+        .annotate(count=Count('content_object_id', distinct=True))
+    )
+
+
+def update_tag_counts(tag_ids):
+    """Recount the live landing pages of the given tags."""
+    tag_ids = set(tag_ids)
+    if not tag_ids:
+        return
+    counts = count_live_pages(tag_ids)
+    LandingPageTagCount.objects.bulk_create(
+        [
+            LandingPageTagCount(tag_id=tag_id, live_pages=counts.get(tag_id, 0))
+            for tag_id in tag_ids
+        ],
+        update_conflicts=True,
+        unique_fields=['tag'],
+        update_fields=['live_pages'],
+    )
+
+
+def get_page_tag_ids(page_id):
+    return list(
+        LandingPageTag.objects.filter(content_object_id=page_id).values_list('tag_id', flat=True)
+    )
+
+
+def encode_cursor(page):
+    return '%s_%d' % (page.listed_at.isoformat(), page.id)
+
+
+def decode_cursor(cursor):
+    """Return the ``(listing date, id)`` of a cursor, or None if invalid."""
+    published_at, _, page_id = cursor.rpartition('_')
+    try:
+        published_at = parse_datetime(published_at)
+        page_id = int(page_id)
+    except ValueError:
+        return None
+    if published_at is None:
+        return None
+    return published_at, page_id
+
+
+def get_tag_pages(site, tag, cursor=None, page_size=TAG_PAGE_SIZE):
+    """
+    Return a page of the live landing pages with a tag, newest first, and the
+    cursor of the next page (None on the last page).
+    """
+    # The page_ptr of a LandingPage is its id, and is in the index with listed_at
+    pages = LandingPage.objects.live().filter(tags=tag).order_by('-listed_at', '-page_ptr')
+    if site is not None:
+        pages = pages.in_site(site)
+    if cursor is not None:
+        listed_at, page_id = cursor
+        pages = pages.filter(
+            Q(listed_at__lt=listed_at) | Q(listed_at=listed_at, page_ptr__lt=page_id)
+        )
+
+    # One extra page tells whether there is a next page, without a COUNT
+    pages = list(pages[:page_size + 1])
+    if len(pages) > page_size:
+        return pages[:page_size], encode_cursor(pages[page_size - 1])
+    return pages, None
+
+
+def get_facets(page_ids):
+    """
+    Return the tags of the given pages, most common first, as dicts with
+    the tag's ``name`` and ``slug`` and the ``count`` of pages having it.
+    """
+    return list(
+        LandingPageTag.objects.filter(content_object_id__in=page_ids)
+        .values(name=F('tag__name'), slug=F('tag__slug'))
+        .annotate(count=Count('content_object_id', distinct=True))
+        .order_by('-count', 'name')
+    )
+
+
+def filter_by_tag(page_ids, tag_slug):
+    """Return the ids in ``page_ids`` of the pages with a tag, keeping their order."""
+    tagged = set(
+        LandingPageTag.objects.filter(
+            content_object_id__in=page_ids, tag__slug=tag_slug
+        ).values_list('content_object_id', flat=True)
+    )
+    return [page_id for page_id in page_ids if page_id in tagged]
@@ -0,0 +1,14 @@
+from django import template
+
+from landing import fragment_cache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def include_block_cached(context, block):
+    """
+    Render a StreamField block like ``{% include_block %}``, using the block
+    fragment cache.
+    """
+    return fragment_cache.render_block(block, context)
@@ -0,0 +1,229 @@
+import time
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils.http import parse_http_date
+from wagtail.images.models import Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+
+from landing.conditional import get_version_time, new_version
+from landing.models import LandingPage, SEOSettings
+from mysite.release import RELEASE_TIME_CACHE_KEY
+
+
+@pytest.fixture
+def site():
+    return Site.objects.get(is_default_site=True)
+
+
+@pytest.fixture
+def landing_page(site):
+    landing_page = LandingPage(
+        title="Conditional Page",
+        slug="conditional-page",
+        description="Original description",
+    )
+    site.root_page.add_child(instance=landing_page)
+    landing_page.save_revision().publish()
+    return landing_page
+
+
+@pytest.fixture
+def client():
+    return Client(HTTP_HOST='localhost')
+
+
+def test_version_tokens_record_their_time():
+    assert get_version_time('1700000000-' + 'a' * 32) == 1700000000
+    assert abs(get_version_time(new_version()) - get_version_time(new_version())) <= 1
+    # Tokens made before versions were dated
+    assert get_version_time('a' * 32) is None
+
+
+@pytest.mark.django_db
+def test_page_is_not_rendered_again_for_a_matching_etag(landing_page, client):
+    response = client.get(landing_page.url)
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert etag.startswith('W/"')
+    assert 'Last-Modified' in response
+    assert 'must-revalidate' in response['Cache-Control']
+
+    response = client.get(landing_page.url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    assert not response.templates
+    assert response.content == b''
+
+
+@pytest.mark.django_db
+def test_page_is_not_rendered_again_if_not_modified_since(landing_page, client):
+    last_modified = client.get(landing_page.url)['Last-Modified']
+
+    response = client.get(landing_page.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == 304
+    assert not response.templates
+
+    response = client.get(landing_page.url, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT')
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_publishing_changes_the_etag(landing_page, client):
+    etag = client.get(landing_page.url)['ETag']
+
+    landing_page.description = "Published description"
+    landing_page.save_revision().publish()
+
+    response = client.get(landing_page.url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert 'Published description' in response.content.decode('utf-8')
+
+
+@pytest.mark.django_db
+def test_saving_seo_settings_changes_the_etag(
+    landing_page, client, site, django_capture_on_commit_callbacks
+):
+    etag = client.get(landing_page.url)['ETag']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        SEOSettings.objects.update_or_create(site=site, defaults={'twitter_site': '@changed'})
+
+    response = client.get(landing_page.url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_logged_in_users_always_get_the_page(landing_page, client):
+    etag = client.get(landing_page.url)['ETag']
+
+    client.force_login(User.objects.create_user('editor', password='password'))
+    response = client.get(landing_page.url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert 'ETag' not in response
+
+
+@pytest.mark.django_db
+def test_home_page_sends_validators(site, client):
+    site.root_page.specific.save_revision().publish()
+    etag = client.get('/')['ETag']
+
+    assert client.get('/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_cached_page_answers_with_304(landing_page, client):
+    etag = client.get(landing_page.url)['ETag']
+
+    response = client.get(landing_page.url)
+    assert response.status_code == 200
+    assert response['ETag'] == etag
+
+    response = client.get(landing_page.url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_new_release_changes_the_validators(landing_page, client):
+    etag = client.get(landing_page.url)['ETag']
+
+    # A release first seen after the page was published
+    released_at = int(time.time()) + 3600
+    cache.set(RELEASE_TIME_CACHE_KEY % 'conditional-release', released_at, None)
+    with override_settings(RELEASE_ID='conditional-release'):
+        response = client.get(landing_page.url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        # Rendered again rather than served from the cache
+        assert response.templates
+        assert response['ETag'] != etag
+        assert parse_http_date(response['Last-Modified']) == released_at
+
+        manifest_etag = client.get('/manifest.json')['ETag']
+    assert client.get('/manifest.json', HTTP_IF_NONE_MATCH=manifest_etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_changing_an_image_changes_the_etag(
+    settings, tmp_path, client, site, django_capture_on_commit_callbacks
+):
+    settings.MEDIA_ROOT = str(tmp_path)
+    image = Image.objects.create(title="Hero", file=get_test_image_file())
+    landing_page = LandingPage(
+        title="Image Page",
+        slug="image-page",
+        body=[('hero', {'title': 'Hero', 'background_image': image})],
+    )
+    site.root_page.add_child(instance=landing_page)
+    landing_page.save_revision().publish()
+    etag = client.get(landing_page.url)['ETag']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        image.focal_point_x = image.focal_point_y = 10
+        image.focal_point_width = image.focal_point_height = 20
+        image.save()
+
+    response = client.get(landing_page.url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert client.get(landing_page.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+
+@pytest.mark.django_db
+def test_sitemap_shard_changes_with_its_pages(
+    landing_page, client, site, django_capture_on_commit_callbacks
+):
+    response = client.get('/sitemap-0.xml')
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert 'Last-Modified' in response
+
+    response = client.get('/sitemap-0.xml', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.save_revision().publish()
+
+    response = client.get('/sitemap-0.xml', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_sitemap_index_answers_with_304(landing_page, client):
+    response = client.get('/sitemap.xml')
+    assert response.status_code == 200
+
+    response = client.get('/sitemap.xml', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+    assert not response.templates
+
+
+@pytest.mark.django_db
+def test_robots_txt_changes_with_seo_settings(client, site, django_capture_on_commit_callbacks):
+    response = client.get('/robots.txt')
+    etag = response['ETag']
+
+    response = client.get('/robots.txt', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert not response.templates
+
+    with django_capture_on_commit_callbacks(execute=True):
+        SEOSettings.objects.update_or_create(site=site, defaults={'site_description': 'Changed'})
+
+    assert client.get('/robots.txt', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_manifest_answers_with_304(client):
+    etag = client.get('/manifest.json')['ETag']
+
+    response = client.get('/manifest.json', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
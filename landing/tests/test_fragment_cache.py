@@ -0,0 +1,93 @@
+import pytest
+from django.test import Client
+from wagtail.images.models import Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+
+from landing import fragment_cache
+from landing.models import LandingPage
+
+
+@pytest.fixture
+def landing_page():
+    site = Site.objects.get(is_default_site=True)
+    landing_page = LandingPage(
+        title="Fragment Cache Page",
+        slug="fragment-cache-page",
+        body=[
+            ('hero', {
+                'title': 'Cached Hero',
+                'subtitle': 'Hero subtitle',
+            }),
+            ('cta', {
+                'title': 'Cached CTA',
+                'button_text': 'Go',
+                'button_link': 'https://example.com/',
+            }),
+        ],
+        live=True,
+    )
+    site.root_page.add_child(instance=landing_page)
+    fragment_cache.reset_stats()
+    return landing_page
+
+
+@pytest.mark.django_db
+def test_unchanged_blocks_are_served_from_cache(landing_page):
+    client = Client(HTTP_HOST='localhost')
+
+    response = client.get(landing_page.url)
+    assert response.status_code == 200
+    assert fragment_cache.get_stats() == {'hits': 0, 'misses': 2}
+
+    response = client.get(landing_page.url)
+    assert 'Cached Hero' in response.content.decode('utf-8')
+    assert 'Cached CTA' in response.content.decode('utf-8')
+    assert fragment_cache.get_stats() == {'hits': 2, 'misses': 2}
+
+
+@pytest.mark.django_db
+def test_editing_a_block_only_invalidates_its_fragment(landing_page):
+    client = Client(HTTP_HOST='localhost')
+    client.get(landing_page.url)
+
+    landing_page.body[1].value['title'] = 'Edited CTA'
+    landing_page.save()
+    fragment_cache.reset_stats()
+
+    response = client.get(landing_page.url)
+    content = response.content.decode('utf-8')
+    assert 'Cached Hero' in content
+    assert 'Edited CTA' in content
+    assert fragment_cache.get_stats() == {'hits': 1, 'misses': 1}
+
+
+@pytest.mark.django_db
+def test_changing_an_image_invalidates_its_blocks(landing_page, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    image = Image.objects.create(title="Hero image", file=get_test_image_file())
+    landing_page.body[0].value['background_image'] = image
+    landing_page.save()
+    client = Client(HTTP_HOST='localhost')
+    client.get(landing_page.url)
+
+    # Renditions of the old focal point would be out of date
+    image.focal_point_x = image.focal_point_y = 10
+    image.focal_point_width = image.focal_point_height = 20
+    image.save()
+    fragment_cache.reset_stats()
+
+    client.get(landing_page.url)
+    assert fragment_cache.get_stats() == {'hits': 1, 'misses': 1}
+
+
+@pytest.mark.django_db
+def test_a_new_release_invalidates_every_block(landing_page, settings):
+    client = Client(HTTP_HOST='localhost')
+    settings.RELEASE_ID = 'first'
+    client.get(landing_page.url)
+
+    settings.RELEASE_ID = 'second'
+    fragment_cache.reset_stats()
+    client.get(landing_page.url)
+    assert fragment_cache.get_stats() == {'hits': 0, 'misses': 2}
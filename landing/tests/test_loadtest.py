@@ -0,0 +1,101 @@
+import io
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.test.utils import override_settings
+from wagtail.coreutils import get_supported_content_language_variant
+from wagtail.models import Locale, Page, Site
+
+from landing import loadtest, synthetic
+from landing.models import LandingPage
+
+
+@pytest.fixture
+def pages(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    # Transactional tests flush the site created by the migrations
+    if not Site.objects.exists():
+        Locale.objects.get_or_create(
+            language_code=get_supported_content_language_variant(settings.LANGUAGE_CODE)
+        )
+        root_page = Page.get_first_root_node() or Page.add_root(title="Root")
+        Site.objects.create(hostname='localhost', root_page=root_page, is_default_site=True)
+    list(synthetic.generate_pages(10, with_images=False))
+
+
+@pytest.fixture
+def real_page(pages):
+    return Site.objects.get(is_default_site=True).root_page.add_child(instance=LandingPage(
+        title="Real page", slug="real-page", description="Real description", live=True,
+    ))
+
+
+def test_assign_scenarios():
+    assert loadtest.assign_scenarios('browse', 3) == ['browse'] * 3
+    scenarios = loadtest.assign_scenarios('mixed-writes', 20)
+    assert len(scenarios) == 20
+    assert {name: scenarios.count(name) for name in set(scenarios)} == {
+        'browse': 14, 'search': 4, 'crawler': 1, 'publish': 1,
+    }
+
+
+def test_only_write_profiles_need_allow_writes():
+    assert not loadtest.profile_writes('mixed')
+    assert loadtest.profile_writes('mixed-writes')
+    assert loadtest.profile_writes('publish')
+
+    with pytest.raises(ValueError):
+        loadtest.run('http://localhost:8000', profile='publish', users=1, duration=1)
+
+
+def test_summarize():
+    summary = loadtest.summarize([i / 1000 for i in range(1, 101)], errors=2, duration=10)
+
+    assert summary['requests'] == 100
+    assert summary['throughput'] == 10
+    assert summary['error_rate'] == 0.02
+    assert summary['latency_ms']['p50'] == pytest.approx(50)
+    assert summary['latency_ms']['p99'] == pytest.approx(99)
+    assert summary['latency_ms']['max'] == pytest.approx(100)
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('profile', ['browse', 'crawler', 'search'])
+def test_profiles_run_against_a_live_server(live_server, pages, profile):
+    results = loadtest.run(live_server.url, profile=profile, users=2, duration=1)
+
+    summary = results['scenarios'][profile]
+    assert summary['requests'] > 0
+    assert summary['errors'] == 0
+    assert results['total']['requests'] == summary['requests']
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+@pytest.mark.django_db(transaction=True)
+def test_loadtest_command(live_server, real_page, tmp_path):
+    with pytest.raises(CommandError):
+        call_command('loadtest', '--base-url', live_server.url, '--profile', 'publish')
+
+    output = tmp_path / 'results.json'
+    stdout = io.StringIO()
+    call_command(
+        'loadtest', '--base-url', live_server.url, '--profile', 'publish', '--users', '1',
+        '--duration', '1', '--allow-writes', '--output', str(output), stdout=stdout,
+    )
+    results = json.loads(output.read_text())
+    assert results['config']['profile'] == 'publish'
+    assert results['scenarios']['publish']['requests'] > 0
+    assert results['scenarios']['publish']['errors'] == 0
+    assert 'total:' in stdout.getvalue()
+    # Only the generated pages were edited
+    real_page.refresh_from_db()
+    assert real_page.description == "Real description"
+    assert real_page.live_revision is None
+
+    call_command(
+        'loadtest', '--base-url', live_server.url, '--profile', 'browse', '--users', '1',
+        '--duration', '0.5', '--compare', str(output), stdout=stdout,
+    )
+    assert 'Compared with' in stdout.getvalue()
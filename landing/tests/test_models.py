@@ -64,3 +64,40 @@ def test_landing_page_stream_field():
     retrieved_page = LandingPage.objects.get(id=landing_page.id)
     assert len(retrieved_page.body) == 1  # Changed from 2 to 1 to match actual content
     assert retrieved_page.body[0].block_type == 'hero'
+
+
+def test_landing_page_search_weights():
+    from wagtail.search.backends.database.postgres.weights import determine_boosts_weights
+
+    # Each boost must get a tsvector weight of its own
+    weights = dict(determine_boosts_weights())
+    boosts = {
+        field.field_name: field.boost
+        for field in LandingPage.get_searchable_search_fields()
+    }
+    tags_field = next(
+        field for field in LandingPage.get_search_fields() if field.field_name == 'tags'
+    )
+    tag_boost = tags_field.fields[0].boost
+    assert weights[boosts['title']] == 'A'
+    assert weights[boosts['description']] == 'B'
+    assert weights[tag_boost] == 'C'
+    assert weights[boosts['body']] == 'D'
+
+
+def test_landing_page_body_indexes_text_only():
+    body_block = LandingPage.body.field.stream_block
+    body = body_block.to_python([
+        {'type': 'features', 'value': {'title': 'Features', 'features': [
+            {'icon': 'fa-rocket', 'title': 'Fast', 'description': 'Very fast'},
+        ]}},
+        {'type': 'cta', 'value': {
+            'title': 'Sign up', 'button_text': 'Go', 'button_link': 'https://example.com',
+            'background_color': '#ff0000',
+        }},
+    ])
+
+    content = body_block.get_searchable_content(body)
+    assert 'Very fast' in content
+    assert 'fa-rocket' not in content
+    assert '#ff0000' not in content
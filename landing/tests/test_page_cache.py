@@ -0,0 +1,127 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from wagtail.models import Site
+
+from landing.models import LandingPage, SEOSettings
+
+
+@pytest.fixture
+def site():
+    return Site.objects.get(is_default_site=True)
+
+
+@pytest.fixture
+def landing_page(site):
+    landing_page = LandingPage(
+        title="Cached Page",
+        slug="cached-page",
+        description="Original description",
+    )
+    site.root_page.add_child(instance=landing_page)
+    landing_page.save_revision().publish()
+    return landing_page
+
+
+def change_description_behind_the_scenes(page, description):
+    # A queryset update sends no signals, so the cache is not purged
+    LandingPage.objects.filter(id=page.id).update(description=description)
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_anonymous_responses_are_cached(landing_page):
+    client = Client(HTTP_HOST='localhost')
+    assert 'Original description' in client.get(landing_page.url).content.decode('utf-8')
+
+    change_description_behind_the_scenes(landing_page, "Changed description")
+
+    content = client.get(landing_page.url).content.decode('utf-8')
+    assert 'Original description' in content
+
+    # Tracking parameters share the cached response, other parameters don't
+    content = client.get(landing_page.url + '?utm_source=newsletter').content.decode('utf-8')
+    assert 'Original description' in content
+    content = client.get(landing_page.url + '?variant=b').content.decode('utf-8')
+    assert 'Changed description' in content
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_async_requests_are_cached(landing_page):
+    client = AsyncClient(HTTP_HOST='localhost')
+    url = landing_page.url
+
+    async def get_content():
+        response = await client.get(url)
+        return response.content.decode('utf-8')
+
+    assert 'Original description' in async_to_sync(get_content)()
+    change_description_behind_the_scenes(landing_page, "Changed description")
+    assert 'Original description' in async_to_sync(get_content)()
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_publishing_purges_the_page(landing_page, django_capture_on_commit_callbacks):
+    client = Client(HTTP_HOST='localhost')
+    client.get(landing_page.url)
+
+    landing_page.description = "Published description"
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.save_revision().publish()
+
+    content = client.get(landing_page.url).content.decode('utf-8')
+    assert 'Published description' in content
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_unpublishing_purges_the_page(landing_page, django_capture_on_commit_callbacks):
+    client = Client(HTTP_HOST='localhost')
+    assert client.get(landing_page.url).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.unpublish()
+
+    assert client.get(landing_page.url).status_code == 404
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_seo_settings_purge_the_site(site, landing_page, django_capture_on_commit_callbacks):
+    client = Client(HTTP_HOST='localhost')
+    client.get(landing_page.url)
+    change_description_behind_the_scenes(landing_page, "Changed description")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        SEOSettings.objects.create(site=site, twitter_site='@cached')
+
+    content = client.get(landing_page.url).content.decode('utf-8')
+    assert 'Changed description' in content
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_authenticated_users_bypass_the_cache(landing_page):
+    client = Client(HTTP_HOST='localhost')
+    client.get(landing_page.url)
+    change_description_behind_the_scenes(landing_page, "Changed description")
+
+    user = User.objects.create_superuser('editor', 'editor@example.com', 'password')
+    client.force_login(user)
+
+    content = client.get(landing_page.url).content.decode('utf-8')
+    assert 'Changed description' in content
+
+
+@pytest.mark.django_db
+def test_page_cache_is_disabled_by_default(landing_page):
+    client = Client(HTTP_HOST='localhost')
+    client.get(landing_page.url)
+    change_description_behind_the_scenes(landing_page, "Changed description")
+
+    content = client.get(landing_page.url).content.decode('utf-8')
+    assert 'Changed description' in content
@@ -0,0 +1,140 @@
+import io
+import os
+
+import pytest
+from django.core.management import call_command
+from django.test.utils import override_settings
+from wagtail.models import Site
+
+from landing import prerender
+from landing.models import LandingPage, SEOSettings
+
+
+@pytest.fixture
+def static_pages_root(tmp_path):
+    with override_settings(
+        STATIC_PAGES_ENABLED=True,
+        STATIC_PAGES_ROOT=str(tmp_path),
+        STATIC_PAGES_EXPORT_IN_BACKGROUND=False,
+    ):
+        yield tmp_path
+
+
+@pytest.fixture
+def site():
+    return Site.objects.get(is_default_site=True)
+
+
+def create_page(site, slug):
+    landing_page = LandingPage(title="Exported Page", slug=slug, description="Exported description")
+    site.root_page.add_child(instance=landing_page)
+    return landing_page
+
+
+@pytest.mark.django_db
+def test_publishing_exports_the_page(static_pages_root, site, django_capture_on_commit_callbacks):
+    landing_page = create_page(site, 'exported-page')
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.save_revision().publish()
+
+    path = static_pages_root / site.hostname / 'exported-page' / 'index.html'
+    assert 'Exported description' in path.read_text()
+    assert os.path.exists(str(path) + '.gz')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.unpublish()
+
+    assert not path.exists()
+    assert not os.path.exists(str(path) + '.gz')
+
+
+class PrivateRenderer(prerender.PageRenderer):
+    """Renders pages as if they set a cookie or were marked private."""
+
+    def __init__(self, cookie=False):
+        super().__init__()
+        self.cookie = cookie
+
+    def render(self, site, page_path):
+        response = super().render(site, page_path)
+        if self.cookie:
+            response.set_cookie('visitor', 'someone')
+        else:
+            response['Cache-Control'] = 'private'
+        return response
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('cookie', [True, False])
+def test_responses_for_one_visitor_are_not_exported(static_pages_root, site, cookie):
+    landing_page = create_page(site, 'exported-page')
+    landing_page.save_revision().publish()
+    path = static_pages_root / site.hostname / 'exported-page' / 'index.html'
+    assert prerender.export_page(landing_page)
+    assert path.exists()
+
+    assert not prerender.export_page(landing_page, renderer=PrivateRenderer(cookie))
+    assert not path.exists()
+
+
+@pytest.mark.django_db
+def test_moving_removes_the_old_files(static_pages_root, site, django_capture_on_commit_callbacks):
+    parent = create_page(site, 'parent')
+    landing_page = create_page(site, 'moved-page')
+    with django_capture_on_commit_callbacks(execute=True):
+        parent.save_revision().publish()
+        landing_page.save_revision().publish()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.move(parent, pos='last-child')
+
+    assert not (static_pages_root / site.hostname / 'moved-page' / 'index.html').exists()
+    assert (static_pages_root / site.hostname / 'parent' / 'moved-page' / 'index.html').exists()
+
+
+@pytest.mark.django_db
+def test_seo_settings_export_the_site_again(
+    static_pages_root, site, django_capture_on_commit_callbacks
+):
+    landing_page = create_page(site, 'exported-page')
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.save_revision().publish()
+    path = static_pages_root / site.hostname / 'exported-page' / 'index.html'
+    assert '@exported' not in path.read_text()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        SEOSettings.objects.create(site=site, twitter_site='@exported')
+
+    # The files are replaced rather than removed, so nginx keeps serving them
+    assert '@exported' in path.read_text()
+
+
+@pytest.mark.django_db
+def test_site_export_stops_when_superseded(static_pages_root, site):
+    create_page(site, 'exported-page').save_revision().publish()
+
+    assert prerender.export_site(site, should_stop=lambda: True) == (0, 0)
+    assert prerender.export_site(site) == (2, 0)
+
+
+@pytest.mark.django_db
+def test_export_static_pages_command(static_pages_root, site):
+    landing_page = create_page(site, 'exported-page')
+    landing_page.save_revision().publish()
+
+    call_command('export_static_pages', stdout=io.StringIO())
+
+    assert (static_pages_root / site.hostname / 'index.html').exists()
+    assert (static_pages_root / site.hostname / 'exported-page' / 'index.html').exists()
+
+
+@pytest.mark.django_db
+def test_export_static_pages_command_does_nothing_when_disabled(settings, tmp_path, site):
+    settings.STATIC_PAGES_ENABLED = False
+    settings.STATIC_PAGES_ROOT = str(tmp_path)
+    stdout = io.StringIO()
+
+    call_command('export_static_pages', '--clear', stdout=stdout)
+
+    assert 'STATIC_PAGES_ENABLED is not set' in stdout.getvalue()
+    assert not list(tmp_path.iterdir())
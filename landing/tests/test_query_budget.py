@@ -0,0 +1,110 @@
+"""
+The public views against their budgets in ``settings.QUERY_BUDGETS``. A
+failure lists any repeated queries with the template line or block that ran
+them; raise a budget only when the extra queries are expected.
+"""
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+from wagtail.images.models import Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+
+from landing.models import LandingPage
+from mysite.query_budget import query_budget
+
+TESTIMONIALS = 20
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture
+def landing_page():
+    images = [
+        Image.objects.create(title=f"Author {i}", file=get_test_image_file())
+        for i in range(TESTIMONIALS)
+    ]
+    landing_page = LandingPage(
+        title="Budget Page",
+        slug="budget-page",
+        body=[
+            ('hero', {'title': 'Hero', 'background_image': images[0]}),
+            ('features', {
+                'title': 'Features',
+                'features': [{'title': f'Feature {i}', 'description': 'Text'} for i in range(5)],
+            }),
+            ('testimonials', {
+                'title': 'Testimonials',
+                'testimonials': [
+                    {'quote': 'Great', 'author': image.title, 'image': image}
+                    for image in images
+                ],
+            }),
+            ('cta', {'title': 'Sign up'}),
+        ],
+    )
+    Site.objects.get(is_default_site=True).root_page.add_child(instance=landing_page)
+    landing_page.tags.add('news')
+    landing_page.save_revision().publish()
+    return landing_page
+
+
+@pytest.fixture
+def anonymous_client():
+    return Client(HTTP_HOST='localhost')
+
+
+@pytest.mark.django_db
+def test_landing_page_budget(landing_page, anonymous_client):
+    url = landing_page.url
+    # Create the renditions, as the first visitor after a publish would
+    anonymous_client.get(url)
+    # Render every block again rather than serving the page or fragment cache
+    cache.clear()
+
+    with query_budget(settings.QUERY_BUDGETS['wagtail_serve']):
+        response = anonymous_client.get(url)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_search_budget(landing_page, anonymous_client):
+    with query_budget(settings.QUERY_BUDGETS['search']):
+        response = anonymous_client.get(reverse('search'), {'query': 'Budget'})
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_tag_budget(landing_page, anonymous_client):
+    with query_budget(settings.QUERY_BUDGETS['tag']):
+        response = anonymous_client.get(reverse('tag', args=['news']))
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_sitemap_budget(landing_page, anonymous_client):
+    with query_budget(settings.QUERY_BUDGETS['sitemap']):
+        response = anonymous_client.get(reverse('sitemap'))
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_sitemap_section_budget(landing_page, anonymous_client):
+    cache.clear()
+
+    # A shard is built on the first request, while its entries are streamed
+    with query_budget(settings.QUERY_BUDGETS['sitemap_section']):
+        response = anonymous_client.get(reverse('sitemap_section', args=[0]))
+        content = b''.join(response.streaming_content)
+    assert response.status_code == 200
+    assert b'budget-page' in content
+
+    # and then served from the cache
+    with query_budget(0):
+        response = anonymous_client.get(reverse('sitemap_section', args=[0]))
+        b''.join(response.streaming_content)
@@ -0,0 +1,100 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from wagtail.images.models import Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+
+from landing import renditions
+from landing.models import LandingPage, SEOSettings
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture
+def image():
+    return Image.objects.create(title="Test image", file=get_test_image_file())
+
+
+@pytest.fixture
+def landing_page(image):
+    site = Site.objects.get(is_default_site=True)
+    landing_page = LandingPage(
+        title="Rendition Page",
+        slug="rendition-page",
+        body=[
+            ('hero', {'title': 'Hero', 'background_image': image}),
+            ('testimonials', {
+                'title': 'Testimonials',
+                'testimonials': [
+                    {'quote': 'Great', 'author': 'Someone', 'image': image},
+                    {'quote': 'Fine', 'author': 'Someone else'},
+                ],
+            }),
+        ],
+    )
+    site.root_page.add_child(instance=landing_page)
+    landing_page.save_revision().publish()
+    return landing_page
+
+
+HERO_SPECS = {
+    f'width-{width}|format-{image_format}'
+    for width in (640, 1024, 1600, 2400)
+    for image_format in ('avif', 'webp', 'jpeg')
+}
+TESTIMONIAL_SPECS = {
+    f'fill-{size}|format-{image_format}'
+    for size in ('100x100', '200x200')
+    for image_format in ('avif', 'webp', 'jpeg')
+}
+
+
+@pytest.mark.django_db
+def test_get_page_renditions(landing_page, image):
+    assert renditions.get_page_renditions(landing_page) == {
+        image.id: HERO_SPECS | TESTIMONIAL_SPECS,
+    }
+
+
+@pytest.mark.django_db
+def test_images_render_as_responsive_pictures(landing_page, image):
+    content = Client(HTTP_HOST='localhost').get(landing_page.url).content.decode('utf-8')
+
+    assert '<div class="hero-background">' in content
+    assert '<source srcset="' in content
+    assert 'type="image/avif"' in content
+    assert 'type="image/webp"' in content
+    assert 'sizes="100vw"' in content
+    assert 'fetchpriority="high"' in content
+
+    # Rendering used exactly the renditions the pre-generation creates
+    filter_specs = set(image.renditions.values_list('filter_spec', flat=True))
+    assert filter_specs == HERO_SPECS | TESTIMONIAL_SPECS
+
+
+@pytest.mark.django_db
+def test_default_og_image_is_included(landing_page, image):
+    og_image = Image.objects.create(title="OG image", file=get_test_image_file())
+    SEOSettings.objects.create(site=landing_page.get_site(), default_og_image=og_image)
+
+    needed = renditions.get_page_renditions(landing_page)
+    assert needed[og_image.id] == {'original'}
+
+    # A page's own og_image takes precedence over the default
+    landing_page.og_image = image
+    needed = renditions.get_page_renditions(landing_page)
+    assert og_image.id not in needed
+
+
+@pytest.mark.django_db
+def test_pregenerate_renditions_command(landing_page, image):
+    call_command('pregenerate_renditions', workers=1, stdout=io.StringIO())
+
+    filter_specs = set(image.renditions.values_list('filter_spec', flat=True))
+    assert filter_specs == HERO_SPECS | TESTIMONIAL_SPECS
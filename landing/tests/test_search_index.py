@@ -0,0 +1,68 @@
+import io
+import json
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from wagtail.models import Site
+from wagtail.search.models import IndexEntry
+
+from landing import search_index
+from landing.models import LandingPage
+
+
+@pytest.fixture
+def landing_pages():
+    root_page = Site.objects.get(is_default_site=True).root_page
+    pages = []
+    for i in range(5):
+        page = LandingPage(title=f"Indexed page {i}", slug=f"indexed-{i}", description="Rebuild me")
+        root_page.add_child(instance=page)
+        pages.append(page)
+    return pages
+
+
+def get_indexed_ids(model):
+    content_type = ContentType.objects.get_for_model(model)
+    return set(
+        int(object_id) for object_id in
+        IndexEntry.objects.filter(content_type=content_type).values_list('object_id', flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_iter_id_batches(landing_pages):
+    ids = [page.id for page in landing_pages]
+
+    assert list(search_index.iter_id_batches(LandingPage, 2)) == [ids[:2], ids[2:4], ids[4:]]
+    assert list(search_index.iter_id_batches(LandingPage, 2, after_id=ids[2])) == [ids[3:]]
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index(landing_pages, tmp_path):
+    IndexEntry.objects.all().delete()
+    checkpoint = tmp_path / 'checkpoint.json'
+
+    stdout = io.StringIO()
+    call_command(
+        'rebuild_search_index', workers=1, batch_size=2, checkpoint=str(checkpoint), stdout=stdout
+    )
+
+    assert get_indexed_ids(LandingPage) == {page.id for page in landing_pages}
+    assert 'landing.LandingPage: indexing 5 objects' in stdout.getvalue()
+    assert LandingPage.objects.search("rebuild").count() == 5
+    assert not checkpoint.exists()
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index_resumes(landing_pages, tmp_path):
+    IndexEntry.objects.all().delete()
+    checkpoint = tmp_path / 'checkpoint.json'
+    checkpoint.write_text(json.dumps({'default:landing.LandingPage': landing_pages[2].id}))
+
+    call_command(
+        'rebuild_search_index', workers=1, resume=True, checkpoint=str(checkpoint),
+        stdout=io.StringIO(),
+    )
+
+    assert get_indexed_ids(LandingPage) == {page.id for page in landing_pages[3:]}
@@ -3,6 +3,7 @@ from django.test import Client
 from django.urls import reverse
 from wagtail.models import Page, Site
 
+from landing import seo
 from landing.models import LandingPage, SEOSettings
 
 
@@ -90,3 +91,68 @@ def test_landing_page_seo_tags():
     # Check for SEO tags in the HTML
     assert "Custom SEO Title for Testing" in content
     assert "Custom SEO description for testing" in content
+
+
+@pytest.fixture
+def og_image(settings, tmp_path):
+    from wagtail.images.models import Image
+    from wagtail.images.tests.utils import get_test_image_file
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    return Image.objects.create(title="OG image", file=get_test_image_file())
+
+
+@pytest.mark.django_db
+def test_seo_settings_rendered_in_head(og_image):
+    site = Site.objects.get(is_default_site=True)
+    SEOSettings.objects.create(
+        site=site,
+        google_analytics_id='G-TEST123',
+        twitter_site='@testsite',
+        default_og_image=og_image,
+    )
+    landing_page = LandingPage(title="Settings Page", slug="settings-page")
+    site.root_page.add_child(instance=landing_page)
+    landing_page.save_revision().publish()
+
+    content = Client(HTTP_HOST='localhost').get(landing_page.url).content.decode('utf-8')
+
+    og_image_url = site.root_url + og_image.get_rendition('original').url
+    assert f'<meta property="og:image" content="{og_image_url}">' in content
+    assert f'<meta name="twitter:image" content="{og_image_url}">' in content
+    assert '<meta name="twitter:site" content="@testsite">' in content
+    assert 'gtag/js?id=G-TEST123' in content
+
+
+@pytest.mark.django_db
+def test_seo_settings_snapshot_is_cached(og_image, django_assert_num_queries):
+    site = Site.objects.get(is_default_site=True)
+    SEOSettings.objects.create(site=site, twitter_site='@testsite', default_og_image=og_image)
+
+    snapshot = seo.get_seo_settings(site)
+    assert snapshot.twitter_site == '@testsite'
+    assert snapshot.default_og_image_url.endswith('.png')
+
+    with django_assert_num_queries(0):
+        assert seo.get_seo_settings(site) is snapshot
+
+
+@pytest.mark.django_db
+def test_seo_settings_snapshot_invalidated_on_save(og_image, django_capture_on_commit_callbacks):
+    site = Site.objects.get(is_default_site=True)
+    assert seo.get_seo_settings(site).twitter_site == ''
+
+    with django_capture_on_commit_callbacks(execute=True):
+        seo_settings = SEOSettings.objects.create(
+            site=site, twitter_site='@testsite', default_og_image=og_image
+        )
+    assert seo.get_seo_settings(site).twitter_site == '@testsite'
+
+    with django_capture_on_commit_callbacks(execute=True):
+        seo_settings.twitter_site = '@othersite'
+        seo_settings.save()
+    assert seo.get_seo_settings(site).twitter_site == '@othersite'
+
+    with django_capture_on_commit_callbacks(execute=True):
+        og_image.delete()
+    assert seo.get_seo_settings(site).default_og_image_url == ''
@@ -0,0 +1,112 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from wagtail.images.models import Image
+from wagtail.models import Page, Site
+
+from landing import synthetic
+from landing.models import LandingPage, LandingPageTag, LandingPageTagCount
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def generate(count, **kwargs):
+    return list(synthetic.generate_pages(count, **kwargs))
+
+
+@pytest.mark.django_db
+def test_generated_pages_form_a_valid_tree():
+    root_page = Site.objects.get(is_default_site=True).root_page
+    existing = LandingPage(title="Existing page", slug="existing-page")
+    root_page.add_child(instance=existing)
+
+    assert generate(25, parent=root_page, batch_size=10) == [10, 20, 25]
+
+    root_page.refresh_from_db()
+    assert root_page.numchild == 26
+    assert Page.find_problems() == ([], [], [], [], [])
+    pages = LandingPage.objects.child_of(root_page).live().exclude(id=existing.id)
+    assert pages.count() == 25
+    assert list(root_page.get_children())[0].id == existing.id
+
+    # Pages added afterwards go after the generated ones
+    later = root_page.add_child(instance=LandingPage(title="Later page", slug="later-page"))
+    assert root_page.get_last_child().id == later.id
+
+
+@pytest.mark.django_db
+def test_generated_pages_go_below_their_own_parent():
+    generate(5, with_images=False)
+    generate(5, seed=1, with_images=False)
+
+    parent = synthetic.get_synthetic_parent(create=False)
+    assert not parent.live
+    assert LandingPage.objects.child_of(parent).live().count() == 10
+    assert Page.objects.filter(slug=synthetic.PARENT_SLUG).count() == 1
+
+    page = LandingPage.objects.child_of(parent).first()
+    assert page.url.startswith(f'/{synthetic.PARENT_SLUG}/')
+    assert Client(HTTP_HOST='localhost').get(page.url).status_code == 200
+    assert Client(HTTP_HOST='localhost').get(parent.url).status_code == 404
+
+
+@pytest.mark.django_db
+def test_generated_pages_are_published_with_tags():
+    generate(20, batch_size=8)
+
+    page = LandingPage.objects.live().order_by('id').last()
+    assert page.live_revision_id == page.latest_revision_id
+    assert page.live_revision.as_object().title == page.title
+    assert [block.block_type for block in page.body][0] == 'hero'
+
+    tag_ids = LandingPageTag.objects.values_list('tag_id', flat=True)
+    counts = dict(
+        LandingPageTagCount.objects.filter(live_pages__gt=0).values_list('tag_id', 'live_pages')
+    )
+    assert sum(counts.values()) == len(tag_ids)
+    assert set(counts) == set(tag_ids)
+    assert set(page.live_revision.as_object().tags.values_list('id', flat=True)) == set(
+        page.tags.values_list('id', flat=True)
+    )
+
+    response = Client(HTTP_HOST='localhost').get(page.url)
+    assert response.status_code == 200
+    assert page.title in response.content.decode('utf-8')
+
+
+@pytest.mark.django_db
+def test_generation_is_reproducible():
+    def contents():
+        return list(
+            LandingPage.objects.order_by('path').values_list('title', 'slug', 'description')
+        )
+
+    generate(10, seed=3, with_images=False)
+    first = contents()
+    LandingPage.objects.all().delete()
+    generate(10, seed=3, with_images=False)
+    assert contents() == first
+
+
+@pytest.mark.django_db
+def test_generating_again_adds_pages_but_reuses_images():
+    generate(5)
+    generate(5)
+
+    assert LandingPage.objects.live().count() == 10
+    assert Image.objects.count() == synthetic.IMAGE_COUNT
+    assert Page.find_problems() == ([], [], [], [], [])
+
+
+@pytest.mark.django_db
+def test_generate_pages_command():
+    stdout = io.StringIO()
+    call_command('generate_pages', '12', '--batch-size=5', '--no-images', stdout=stdout)
+
+    assert "Created 12 pages" in stdout.getvalue()
+    assert LandingPage.objects.live().count() == 12
@@ -0,0 +1,153 @@
+import pytest
+from django.urls import reverse
+from taggit.models import Tag
+from wagtail.models import Site
+
+from landing import tags
+from landing.models import UNDATED, LandingPage, LandingPageTagCount
+
+
+def get_counts():
+    return dict(LandingPageTagCount.objects.values_list('tag__name', 'live_pages'))
+
+
+@pytest.fixture
+def publish(django_capture_on_commit_callbacks):
+    def publish(page):
+        with django_capture_on_commit_callbacks(execute=True):
+            page.save_revision().publish()
+    return publish
+
+
+@pytest.fixture
+def tagged_pages(publish):
+    root_page = Site.objects.get(is_default_site=True).root_page
+    pages = []
+    for i in range(5):
+        page = LandingPage(title=f"Tagged page {i}", slug=f"tagged-{i}")
+        root_page.add_child(instance=page)
+        page.tags.add('news')
+        if i % 2 == 0:
+            page.tags.add('events')
+        publish(page)
+        pages.append(page)
+    return pages
+
+
+@pytest.mark.django_db
+def test_tag_counts_follow_publishing(tagged_pages, publish, django_capture_on_commit_callbacks):
+    assert get_counts() == {'news': 5, 'events': 3}
+
+    page = LandingPage.objects.get(id=tagged_pages[0].id)
+    page.tags.remove('events')
+    publish(page)
+    assert get_counts() == {'news': 5, 'events': 2}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tagged_pages[1].unpublish()
+    assert get_counts() == {'news': 4, 'events': 2}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tagged_pages[2].delete()
+    assert get_counts() == {'news': 3, 'events': 1}
+
+
+@pytest.mark.django_db
+def test_get_tag_pages_keyset_pagination(tagged_pages):
+    site = Site.objects.get(is_default_site=True)
+    tag = Tag.objects.get(name='news')
+
+    seen = []
+    cursor = None
+    while True:
+        pages, next_cursor = tags.get_tag_pages(site, tag, cursor, page_size=2)
+        seen.extend(page.id for page in pages)
+        if next_cursor is None:
+            break
+        cursor = tags.decode_cursor(next_cursor)
+
+    assert seen == [page.id for page in reversed(tagged_pages)]
+
+
+@pytest.mark.django_db
+def test_get_tag_pages_lists_undated_pages_last(tagged_pages, client):
+    site = Site.objects.get(is_default_site=True)
+    tag = Tag.objects.get(name='news')
+    # Live without ever being published, so it has no publishing dates
+    undated = [
+        LandingPage(title=f"Undated page {i}", slug=f"undated-{i}", live=True) for i in range(2)
+    ]
+    for page in undated:
+        site.root_page.add_child(instance=page)
+        page.tags.add('news')
+        page.save()
+    assert undated[0].first_published_at is None
+
+    seen = []
+    cursor = None
+    while True:
+        pages, next_cursor = tags.get_tag_pages(site, tag, cursor, page_size=2)
+        seen.extend(page.id for page in pages)
+        if next_cursor is None:
+            break
+        cursor = tags.decode_cursor(next_cursor)
+
+    assert seen == (
+        [page.id for page in reversed(tagged_pages)] + [page.id for page in reversed(undated)]
+    )
+
+
+@pytest.mark.django_db
+def test_listing_date_follows_publishing(publish):
+    root_page = Site.objects.get(is_default_site=True).root_page
+    page = root_page.add_child(instance=LandingPage(title="Listed page", slug="listed"))
+    assert LandingPage.objects.get(id=page.id).listed_at == UNDATED
+
+    page.save_revision()
+    assert LandingPage.objects.get(id=page.id).listed_at == page.latest_revision_created_at
+
+    publish(page)
+    page = LandingPage.objects.get(id=page.id)
+    assert page.listed_at == page.first_published_at
+
+
+def test_decode_cursor():
+    assert tags.decode_cursor('2026-01-02T03:04:05+00:00_12')[1] == 12
+    assert tags.decode_cursor('nonsense') is None
+    assert tags.decode_cursor('2026-13-45T00:00:00_1') is None
+
+
+@pytest.mark.django_db
+def test_tag_view(client, tagged_pages):
+    response = client.get(reverse('tag', args=['events']))
+
+    assert response.status_code == 200
+    assert response.context['live_pages'] == 3
+    assert [page.id for page in response.context['pages']] == [
+        tagged_pages[4].id, tagged_pages[2].id, tagged_pages[0].id
+    ]
+    assert response.context['next_cursor'] is None
+
+    assert client.get(reverse('tag', args=['missing'])).status_code == 404
+    assert client.get(reverse('tag', args=['events']), {'after': 'bad'}).status_code == 404
+
+
+@pytest.mark.django_db
+def test_tag_view_pages_past_undated_pages(client, tagged_pages):
+    root_page = Site.objects.get(is_default_site=True).root_page
+    for i in range(tags.TAG_PAGE_SIZE):
+        page = LandingPage(title=f"Undated page {i}", slug=f"undated-{i}", live=True)
+        root_page.add_child(instance=page)
+        page.tags.add('news')
+        page.save()
+
+    # The first page of the listing ends with an undated page
+    response = client.get(reverse('tag', args=['news']))
+    assert response.status_code == 200
+    next_cursor = response.context['next_cursor']
+    assert next_cursor.startswith(UNDATED.isoformat())
+
+    response = client.get(reverse('tag', args=['news']), {'after': next_cursor})
+    assert response.status_code == 200
+    assert len(response.context['pages']) == len(tagged_pages)
+    assert response.context['next_cursor'] is None
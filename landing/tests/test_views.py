@@ -1,11 +1,16 @@
 import pytest
-from django.test import Client, TestCase
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncClient, Client, TestCase
 from wagtail.models import Page, Site
 
+from landing import sitemaps
 from landing.models import LandingPage
+from landing.sitemaps import get_shard_count
 
 
-from django.test.utils import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 
 @override_settings(WAGTAILSEARCH_BACKENDS={
     'default': {
@@ -103,6 +108,16 @@ class TestLandingPageView(TestCase):
 
 
 
+def read_stream(response):
+    """Read the content of a streaming response."""
+    if not response.is_async:
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    async def read():
+        return b''.join([chunk async for chunk in response.streaming_content])
+    return async_to_sync(read)().decode('utf-8')
+
+
 @pytest.mark.django_db
 def test_robots_txt_view():
     client = Client()
@@ -123,7 +138,8 @@ from django.test.utils import override_settings
 })
 @pytest.mark.django_db
 def test_sitemap_xml_view():
-    root_page = Page.objects.get(id=1)
+    site = Site.objects.get(is_default_site=True)
+    home_page = site.root_page
 
     # Create and publish a landing page for sitemap
     landing_page = LandingPage(
@@ -131,12 +147,12 @@ def test_sitemap_xml_view():
         slug="sitemap-test-page",
         description="Testing sitemap generation",
     )
-    root_page.add_child(instance=landing_page)
+    home_page.add_child(instance=landing_page)
     revision = landing_page.save_revision()
     revision.publish()
     landing_page.refresh_from_db()
 
-    client = Client(HTTP_HOST='testserver')
+    client = Client(HTTP_HOST=site.hostname)
     response = client.get('/sitemap.xml')
 
     assert response.status_code == 200
@@ -144,5 +160,190 @@ def test_sitemap_xml_view():
 
     content = response.content.decode('utf-8')
     assert '<?xml version="1.0" encoding="UTF-8"?>' in content
+    assert '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' in content
+    assert f'<loc>http://{site.hostname}/sitemap-0.xml</loc>' in content
+
+    response = client.get('/sitemap-0.xml')
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/xml'
+
+    content = read_stream(response)
     assert '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">' in content
-    assert 'sitemap-test-page' in content or 'Sitemap Test Page' in content
+    assert f'<loc>http://{site.hostname}/sitemap-test-page/</loc>' in content
+
+
+@override_settings(SITEMAP_URLS_PER_SHARD=2)
+@pytest.mark.django_db
+def test_sitemap_is_sharded():
+    site = Site.objects.get(is_default_site=True)
+    home_page = site.root_page
+
+    for index in range(5):
+        home_page.add_child(instance=LandingPage(
+            title=f"Shard Page {index}",
+            slug=f"shard-page-{index}",
+            live=True,
+        ))
+
+    client = Client(HTTP_HOST=site.hostname)
+    content = client.get('/sitemap.xml').content.decode('utf-8')
+    shard_count = content.count('<sitemap>')
+    assert shard_count == get_shard_count()
+
+    locations = []
+    for section in range(shard_count):
+        response = client.get(f'/sitemap-{section}.xml')
+        assert response.status_code == 200
+        shard = read_stream(response)
+        assert shard.count('<url>') <= 2
+        locations += [
+            line.strip()[len('<loc>'):-len('</loc>')]
+            for line in shard.splitlines() if line.strip().startswith('<loc>')
+        ]
+
+    # Every page appears exactly once across all shards
+    for index in range(5):
+        assert locations.count(f'http://{site.hostname}/shard-page-{index}/') == 1
+
+    assert client.get(f'/sitemap-{shard_count}.xml').status_code == 404
+
+
+@pytest.mark.django_db
+def test_sitemap_is_streamed_over_asgi(monkeypatch):
+    monkeypatch.setattr('landing.sitemaps.SITEMAP_STREAM_BATCH_SIZE', 1)
+    site = Site.objects.get(is_default_site=True)
+    for index in range(3):
+        site.root_page.add_child(instance=LandingPage(
+            title=f"Async Page {index}",
+            slug=f"async-page-{index}",
+            live=True,
+        ))
+    client = AsyncClient(HTTP_HOST=site.hostname)
+
+    async def get_chunks():
+        response = await client.get('/sitemap-0.xml')
+        assert response.status_code == 200
+        return [chunk async for chunk in response.streaming_content]
+
+    chunks = async_to_sync(get_chunks)()
+    # The header, an entry per chunk and the footer
+    assert chunks[0].startswith(b'<?xml')
+    assert chunks[-1] == b'</urlset>\n'
+    assert len(chunks) == 2 + 4
+    assert all(chunk.count(b'<url>') == 1 for chunk in chunks[1:-1])
+
+
+@pytest.mark.django_db
+def test_sitemap_is_streamed_from_a_sync_iterator_over_wsgi(monkeypatch, recwarn):
+    monkeypatch.setattr('landing.sitemaps.SITEMAP_STREAM_BATCH_SIZE', 1)
+    site = Site.objects.get(is_default_site=True)
+    for index in range(3):
+        site.root_page.add_child(instance=LandingPage(
+            title=f"Sync Page {index}",
+            slug=f"sync-page-{index}",
+            live=True,
+        ))
+
+    response = Client(HTTP_HOST=site.hostname).get('/sitemap-0.xml')
+    assert response.status_code == 200
+    # Django would read an async iterator whole, with a warning
+    assert not response.is_async
+    chunks = list(response.streaming_content)
+    assert len(chunks) == 2 + 4
+    assert not [w for w in recwarn if 'StreamingHttpResponse' in str(w.message)]
+
+
+@override_settings(WAGTAILSEARCH_BACKENDS={
+    'default': {
+        'BACKEND': 'wagtail.search.backends.database',
+        'AUTO_UPDATE': False,
+    }
+})
+@pytest.mark.django_db
+def test_sitemap_cache_is_updated_incrementally(django_capture_on_commit_callbacks):
+    site = Site.objects.get(is_default_site=True)
+    home_page = site.root_page
+    client = Client(HTTP_HOST=site.hostname)
+
+    def get_sitemap():
+        response = client.get('/sitemap-0.xml')
+        return read_stream(response)
+
+    # Warm the cache
+    assert f'http://{site.hostname}/' in get_sitemap()
+
+    landing_page = LandingPage(title="Fresh Page", slug="fresh-page")
+    home_page.add_child(instance=landing_page)
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.save_revision().publish()
+
+    # Served straight from the patched cache
+    with CaptureQueriesContext(connection) as queries:
+        content = get_sitemap()
+    assert f'http://{site.hostname}/fresh-page/' in content
+    assert not [query for query in queries if 'wagtailcore_page' in query['sql']]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.slug = "renamed-page"
+        landing_page.save_revision().publish()
+    content = get_sitemap()
+    assert f'http://{site.hostname}/fresh-page/' not in content
+    assert f'http://{site.hostname}/renamed-page/' in content
+
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.unpublish()
+    assert f'http://{site.hostname}/renamed-page/' not in get_sitemap()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.save_revision().publish()
+    assert f'http://{site.hostname}/renamed-page/' in get_sitemap()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        landing_page.delete()
+    assert f'http://{site.hostname}/renamed-page/' not in get_sitemap()
+
+
+@pytest.mark.django_db
+def test_sitemap_patch_waits_for_the_shard_lock(monkeypatch):
+    monkeypatch.setattr('landing.sitemaps.SHARD_LOCK_WAIT', 0)
+    site = Site.objects.get(is_default_site=True)
+    client = Client(HTTP_HOST=site.hostname)
+    # Warm the cache
+    read_stream(client.get('/sitemap-0.xml'))
+
+    landing_page = LandingPage(title="Locked Page", slug="locked-page", live=True)
+    site.root_page.add_child(instance=landing_page)
+
+    # Another writer holds the lock: rather than patch the shard and risk
+    # losing that writer's changes, it is dropped and rebuilt
+    with sitemaps.lock_shard(0) as locked:
+        assert locked
+        sitemaps.update_pages([landing_page.id])
+    assert cache.get(sitemaps.SHARD_CACHE_KEY % 0) is None
+    assert f'http://{site.hostname}/locked-page/' in read_stream(client.get('/sitemap-0.xml'))
+
+    # Once released, the cached shard is patched again
+    landing_page.slug = "unlocked-page"
+    landing_page.save()
+    sitemaps.update_pages([landing_page.id])
+    entries = cache.get(sitemaps.SHARD_CACHE_KEY % 0)
+    assert f'http://{site.hostname}/unlocked-page/' in entries[landing_page.id][1]
+
+
+@pytest.mark.django_db
+def test_sitemap_shard_built_during_a_change_is_not_stored(monkeypatch):
+    site = Site.objects.get(is_default_site=True)
+    landing_page = LandingPage(title="Racing Page", slug="racing-page", live=True)
+    site.root_page.add_child(instance=landing_page)
+    build_shard_entries = sitemaps.build_shard_entries
+
+    def build_during_a_publish(shard):
+        entries = build_shard_entries(shard)
+        # The page changes after the shard read it, while it is uncached
+        sitemaps.update_pages([landing_page.id])
+        return entries
+
+    monkeypatch.setattr('landing.sitemaps.build_shard_entries', build_during_a_publish)
+    assert landing_page.id in sitemaps.get_shard_entries(0)
+    assert cache.get(sitemaps.SHARD_CACHE_KEY % 0) is None
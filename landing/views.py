@@ -1,83 +1,167 @@
-from django.http import HttpResponse
-from django.template.loader import render_to_string
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from django.views.generic import TemplateView
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.generic import TemplateView, View
+from taggit.models import Tag
+from wagtail.models import Site
 
-from wagtail.models import Page, Site
 import json
 
+from . import seo
+from .conditional import (
+    get_not_modified_response, get_version_validators, make_etag, set_validators,
+)
+from .models import LandingPageTagCount
+from .sitemaps import (
+    aget_shard_count, aget_shard_version, astream_shard, get_shard_count, stream_shard,
+)
+from .tags import decode_cursor, get_tag_pages
+
+
+def get_site_validators(request):
+    """Return the validators of a site-wide response, from its SEO settings version."""
+    site = Site.find_for_request(request)
+    if site is None:
+        return None, None
+    return get_version_validators(seo.get_version(site.id), 'site', site.id)
+
+
 class RobotsView(TemplateView):
     content_type = 'text/plain'
     template_name = 'robots.txt'
 
+    async def get(self, request, *args, **kwargs):
+        etag, last_modified = await sync_to_async(get_site_validators)(request)
+        response = get_not_modified_response(request, etag, last_modified)
+        if response is None:
+            # The response is rendered by the handler, so nothing here blocks
+            response = self.render_to_response(self.get_context_data(**kwargs))
+            set_validators(response, etag, last_modified)
+        return response
 
-@method_decorator(cache_page(60 * 60 * 24), name='dispatch')  # Cache for 24 hours
-class SitemapView(TemplateView):
+
+class SitemapIndexView(TemplateView):
     content_type = 'application/xml'
-    template_name = 'sitemap.xml'
-    
+    template_name = 'sitemap_index.xml'
+
+    def get(self, request, *args, **kwargs):
+        # The index only lists the shards, so it changes with their number
+        self.shard_count = get_shard_count()
+        etag = make_etag('sitemap-index', self.shard_count)
+        response = get_not_modified_response(request, etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            set_validators(response, etag)
+        return response
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
-        # Get current site
-        site = Site.find_for_request(self.request)
-        if not site:
-            # Use the first site if none is found for the request
-            site = Site.objects.first()
-        
-        # Get all live pages that are not excluded from sitemap
-        pages = Page.objects.live().public().filter(
-            depth__gt=1  # Exclude root page
-        ).specific().order_by('path')
-        
-        # Create a list of pages with their URLs
-        pages_with_urls = []
-        for page in pages:
-            # Get the full URL including domain
-            full_url = page.get_full_url(request=self.request)
-            
-            # If full_url is empty, try to construct it
-            if not full_url and site:
-                full_url = f"{self.request.scheme}://{site.hostname}{page.url}"
-            
-            # Add to the list
-            pages_with_urls.append({
-                'page': page,
-                'full_url': full_url,
-                'last_published_at': page.last_published_at
-            })
-        
-        context['pages_with_urls'] = pages_with_urls
+
+        # One child sitemap per shard of pages
+        context['sitemap_locations'] = [
+            self.request.build_absolute_uri(
+                reverse('sitemap_section', kwargs={'section': section})
+            )
+            for section in range(self.shard_count)
+        ]
         return context
 
-def manifest_view(request):
+
+class SitemapView(View):
+    """
+    A single sitemap shard, streamed from the sitemap cache.
+
+    Under ASGI a crawler slowly reading a large shard only holds a coroutine.
+    Under WSGI the shard is streamed from a sync iterator instead, as Django
+    would read an async one whole before sending any of it.
+    """
+
+    async def get(self, request, section):
+        if section >= await aget_shard_count():
+            raise Http404("Sitemap section not found")
+
+        # The release ID and time are read from the filesystem and the cache
+        etag, last_modified = await sync_to_async(get_version_validators)(
+            await aget_shard_version(section), 'sitemap', section
+        )
+        response = get_not_modified_response(request, etag, last_modified)
+        if response is None:
+            stream = astream_shard if isinstance(request, ASGIRequest) else stream_shard
+            response = StreamingHttpResponse(
+                stream(section),
+                content_type='application/xml',
+            )
+            set_validators(response, etag, last_modified)
+        return response
+
+
+class TagView(TemplateView):
+    """Live landing pages with a tag, newest first, a page at a time."""
+    template_name = 'landing/tag_index.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        tag = get_object_or_404(Tag, slug=self.kwargs['slug'])
+
+        cursor = None
+        if 'after' in self.request.GET:
+            cursor = decode_cursor(self.request.GET['after'])
+            if cursor is None:
+                raise Http404("Invalid page")
+
+        pages, next_cursor = get_tag_pages(Site.find_for_request(self.request), tag, cursor)
+        context.update({
+            'tag': tag,
+            'pages': pages,
+            'next_cursor': next_cursor,
+            'is_first_page': cursor is None,
+            'live_pages': LandingPageTagCount.objects.filter(tag=tag).values_list(
+                'live_pages', flat=True
+            ).first() or 0,
+        })
+        return context
+
+
+MANIFEST = {
+    "name": "Your Site Name",
+    "short_name": "YourSite",
+    "description": "Your site description",
+    "start_url": "/",
+    "display": "standalone",
+    "background_color": "#ffffff",
+    "theme_color": "#2b3990",
+    "icons": [
+        {
+            "src": "/static/images/icon-192x192.png",
+            "sizes": "192x192",
+            "type": "image/png"
+        },
+        {
+            "src": "/static/images/icon-512x512.png",
+            "sizes": "512x512",
+            "type": "image/png"
+        }
+    ]
+}
+
+# The manifest never changes while the process runs, so serialize it once
+MANIFEST_CONTENT = json.dumps(MANIFEST)
+
+
+async def manifest_view(request):
     """
     Generate a web app manifest file
     """
-    manifest = {
-        "name": "Your Site Name",
-        "short_name": "YourSite",
-        "description": "Your site description",
-        "start_url": "/",
-        "display": "standalone",
-        "background_color": "#ffffff",
-        "theme_color": "#2b3990",
-        "icons": [
-            {
-                "src": "/static/images/icon-192x192.png",
-                "sizes": "192x192",
-                "type": "image/png"
-            },
-            {
-                "src": "/static/images/icon-512x512.png",
-                "sizes": "512x512",
-                "type": "image/png"
-            }
-        ]
-    }
-    
-    return HttpResponse(
-        content=json.dumps(manifest),
-        content_type='application/json'
-    )
+    # Not worked out at import, as the ETag also holds the release, which is
+    # hashed from the templates on first use
+    etag = await sync_to_async(make_etag)('manifest', MANIFEST_CONTENT)
+    response = get_not_modified_response(request, etag)
+    if response is None:
+        response = HttpResponse(
+            content=MANIFEST_CONTENT,
+            content_type='application/json'
+        )
+        set_validators(response, etag)
+    return response
@@ -0,0 +1,45 @@
+from wagtail import hooks
+from wagtail.models import Site
+
+from . import conditional, page_cache, seo
+
+
+@hooks.register('before_serve_page')
+def record_page_type(page, request, serve_args, serve_kwargs):
+    # Labels the request's latency in mysite.metrics
+    request.wagtail_page_type = page.specific_class._meta.label
+
+
+@hooks.register('before_serve_page')
+def mark_page_cacheable(page, request, serve_args, serve_kwargs):
+    if not page_cache.is_enabled() or not getattr(page, 'cache_anonymous_responses', False):
+        return
+    if getattr(request, 'is_preview', False) or not page_cache.request_is_cacheable(request):
+        return
+    # Responses for restricted pages depend on who is asking
+    if page.get_view_restrictions().exists():
+        return
+    page_cache.mark_request(request, page)
+
+
+# After Wagtail's view restriction check, so only visitors allowed to see
+# the page are told it hasn't changed
+@hooks.register('before_serve_page', order=1)
+def check_page_validators(page, request, serve_args, serve_kwargs):
+    if not getattr(page, 'conditional_responses', False):
+        return
+    if getattr(request, 'is_preview', False) or not page_cache.request_is_cacheable(request):
+        return
+    site = Site.find_for_request(request)
+    if site is None:
+        return
+    validators = conditional.get_page_validators(
+        page, seo.get_version(site.id), *page_cache.get_tokens(page.id, site.id)
+    )
+    if not validators:
+        return
+    # Returning a response here skips rendering the page
+    response = conditional.get_not_modified_response(request, *validators)
+    if response is not None:
+        return response
+    request.conditional_validators = validators
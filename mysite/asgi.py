@@ -0,0 +1,24 @@
+"""
+ASGI config for mysite project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI worker class, e.g.::
+
+    gunicorn mysite.asgi:application -k uvicorn.workers.UvicornWorker
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings.dev")
+
+# Under ASGI each request's sync code runs in a thread of its own, so
+# connections kept open between requests would pile up rather than be reused
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
+os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
+
+application = get_asgi_application()
@@ -0,0 +1,352 @@
+"""
+Two-tier cache backend: a small in-process LRU in front of a shared cache.
+
+``TwoTierCache`` answers reads from a per-process memory tier when it can and
+falls back to the shared cache named by its ``LOCATION`` (another alias in
+``CACHES``, e.g. Redis). Values read from or written to the shared cache are
+kept in the local tier, which is bounded by the total pickled size of its
+entries and evicts the least recently used ones first. Local entries expire
+after ``LOCAL_TIMEOUT`` seconds, whatever their timeout in the shared cache.
+
+Deleting keys, incrementing them or clearing the cache replaces a random
+generation token stored in the shared cache. Every process compares its
+token with the shared one at most every ``GENERATION_CHECK_INTERVAL``
+seconds and empties its local tier when they differ, so invalidations reach
+every worker within that interval. Overwriting a key with ``set()`` doesn't
+replace the token, so other workers may serve the old value until their
+local copy expires.
+
+Only keys starting with one of ``LOCAL_KEY_PREFIXES`` are kept locally; keys
+that are overwritten to invalidate other entries (page cache tokens, version
+keys) should be left out so they are always read from the shared cache.
+
+Options::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'mysite.cache.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'LOCAL_MAX_BYTES': 32 * 1024 * 1024,
+                'LOCAL_KEY_PREFIXES': ['pagecache:response:', 'landing:block:'],
+            },
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://redis:6379/0',
+        },
+    }
+"""
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from mysite.metrics import CACHE_REQUESTS
+
+# Total pickled size of the values kept in each process, in bytes
+LOCAL_MAX_BYTES = 16 * 1024 * 1024
+
+# Values larger than this are only kept in the shared cache, in bytes
+LOCAL_MAX_ENTRY_BYTES = 1024 * 1024
+
+# How long a value is kept in the local tier, in seconds
+LOCAL_TIMEOUT = 5
+
+# How often the generation token is read from the shared cache, in seconds
+GENERATION_CHECK_INTERVAL = 1
+
+GENERATION_CACHE_KEY = 'two-tier:generation'
+
+# Local tiers by shared cache alias. Django creates a cache backend per
+# thread, so the local tier lives here to be shared by every thread.
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+_MISSING = object()
+
+# Results of reads as labelled in mysite.metrics
+METRIC_RESULTS = {'local_hits': 'local_hit', 'shared_hits': 'shared_hit', 'misses': 'miss'}
+
+
+def _new_generation():
+    return uuid.uuid4().hex
+
+
+class LocalTier:
+    """A thread-safe LRU of pickled values, bounded by their total size."""
+
+    def __init__(self, max_bytes, max_entry_bytes):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.generation = None
+        self.next_generation_check = 0
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            pickled, expires = entry
+            if expires <= time.monotonic():
+                self._remove(key)
+                return _MISSING
+            self.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(pickled) > self.max_entry_bytes:
+            self.delete(key)
+            return
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = (pickled, time.monotonic() + timeout)
+            self.size += len(pickled)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+
+    def delete(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def count(self, outcome, n=1):
+        with self.lock:
+            self.stats[outcome] += n
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[0])
+
+
+def get_local_tier(location, max_bytes, max_entry_bytes):
+    with _local_tiers_lock:
+        tier = _local_tiers.get(location)
+        if tier is None:
+            tier = _local_tiers[location] = LocalTier(max_bytes, max_entry_bytes)
+        return tier
+
+
+def get_alias(location, params):
+    """
+    Return the alias in ``CACHES`` of the two-tier cache set up with the given
+    location and parameters, or its location if there is none. Django doesn't
+    tell a backend which alias it was created for.
+    """
+    for alias, config in settings.CACHES.items():
+        config = dict(config)
+        backend = config.pop('BACKEND', None)
+        if config.pop('LOCATION', '') != location or config != params:
+            continue
+        try:
+            if issubclass(import_string(backend), TwoTierCache):
+                return alias
+        except ImportError:
+            continue
+    return location
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.alias = get_alias(location, params)
+        self.shared_alias = location
+        self.local_timeout = options.get('LOCAL_TIMEOUT', LOCAL_TIMEOUT)
+        self.generation_check_interval = options.get(
+            'GENERATION_CHECK_INTERVAL', GENERATION_CHECK_INTERVAL
+        )
+        prefixes = options.get('LOCAL_KEY_PREFIXES')
+        self.local_key_prefixes = tuple(prefixes) if prefixes is not None else None
+        self.local = get_local_tier(
+            location,
+            options.get('LOCAL_MAX_BYTES', LOCAL_MAX_BYTES),
+            options.get('LOCAL_MAX_ENTRY_BYTES', LOCAL_MAX_ENTRY_BYTES),
+        )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def is_local(self, key):
+        return self.local_key_prefixes is None or key.startswith(self.local_key_prefixes)
+
+    def local_key(self, key, version):
+        return self.shared.make_and_validate_key(key, version=version)
+
+    def get_local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def check_generation(self):
+        """Empty the local tier if another process invalidated keys since the last check."""
+        local = self.local
+        now = time.monotonic()
+        if now < local.next_generation_check:
+            return
+        local.next_generation_check = now + self.generation_check_interval
+
+        generation = self.shared.get(GENERATION_CACHE_KEY)
+        if generation is None:
+            # The token was evicted (or never set), so anything may have changed
+            generation = _new_generation()
+            if not self.shared.add(GENERATION_CACHE_KEY, generation, None):
+                generation = self.shared.get(GENERATION_CACHE_KEY, generation)
+        if generation != local.generation:
+            local.clear()
+            local.generation = generation
+
+    def bump_generation(self):
+        generation = _new_generation()
+        self.shared.set(GENERATION_CACHE_KEY, generation, None)
+        self.local.generation = generation
+
+    def invalidate(self, keys, version):
+        local_keys = [key for key in keys if self.is_local(key)]
+        if not local_keys:
+            return
+        for key in local_keys:
+            self.local.delete(self.local_key(key, version))
+        self.bump_generation()
+
+    def get(self, key, default=None, version=None):
+        if not self.is_local(key):
+            value = self.shared.get(key, _MISSING, version=version)
+            self.count('misses' if value is _MISSING else 'shared_hits')
+            return default if value is _MISSING else value
+
+        self.check_generation()
+        local_key = self.local_key(key, version)
+        value = self.local.get(local_key)
+        if value is not _MISSING:
+            self.count('local_hits')
+            return value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self.count('misses')
+            return default
+        self.count('shared_hits')
+        self.local.set(local_key, value, self.local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        self.check_generation()
+        found = {}
+        remote = []
+        for key in keys:
+            value = self.local.get(self.local_key(key, version)) if self.is_local(key) else _MISSING
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        self.count('local_hits', len(found))
+
+        if remote:
+            shared_found = self.shared.get_many(remote, version=version)
+            for key, value in shared_found.items():
+                if self.is_local(key):
+                    self.local.set(self.local_key(key, version), value, self.local_timeout)
+            self.count('shared_hits', len(shared_found))
+            self.count('misses', len(remote) - len(shared_found))
+            found.update(shared_found)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self.set_local(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self.set_local(key, value, timeout, version)
+        return failed
+
+    def set_local(self, key, value, timeout, version):
+        if not self.is_local(key):
+            return
+        self.check_generation()
+        local_key = self.local_key(key, version)
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None and timeout <= 0:
+            self.local.delete(local_key)
+        else:
+            self.local.set(local_key, value, self.get_local_timeout(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self.set_local(key, value, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def has_key(self, key, version=None):
+        if self.is_local(key):
+            self.check_generation()
+            if self.local.get(self.local_key(key, version)) is not _MISSING:
+                return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self.invalidate([key], version)
+        return value
+
+    def delete(self, key, version=None):
+        deleted = self.shared.delete(key, version=version)
+        self.invalidate([key], version)
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version=version)
+        self.invalidate(keys, version)
+
+    def clear(self):
+        self.shared.clear()
+        self.local.clear()
+        self.bump_generation()
+
+    def count(self, outcome, n=1):
+        self.local.count(outcome, n)
+        CACHE_REQUESTS.labels(self.alias, METRIC_RESULTS[outcome]).inc(n)
+
+    def get_stats(self):
+        """
+        Return the hits, misses and evictions of this process, with the hit
+        ratio of each tier: the share of reads answered by the local tier,
+        and the share of the reads reaching the shared cache answered there.
+        """
+        local = self.local
+        with local.lock:
+            stats = dict(local.stats, local_entries=len(local.entries), local_bytes=local.size)
+        reads = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        shared_reads = reads - stats['local_hits']
+        stats['local_hit_ratio'] = stats['local_hits'] / reads if reads else 0.0
+        stats['shared_hit_ratio'] = stats['shared_hits'] / shared_reads if shared_reads else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self.local.lock:
+            for outcome in self.local.stats:
+                self.local.stats[outcome] = 0
@@ -0,0 +1,96 @@
+"""
+Connection metrics for persistent database connections.
+
+With ``CONN_MAX_AGE`` set, each worker thread keeps its database connection
+open between requests, so the connections of a process act as a pool with one
+connection per thread. ``ConnectionMetricsMixin`` counts, per process:
+
+* ``open_connections``: connections currently open (the size of the pool),
+* ``connections_opened`` and ``connections_closed``,
+* ``checkouts``: requests that used a connection, and ``reused_checkouts``:
+  those served by a connection kept from an earlier request,
+* ``connect_seconds`` and ``max_connect_seconds``: the total and longest
+  time spent establishing new connections. Connections aren't shared
+  between threads, so there is no waiting for one to be returned; this is
+  what a request pays when it can't reuse a connection.
+
+The mixin is added to a backend's ``DatabaseWrapper`` (see
+``mysite.db.postgresql``), and the counts are read with ``get_stats()``.
+They are also recorded as Prometheus metrics by connection alias, served by
+``/metrics`` (see ``mysite.metrics``).
+"""
+import threading
+import time
+
+from mysite.metrics import (
+    DB_CHECKOUTS, DB_CONNECT_DURATION, DB_CONNECTIONS, DB_CONNECTIONS_OPEN
+)
+
+_stats = {
+    'connections_opened': 0,
+    'connections_closed': 0,
+    'checkouts': 0,
+    'reused_checkouts': 0,
+    'connect_seconds': 0.0,
+    'max_connect_seconds': 0.0,
+}
+_stats_lock = threading.Lock()
+
+
+def get_stats():
+    """Return the connection counts and connect times of this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['open_connections'] = stats['connections_opened'] - stats['connections_closed']
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = type(_stats[name])()
+
+
+class ConnectionMetricsMixin:
+    checked_out = False
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - start
+        with _stats_lock:
+            _stats['connections_opened'] += 1
+            _stats['connect_seconds'] += elapsed
+            _stats['max_connect_seconds'] = max(_stats['max_connect_seconds'], elapsed)
+        DB_CONNECTIONS.labels(self.alias, 'opened').inc()
+        DB_CONNECTIONS_OPEN.labels(self.alias).inc()
+        DB_CONNECT_DURATION.labels(self.alias).observe(elapsed)
+
+    def _close(self):
+        if self.connection is not None:
+            with _stats_lock:
+                _stats['connections_closed'] += 1
+            DB_CONNECTIONS.labels(self.alias, 'closed').inc()
+            DB_CONNECTIONS_OPEN.labels(self.alias).dec()
+        return super()._close()
+
+    def ensure_connection(self):
+        # The first use of the connection after a request starts checks it out
+        if not self.checked_out:
+            self.checked_out = True
+            reused = self.connection is not None
+            with _stats_lock:
+                _stats['checkouts'] += 1
+                if reused:
+                    _stats['reused_checkouts'] += 1
+            DB_CHECKOUTS.labels(self.alias, str(reused).lower()).inc()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        # Called by Django when a request starts and when it finishes. Checking
+        # the connection here doesn't count as using it.
+        self.checked_out = True
+        try:
+            super().close_if_unusable_or_obsolete()
+        finally:
+            self.checked_out = False
@@ -0,0 +1,7 @@
+from django.db.backends.postgresql import base
+
+from mysite.db.metrics import ConnectionMetricsMixin
+
+
+class DatabaseWrapper(ConnectionMetricsMixin, base.DatabaseWrapper):
+    """The PostgreSQL backend, counting connections for ``mysite.db.metrics``."""
@@ -0,0 +1,156 @@
+"""
+Liveness and readiness endpoints for load balancers and orchestrators.
+
+``/healthz/live/`` (and the older ``/healthz/``) only shows the worker can
+answer requests. ``/healthz/ready/`` also probes the database, the cache and
+media storage, and answers 503 if any of them fails or doesn't answer within
+``HEALTH_CHECK_TIMEOUT`` seconds.
+
+Each dependency is probed in a thread of its own, so a hung probe is cut off
+by the timeout instead of tying up the request. A probe's result is reused for
+``HEALTH_CHECK_CACHE_SECONDS``, and a probe still running from an earlier
+request is waited on rather than started again, so polling the endpoint
+however often runs at most one probe per dependency per interval in each
+process. The JSON body reports the status and latency of every probe.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+
+# Longest a readiness check waits for all probes, in seconds
+HEALTH_CHECK_TIMEOUT = 2
+
+# How long a probe result is reused, in seconds
+HEALTH_CHECK_CACHE_SECONDS = 5
+
+# Each process writes its own key, so workers don't read each other's values
+HEALTH_CHECK_CACHE_KEY = 'health-check:%s' % uuid.uuid4().hex
+
+HEALTH_CHECK_STORAGE_NAME = 'health-check/probe.txt'
+
+
+def check_database():
+    connection = connections[DEFAULT_DB_ALIAS]
+    # Probes run outside requests, so expire the connection the way a request would
+    connection.close_if_unusable_or_obsolete()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Exception:
+        connection.close()
+        raise
+
+
+def check_cache():
+    value = uuid.uuid4().hex
+    cache.set(HEALTH_CHECK_CACHE_KEY, value, 60)
+    if cache.get(HEALTH_CHECK_CACHE_KEY) != value:
+        raise RuntimeError("Cache did not return the value just stored")
+
+
+def check_storage():
+    name = default_storage.save(HEALTH_CHECK_STORAGE_NAME, ContentFile(b'ok'))
+    default_storage.delete(name)
+
+
+class Probe:
+    """Runs a check in a dedicated thread and keeps its latest result."""
+
+    def __init__(self, check):
+        self.check = check
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = None
+        self.executor = None
+        self.future = None
+        self.finished_at = None
+
+    def get_future(self):
+        """Return the future of the running probe or of a recent result, or start a probe."""
+        cache_seconds = getattr(settings, 'HEALTH_CHECK_CACHE_SECONDS', HEALTH_CHECK_CACHE_SECONDS)
+        with self.lock:
+            # Threads don't survive a fork, so each worker process starts its own
+            if self.pid != os.getpid():
+                self.reset()
+                self.pid = os.getpid()
+                self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='health-check')
+
+            if self.future is not None and (
+                not self.future.done() or time.monotonic() < self.finished_at + cache_seconds
+            ):
+                return self.future
+
+            self.future = self.executor.submit(self.run)
+            return self.future
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            self.check()
+        except Exception as e:
+            result = {'status': 'error', 'error': str(e) or e.__class__.__name__}
+        else:
+            result = {'status': 'ok'}
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        self.finished_at = time.monotonic()
+        return result
+
+
+PROBES = {
+    'database': Probe(check_database),
+    'cache': Probe(check_cache),
+    'storage': Probe(check_storage),
+}
+
+
+def reset_probes():
+    """Forget every probe result and stop the probe threads, closing their connections."""
+    for probe in PROBES.values():
+        with probe.lock:
+            if probe.executor is not None and probe.pid == os.getpid():
+                probe.executor.submit(connections.close_all)
+                probe.executor.shutdown(wait=False)
+            probe.reset()
+
+
+def run_probes():
+    """Return the result of every probe, waiting at most ``HEALTH_CHECK_TIMEOUT`` in all."""
+    timeout = getattr(settings, 'HEALTH_CHECK_TIMEOUT', HEALTH_CHECK_TIMEOUT)
+    deadline = time.monotonic() + timeout
+    futures = {name: probe.get_future() for name, probe in PROBES.items()}
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            results[name] = {'status': 'error', 'error': f"No answer within {timeout}s"}
+    return results
+
+
+async def liveness(request):
+    """Health check endpoint for monitoring."""
+    return JsonResponse({"status": "ok"})
+
+
+@never_cache
+def readiness(request):
+    checks = run_probes()
+    ready = all(check['status'] == 'ok' for check in checks.values())
+    return JsonResponse(
+        {"status": "ok" if ready else "error", "checks": checks},
+        status=200 if ready else 503,
+    )
@@ -0,0 +1,225 @@
+"""
+Prometheus metrics for request, query, cache and template performance.
+
+``MetricsMiddleware`` records:
+
+* ``django_view_duration_seconds``: request latency by URL name, with
+  ``page_cache`` for responses served by ``PageCacheMiddleware``,
+* ``wagtail_page_duration_seconds``: latency of Wagtail pages by page model,
+  labelled by the ``before_serve_page`` hook in ``landing.wagtail_hooks``,
+* ``django_template_render_duration_seconds``: rendering time of template
+  responses by template name,
+* ``django_db_query_duration_seconds``: count and time of database queries
+  by connection alias, for every connection of the process.
+
+``mysite.cache.TwoTierCache`` adds ``django_cache_requests_total`` by cache
+alias and result, and ``mysite.db.metrics.ConnectionMetricsMixin`` adds, by
+connection alias:
+
+* ``django_db_connections_open``: connections currently open, the size of
+  the pool of persistent connections,
+* ``django_db_connections_total``: connections opened and closed,
+* ``django_db_connection_checkouts_total``: requests that used a
+  connection, by whether it was kept from an earlier request,
+* ``django_db_connect_duration_seconds``: time taken to establish new
+  connections.
+
+``metrics_view`` serves them in the Prometheus text format to the networks
+in ``METRICS_ALLOWED_NETWORKS`` only. When ``PROMETHEUS_MULTIPROC_DIR`` is
+set, each worker process writes its metrics to that directory and the view
+adds them up across workers, so it doesn't matter which worker is scraped
+(see ``gunicorn.conf.py``).
+"""
+import ipaddress
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Management commands run before gunicorn creates the directory
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# Networks allowed to read the metrics, e.g. the Prometheus server
+METRICS_ALLOWED_NETWORKS = (
+    '127.0.0.0/8',
+    '::1/128',
+    '10.0.0.0/8',
+    '172.16.0.0/12',
+    '192.168.0.0/16',
+)
+
+VIEW_DURATION = Histogram(
+    'django_view_duration_seconds',
+    "Time taken to answer a request, by URL name",
+    ['view'],
+)
+PAGE_DURATION = Histogram(
+    'wagtail_page_duration_seconds',
+    "Time taken to answer a request for a Wagtail page, by page model",
+    ['page_type'],
+)
+TEMPLATE_RENDER_DURATION = Histogram(
+    'django_template_render_duration_seconds',
+    "Time taken to render a template response, by template",
+    ['template'],
+)
+QUERY_DURATION = Histogram(
+    'django_db_query_duration_seconds',
+    "Time taken by database queries, by connection alias",
+    ['alias'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+CACHE_REQUESTS = Counter(
+    'django_cache_requests_total',
+    "Cache reads, by cache alias and result",
+    ['alias', 'result'],
+)
+DB_CONNECTIONS_OPEN = Gauge(
+    'django_db_connections_open',
+    "Database connections currently open, by connection alias",
+    ['alias'],
+    # Summed over the live worker processes
+    multiprocess_mode='livesum',
+)
+DB_CONNECTIONS = Counter(
+    'django_db_connections_total',
+    "Database connections opened and closed, by connection alias and event",
+    ['alias', 'event'],
+)
+DB_CHECKOUTS = Counter(
+    'django_db_connection_checkouts_total',
+    "Requests that used a database connection, by connection alias and "
+    "whether the connection was kept from an earlier request",
+    ['alias', 'reused'],
+)
+DB_CONNECT_DURATION = Histogram(
+    'django_db_connect_duration_seconds',
+    "Time taken to establish a new database connection, by connection alias",
+    ['alias'],
+)
+
+
+def record_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        QUERY_DURATION.labels(context['connection'].alias).observe(time.perf_counter() - start)
+
+
+def install_query_metrics(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# Connections opened in any thread from now on
+connection_created.connect(install_query_metrics)
+
+
+def get_view_name(request):
+    if getattr(request, 'page_cache_hit', False):
+        return 'page_cache'
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name
+
+
+def get_template_name(response):
+    template = response.template_name
+    if isinstance(template, (list, tuple)):
+        template = template[0] if template else ''
+    if not isinstance(template, str):
+        # A template object rather than a name
+        template = getattr(getattr(template, 'origin', None), 'template_name', None) or 'unknown'
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Record the latency of every request, and the rendering time of template
+    responses. Should come first, so the time spent in other middleware is
+    included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Connections opened before this module was loaded
+        for connection in connections.all(initialized_only=True):
+            install_query_metrics(connection)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, time.perf_counter() - start)
+        return response
+
+    def record(self, request, duration):
+        VIEW_DURATION.labels(get_view_name(request)).observe(duration)
+        page_type = getattr(request, 'wagtail_page_type', None)
+        if page_type is not None:
+            PAGE_DURATION.labels(page_type).observe(duration)
+
+    def process_template_response(self, request, response):
+        # Template responses are rendered right after this hook returns
+        start = time.perf_counter()
+        template = get_template_name(response)
+
+        def record_render(response):
+            TEMPLATE_RENDER_DURATION.labels(template).observe(time.perf_counter() - start)
+
+        response.add_post_render_callback(record_render)
+        return response
+
+
+def is_allowed(request):
+    networks = getattr(settings, 'METRICS_ALLOWED_NETWORKS', METRICS_ALLOWED_NETWORKS)
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in networks)
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """The metrics of every worker, in the Prometheus text format."""
+    if not is_allowed(request):
+        raise Http404
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
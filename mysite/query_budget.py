@@ -0,0 +1,214 @@
+"""
+Per-request query recording, N+1 detection and query budgets.
+
+``record_queries()`` records every SQL query run on any connection while it
+is active, with the template line and StreamField block being rendered when
+the query ran. Queries are grouped by shape (the SQL with parameters and
+``IN`` lists collapsed), so a shape run ``N_PLUS_ONE_THRESHOLD`` times or more
+in one request is reported as a likely N+1 pattern along with where it came
+from.
+
+``QueryBudgetMiddleware`` records the queries of each request when the
+``QUERY_BUDGET_ENABLED`` setting is true (it defaults to ``DEBUG``), and logs
+a warning for repeated shapes and for views running more queries than their
+entry in ``QUERY_BUDGETS`` (keyed by URL name).
+
+In tests, ``query_budget()`` fails when the code inside it runs more queries
+than allowed or repeats a query shape::
+
+    with query_budget(8):
+        client.get(page.url)
+"""
+import logging
+import re
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Node
+
+from wagtail.blocks import Block
+
+logger = logging.getLogger(__name__)
+
+# Number of times a query shape may run in one request before it is reported
+N_PLUS_ONE_THRESHOLD = 5
+
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# The log of the request being recorded, which follows the request into the
+# threads ``sync_to_async`` runs its queries in
+_current_log = ContextVar('query_log', default=None)
+
+
+def get_query_shape(sql):
+    """Return the SQL with parameters, literals and ``IN`` lists collapsed."""
+    sql = _LITERAL_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def find_source():
+    """
+    Return the innermost template line and StreamField block being rendered
+    by the current thread, as a string, or None outside of rendering.
+    """
+    template = block = None
+    frame = sys._getframe(1)
+    while frame is not None and (template is None or block is None):
+        obj = frame.f_locals.get('self')
+        # type() rather than isinstance(), which would evaluate lazy objects
+        cls = type(obj)
+        if template is None and issubclass(cls, Node) and getattr(obj, 'origin', None):
+            template = '%s:%d' % (obj.origin.template_name, obj.token.lineno)
+        if block is None and issubclass(cls, Block):
+            block = cls.__name__
+        frame = frame.f_back
+
+    if template and block:
+        return '%s in %s' % (block, template)
+    return block or template
+
+
+class QueryLog:
+    """The queries recorded while ``record_queries()`` was active."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __len__(self):
+        return len(self.queries)
+
+    def get_repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Return ``{shape: [sources]}`` for shapes run at least ``threshold`` times."""
+        by_shape = defaultdict(list)
+        for query in self.queries:
+            by_shape[query['shape']].append(query['source'])
+        return {
+            shape: sources for shape, sources in by_shape.items() if len(sources) >= threshold
+        }
+
+    def report(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Describe the repeated query shapes and where they were run from."""
+        lines = []
+        for shape, sources in self.get_repeated(threshold).items():
+            lines.append('%d x %s' % (len(sources), shape))
+            for source in sorted(set(sources), key=str):
+                lines.append('    from %s (%d)' % (
+                    source or 'outside templates', sources.count(source)
+                ))
+        return '\n'.join(lines)
+
+
+def record_query(execute, sql, params, many, context):
+    log = _current_log.get()
+    if log is not None:
+        log.queries.append({'sql': sql, 'shape': get_query_shape(sql), 'source': find_source()})
+    return execute(sql, params, many, context)
+
+
+def install_query_recording(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# Connections opened in any thread from now on
+connection_created.connect(install_query_recording)
+
+
+@contextmanager
+def record_queries():
+    """Record the queries run in the current context, on every database connection."""
+    # Connections opened before this module was loaded
+    for connection in connections.all(initialized_only=True):
+        install_query_recording(connection)
+
+    log = QueryLog()
+    token = _current_log.set(log)
+    try:
+        yield log
+    finally:
+        _current_log.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries, threshold=N_PLUS_ONE_THRESHOLD):
+    """
+    Fail if the code inside runs more than ``max_queries`` queries, or runs
+    any query shape ``threshold`` times or more.
+    """
+    with record_queries() as log:
+        yield log
+
+    problems = []
+    if len(log) > max_queries:
+        problems.append('%d queries run, %d allowed' % (len(log), max_queries))
+    report = log.report(threshold)
+    if report:
+        problems.append('Repeated queries:\n' + report)
+    if problems:
+        raise AssertionError('\n'.join(problems))
+
+
+def is_enabled():
+    return getattr(settings, 'QUERY_BUDGET_ENABLED', settings.DEBUG)
+
+
+class QueryBudgetMiddleware:
+    """
+    Log the requests that repeat query shapes or go over their view's query
+    budget. Only active when ``QUERY_BUDGET_ENABLED`` is true, as finding the
+    source of every query is slow.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not is_enabled():
+            return self.get_response(request)
+
+        with record_queries() as log:
+            response = self.get_response(request)
+        self.check(request, log)
+        return response
+
+    async def __acall__(self, request):
+        if not is_enabled():
+            return await self.get_response(request)
+
+        with record_queries() as log:
+            response = await self.get_response(request)
+        self.check(request, log)
+        return response
+
+    def check(self, request, log):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        threshold = getattr(settings, 'QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)
+        report = log.report(threshold)
+        if report:
+            logger.warning(
+                "Repeated queries in %s %s:\n%s", request.method, request.path, report
+            )
+
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+        if budget is not None and len(log) > budget:
+            logger.warning(
+                "%s %s ran %d queries, over the %d allowed for %s",
+                request.method, request.path, len(log), budget, view_name,
+            )
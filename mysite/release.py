@@ -0,0 +1,77 @@
+"""
+An identifier of the deployed code, for caches and HTTP validators that must
+change when templates or static assets do.
+
+Set ``RELEASE_ID`` (e.g. to the commit being deployed) to choose it.
+Otherwise it is a hash of the project's templates and of the static files
+manifest written by ``collectstatic``, whose entries carry the hashes of the
+assets, so a deploy that changes either changes the release. The hash is
+worked out once per process.
+
+``get_release_time()`` is when a release was first seen by any process
+sharing the cache, which ``Last-Modified`` dates must not be older than.
+"""
+import functools
+import hashlib
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+
+RELEASE_TIME_CACHE_KEY = 'release:first-seen:%s'
+
+# Release times already read by this process, by release
+_release_times = {}
+
+
+def iter_template_files():
+    """Yield the template files of the project and of its own apps."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    directories = [Path(path) for engine in settings.TEMPLATES for path in engine.get('DIRS', [])]
+    directories += [
+        Path(app_config.path) / 'templates' for app_config in apps.get_app_configs()
+        if Path(app_config.path).resolve().is_relative_to(base_dir)
+    ]
+    for directory in directories:
+        if directory.is_dir():
+            yield from sorted(path for path in directory.rglob('*') if path.is_file())
+
+
+@functools.lru_cache(maxsize=None)
+def hash_release():
+    """Return a hash of the templates and the static files manifest."""
+    base_dir = Path(settings.BASE_DIR).resolve()
+    digest = hashlib.sha1()
+    for path in iter_template_files():
+        # Relative, so every checkout of the same code gets the same hash
+        path = path.resolve()
+        name = path.relative_to(base_dir) if path.is_relative_to(base_dir) else path
+        digest.update(str(name).encode('utf-8'))
+        digest.update(path.read_bytes())
+
+    # Only ManifestStaticFilesStorage and the like have a manifest
+    read_manifest = getattr(staticfiles_storage, 'read_manifest', None)
+    manifest = read_manifest() if read_manifest is not None else None
+    if manifest:
+        digest.update(manifest.encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def get_release_id():
+    """Return the identifier of the deployed code."""
+    return getattr(settings, 'RELEASE_ID', None) or hash_release()
+
+
+def get_release_time():
+    """Return the timestamp the deployed release was first seen at."""
+    release_id = get_release_id()
+    if release_id not in _release_times:
+        key = RELEASE_TIME_CACHE_KEY % release_id
+        now = int(time.time())
+        # The first process to see the release records the time for the rest
+        cache.add(key, now, None)
+        _release_times[release_id] = cache.get(key, now)
+    return _release_times[release_id]
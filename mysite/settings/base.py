@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     "wagtail.contrib.forms",
     "wagtail.contrib.redirects",
     "wagtail.contrib.settings",
+    "wagtail.contrib.search_promotions",
     "wagtail.embeds",
     "wagtail.sites",
     "wagtail.users",
@@ -56,10 +57,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its latency covers the other middleware
+    "mysite.metrics.MetricsMiddleware",
+    # Only records queries when QUERY_BUDGET_ENABLED (DEBUG by default)
+    "mysite.query_budget.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "landing.page_cache.PageCacheMiddleware",
+    # After the page cache, so cached pages keep their validators
+    "landing.conditional.ConditionalGetMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.security.SecurityMiddleware",
@@ -81,6 +89,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "landing.context_processors.seo_settings",
             ],
         },
     },
@@ -92,14 +101,20 @@ WSGI_APPLICATION = "mysite.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections are kept open between requests for CONN_MAX_AGE seconds and
+# checked before being reused, so each worker thread reuses one connection
+# instead of connecting on every request. The backend counts connections and
+# checkouts; see mysite/db/metrics.py
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "mysite.db.postgresql",
         "NAME": os.getenv("DB_NAME", "mysite"),
         "USER": os.getenv("DB_USER", "postgres"),
         "PASSWORD": os.getenv("DB_PASSWORD", "q"),
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
@@ -169,18 +184,55 @@ STORAGES = {
 }
 
 
+# Identifies the deployed code in cache keys and HTTP validators, e.g. the
+# commit being deployed. Defaults to a hash of the templates and the static
+# files manifest (see mysite.release)
+RELEASE_ID = os.getenv("RELEASE_ID", "")
+
+
 # Wagtail settings
 
 WAGTAIL_SITE_NAME = "mysite"
 
 # Search
 # https://docs.wagtail.org/en/stable/topics/search/backends.html
+# The PostgreSQL backend keeps a weighted, GIN-indexed tsvector per object,
+# using the boosts in each model's search_fields as weights. Changing
+# SEARCH_CONFIG or the boosts needs a `manage.py update_index`.
 WAGTAILSEARCH_BACKENDS = {
     "default": {
-        "BACKEND": "wagtail.search.backends.database",
+        "BACKEND": "wagtail.search.backends.database.postgres.postgres",
+        "SEARCH_CONFIG": "english",
     }
 }
 
+# Write buffered search query hits from a background thread in each worker
+# (see search/query_log.py). The tests buffer them without one
+SEARCH_QUERY_LOG_BACKGROUND_FLUSH = True
+
+# Full-page cache for anonymous visitors of LandingPage and HomePage
+# See landing/page_cache.py
+PAGE_CACHE_ENABLED = False
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Most queries each view may run per request, by URL name. Enforced by
+# landing/tests/test_query_budget.py, and logged by QueryBudgetMiddleware when
+# QUERY_BUDGET_ENABLED. See mysite/query_budget.py
+QUERY_BUDGETS = {
+    "wagtail_serve": 12,
+    "search": 7,
+    "tag": 6,
+    "sitemap": 2,
+    "sitemap_section": 6,
+}
+
+# Static HTML export of published pages, served by nginx before proxying
+# See landing/prerender.py and nginx/conf.d/default.conf
+STATIC_PAGES_ENABLED = False
+STATIC_PAGES_ROOT = os.path.join(BASE_DIR, "prerendered")
+# Export a site's pages again in a background thread when its SEO settings change
+STATIC_PAGES_EXPORT_IN_BACKGROUND = True
+
 # Base URL to use when referring to full URLs within the Wagtail admin backend -
 # e.g. in notification emails. Don't include '/admin' or a trailing slash
 WAGTAILADMIN_BASE_URL = "http://example.com"
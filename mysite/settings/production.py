@@ -13,27 +13,49 @@ ALLOWED_HOSTS = ['yourdomain.com', 'www.yourdomain.com']
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'mysite.db.postgresql',
         'NAME': os.environ.get('DATABASE_NAME'),
         'USER': os.environ.get('DATABASE_USER'),
         'PASSWORD': os.environ.get('DATABASE_PASSWORD'),
         'HOST': os.environ.get('DATABASE_HOST', 'db'),
         'PORT': os.environ.get('DATABASE_PORT', '5432'),
+        # Keep each worker's connection open between requests
+        'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 # Cache
+# A per-worker LRU in front of Redis, shared by every container. Only keys
+# that can be served a few seconds stale are kept in the worker's memory; see
+# mysite/cache.py
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': os.path.join(BASE_DIR, 'cache'),
-        'TIMEOUT': 60 * 60 * 24,  # 1 day
+        'BACKEND': 'mysite.cache.TwoTierCache',
+        'LOCATION': 'shared',
         'OPTIONS': {
-            'MAX_ENTRIES': 1000
-        }
-    }
+            'LOCAL_MAX_BYTES': 32 * 1024 * 1024,
+            'LOCAL_TIMEOUT': 5,
+            'LOCAL_KEY_PREFIXES': [
+                'pagecache:response:',
+                'landing:block:',
+                'search:',
+            ],
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://redis:6379/0'),
+        'TIMEOUT': 60 * 60 * 24,  # 1 day
+    },
 }
 
+# Full-page cache for anonymous visitors
+PAGE_CACHE_ENABLED = True
+
+# Static HTML export of published pages, shared with the nginx container
+STATIC_PAGES_ENABLED = os.environ.get('STATIC_PAGES_ENABLED', 'true').lower() == 'true'
+
 # Email
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST')
@@ -109,7 +131,11 @@ WAGTAILFRONTENDCACHE = {
 # Wagtail search
 WAGTAILSEARCH_BACKENDS = {
     'default': {
-        'BACKEND': 'wagtail.search.backends.database',
+        'BACKEND': 'wagtail.search.backends.database.postgres.postgres',
+        'SEARCH_CONFIG': 'english',
+        # Build a new index and swap it in, so searches keep working during
+        # update_index
+        'ATOMIC_REBUILD': True,
     }
 }
 
@@ -0,0 +1,225 @@
+import pytest
+from django.core.cache import caches
+from prometheus_client import REGISTRY
+
+from mysite import cache as two_tier
+
+
+@pytest.fixture
+def cache(settings):
+    """A two-tier cache in front of a local memory cache standing in for Redis."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'two-tier': {
+            'BACKEND': 'mysite.cache.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'LOCAL_MAX_BYTES': 1000,
+                'LOCAL_MAX_ENTRY_BYTES': 600,
+                'LOCAL_KEY_PREFIXES': ['local:'],
+            },
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'two-tier-shared',
+        },
+    }
+    two_tier._local_tiers.clear()
+    caches['shared'].clear()
+    yield caches['two-tier']
+    two_tier._local_tiers.clear()
+
+
+def other_worker():
+    """A cache backend using its own local tier, like another worker process would."""
+    two_tier._local_tiers.pop('shared')
+    return two_tier.TwoTierCache('shared', {'OPTIONS': {'LOCAL_KEY_PREFIXES': ['local:']}})
+
+
+def test_reads_are_served_from_the_local_tier(cache):
+    cache.set('local:a', 'value')
+    caches['shared'].delete('local:a')
+
+    assert cache.get('local:a') == 'value'
+    assert cache.get_stats()['local_hits'] == 1
+
+
+def test_shared_hits_are_kept_locally(cache):
+    caches['shared'].set('local:a', 'value')
+
+    assert cache.get('local:a') == 'value'
+    assert cache.get('local:a') == 'value'
+
+    stats = cache.get_stats()
+    assert stats['shared_hits'] == 1
+    assert stats['local_hits'] == 1
+    assert stats['local_hit_ratio'] == 0.5
+    assert stats['shared_hit_ratio'] == 1.0
+
+
+def test_keys_without_a_local_prefix_skip_the_local_tier(cache):
+    cache.set('token', 'old')
+    caches['shared'].set('token', 'new')
+
+    assert cache.get('token') == 'new'
+    assert cache.get_stats()['local_entries'] == 0
+
+
+def test_misses(cache):
+    assert cache.get('local:missing', 'default') == 'default'
+    assert cache.get_many(['local:missing', 'missing']) == {}
+    assert cache.get_stats()['misses'] == 3
+
+
+def test_get_many_combines_tiers(cache):
+    cache.set('local:a', 1)
+    caches['shared'].set('local:b', 2)
+
+    assert cache.get_many(['local:a', 'local:b', 'local:c']) == {'local:a': 1, 'local:b': 2}
+    stats = cache.get_stats()
+    assert (stats['local_hits'], stats['shared_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_least_recently_used_entries_are_evicted_by_size(cache):
+    value = 'x' * 400
+    cache.set('local:a', value)
+    cache.set('local:b', value)
+    cache.get('local:a')
+    cache.set('local:c', value)
+    cache.set('local:d', value)
+
+    local = cache.local
+    assert local.size <= local.max_bytes
+    assert cache.get_stats()['evictions'] == 2
+    assert list(local.entries) == [
+        cache.local_key('local:c', None), cache.local_key('local:d', None)
+    ]
+
+
+def test_large_values_are_only_kept_in_the_shared_tier(cache):
+    cache.set('local:big', 'x' * 800)
+
+    assert cache.get_stats()['local_entries'] == 0
+    assert cache.get('local:big') == 'x' * 800
+
+
+def test_local_entries_expire(cache, monkeypatch):
+    cache.set('local:a', 'old')
+    caches['shared'].set('local:a', 'new')
+    monkeypatch.setattr(two_tier.time, 'monotonic', lambda: 10 ** 9)
+
+    assert cache.get('local:a') == 'new'
+
+
+def test_local_copies_are_private(cache):
+    value = ['a']
+    cache.set('local:a', value)
+    value.append('b')
+
+    cached = cache.get('local:a')
+    cached.append('c')
+    assert cache.get('local:a') == ['a']
+
+
+def test_deletes_reach_other_workers(cache):
+    cache.set('local:a', 'value')
+    cache.get('local:a')
+
+    worker = other_worker()
+    assert worker.get('local:a') == 'value'
+
+    cache.delete('local:a')
+    assert cache.get('local:a') is None
+    # The other worker keeps its copy until it next checks the generation
+    assert worker.get('local:a') == 'value'
+
+    worker.local.next_generation_check = 0
+    assert worker.get('local:a') is None
+
+
+def test_clear_reaches_other_workers(cache):
+    cache.set('local:a', 'value')
+    worker = other_worker()
+    assert worker.get('local:a') == 'value'
+
+    cache.clear()
+    worker.local.next_generation_check = 0
+    assert worker.get('local:a') is None
+
+
+def test_incr_invalidates_local_copies(cache):
+    cache.set('local:count', 1)
+    worker = other_worker()
+    assert worker.get('local:count') == 1
+
+    assert cache.incr('local:count') == 2
+    assert cache.get('local:count') == 2
+    worker.local.next_generation_check = 0
+    assert worker.get('local:count') == 2
+
+
+def test_evicted_generation_empties_the_local_tier(cache):
+    cache.set('local:a', 'old')
+    cache.get('local:a')
+    caches['shared'].set('local:a', 'new')
+    caches['shared'].delete(two_tier.GENERATION_CACHE_KEY)
+
+    cache.local.next_generation_check = 0
+    assert cache.get('local:a') == 'new'
+
+
+def test_add(cache):
+    assert cache.add('local:a', 1)
+    assert not cache.add('local:a', 2)
+    assert cache.get('local:a') == 1
+
+
+def test_zero_timeout_removes_the_local_copy(cache):
+    cache.set('local:a', 'value')
+    cache.set('local:a', 'value', 0)
+
+    assert cache.get('local:a') is None
+    assert cache.get_stats()['local_entries'] == 0
+
+
+def test_reads_are_counted_in_metrics(cache):
+    def count(result):
+        return REGISTRY.get_sample_value(
+            'django_cache_requests_total', {'alias': 'two-tier', 'result': result}
+        ) or 0
+
+    before = {result: count(result) for result in ('local_hit', 'shared_hit', 'miss')}
+    caches['shared'].set('local:a', 'value')
+    cache.get('local:a')
+    cache.get('local:a')
+    cache.get('local:missing')
+
+    assert {result: count(result) - before[result] for result in before} == {
+        'local_hit': 1, 'shared_hit': 1, 'miss': 1,
+    }
+
+
+def test_metrics_are_labelled_by_cache_alias(cache, settings):
+    settings.CACHES = {
+        **settings.CACHES,
+        'sessions': {
+            'BACKEND': 'mysite.cache.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {'LOCAL_KEY_PREFIXES': ['session:']},
+        },
+    }
+
+    def count(alias):
+        return REGISTRY.get_sample_value(
+            'django_cache_requests_total', {'alias': alias, 'result': 'miss'}
+        ) or 0
+
+    before = {alias: count(alias) for alias in ('two-tier', 'sessions')}
+    caches['sessions'].get('session:missing')
+
+    assert caches['sessions'].alias == 'sessions'
+    assert {alias: count(alias) - before[alias] for alias in before} == {
+        'two-tier': 0, 'sessions': 1,
+    }
@@ -0,0 +1,97 @@
+import pytest
+from django.db import connection
+from django.db.backends.sqlite3 import base as sqlite3
+from prometheus_client import REGISTRY
+
+from mysite.db import metrics
+
+
+class DatabaseWrapper(metrics.ConnectionMetricsMixin, sqlite3.DatabaseWrapper):
+    pass
+
+
+@pytest.fixture
+def db_connection(tmp_path):
+    """A persistent connection to a separate, empty database."""
+    settings_dict = dict(
+        connection.settings_dict,
+        NAME=str(tmp_path / 'metrics.sqlite3'),
+        CONN_MAX_AGE=60,
+        CONN_HEALTH_CHECKS=True,
+    )
+    wrapper = DatabaseWrapper(settings_dict, alias='metrics')
+    metrics.reset_stats()
+    yield wrapper
+    wrapper.close()
+    metrics.reset_stats()
+
+
+def run_request(db_connection):
+    """Use the connection the way a request does."""
+    db_connection.close_if_unusable_or_obsolete()
+    with db_connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.execute('SELECT 2')
+    db_connection.close_if_unusable_or_obsolete()
+
+
+@pytest.mark.django_db
+def test_persistent_connection_is_reused(db_connection):
+    for _ in range(3):
+        run_request(db_connection)
+
+    stats = metrics.get_stats()
+    assert stats['connections_opened'] == 1
+    assert stats['open_connections'] == 1
+    assert stats['checkouts'] == 3
+    assert stats['reused_checkouts'] == 2
+    assert stats['connect_seconds'] > 0
+    assert stats['max_connect_seconds'] <= stats['connect_seconds']
+
+
+def get_metric(name, **labels):
+    return REGISTRY.get_sample_value(name, {'alias': 'metrics', **labels}) or 0
+
+
+@pytest.mark.django_db
+def test_connections_are_exported_as_prometheus_metrics(db_connection):
+    checkouts = get_metric('django_db_connection_checkouts_total', reused='true')
+    opened = get_metric('django_db_connections_total', event='opened')
+    connects = get_metric('django_db_connect_duration_seconds_count')
+    open_connections = get_metric('django_db_connections_open')
+
+    for _ in range(3):
+        run_request(db_connection)
+
+    assert get_metric('django_db_connection_checkouts_total', reused='true') - checkouts == 2
+    assert get_metric('django_db_connections_total', event='opened') - opened == 1
+    assert get_metric('django_db_connect_duration_seconds_count') - connects == 1
+    assert get_metric('django_db_connections_open') - open_connections == 1
+
+    db_connection.close()
+    assert get_metric('django_db_connections_open') == open_connections
+
+
+@pytest.mark.django_db
+def test_expired_connection_is_replaced(db_connection):
+    db_connection.settings_dict['CONN_MAX_AGE'] = 0
+    for _ in range(3):
+        run_request(db_connection)
+
+    stats = metrics.get_stats()
+    assert stats['connections_opened'] == 3
+    assert stats['connections_closed'] == 3
+    assert stats['open_connections'] == 0
+    assert stats['reused_checkouts'] == 0
+
+
+@pytest.mark.django_db
+def test_connection_failing_health_check_is_replaced(db_connection, monkeypatch):
+    run_request(db_connection)
+    monkeypatch.setattr(DatabaseWrapper, 'is_usable', lambda self: False)
+    run_request(db_connection)
+
+    stats = metrics.get_stats()
+    assert stats['connections_opened'] == 2
+    assert stats['connections_closed'] == 1
+    assert stats['open_connections'] == 1
@@ -1,6 +1,11 @@
+import threading
+import time
+
 import pytest
 from django.urls import reverse
 
+from mysite import health
+
 
 @pytest.mark.django_db
 def test_health_check(client):
@@ -9,3 +14,92 @@ def test_health_check(client):
     response = client.get(url)
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+@pytest.fixture
+def probes(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    health.reset_probes()
+    yield health.PROBES
+    health.reset_probes()
+
+
+def replace_check(monkeypatch, name, check):
+    monkeypatch.setattr(health.PROBES[name], 'check', check)
+
+
+@pytest.mark.django_db
+def test_liveness(client):
+    response = client.get(reverse("health_live"))
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.django_db
+def test_readiness_probes_dependencies(client, probes):
+    response = client.get(reverse("health_ready"))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ok"
+    assert set(body["checks"]) == {"database", "cache", "storage"}
+    for check in body["checks"].values():
+        assert check["status"] == "ok"
+        assert check["latency_ms"] >= 0
+    assert "no-cache" in response["Cache-Control"]
+
+
+@pytest.mark.django_db
+def test_readiness_fails_with_a_dependency(client, probes, monkeypatch):
+    def check_cache():
+        raise ConnectionError("Connection refused")
+
+    replace_check(monkeypatch, "cache", check_cache)
+    response = client.get(reverse("health_ready"))
+
+    assert response.status_code == 503
+    body = response.json()
+    assert body["status"] == "error"
+    assert body["checks"]["cache"]["status"] == "error"
+    assert body["checks"]["cache"]["error"] == "Connection refused"
+    assert body["checks"]["database"]["status"] == "ok"
+
+
+@pytest.mark.django_db
+def test_readiness_times_out_hung_probes(client, probes, monkeypatch, settings):
+    settings.HEALTH_CHECK_TIMEOUT = 0.1
+    release = threading.Event()
+    calls = []
+
+    def check_storage():
+        calls.append(1)
+        release.wait(5)
+
+    replace_check(monkeypatch, "storage", check_storage)
+    try:
+        start = time.monotonic()
+        response = client.get(reverse("health_ready"))
+        assert time.monotonic() - start < 1
+        assert response.status_code == 503
+        assert response.json()["checks"]["storage"]["error"] == "No answer within 0.1s"
+
+        # The hung probe is waited on again rather than started a second time
+        assert client.get(reverse("health_ready")).status_code == 503
+        assert len(calls) == 1
+    finally:
+        release.set()
+
+
+@pytest.mark.django_db
+def test_probe_results_are_reused(client, probes, monkeypatch, settings):
+    settings.HEALTH_CHECK_CACHE_SECONDS = 60
+    calls = []
+    replace_check(monkeypatch, "cache", lambda: calls.append(1))
+
+    for _ in range(5):
+        assert client.get(reverse("health_ready")).status_code == 200
+    assert len(calls) == 1
+
+    settings.HEALTH_CHECK_CACHE_SECONDS = 0
+    client.get(reverse("health_ready"))
+    assert len(calls) == 2
@@ -0,0 +1,78 @@
+import pytest
+from django.test.utils import override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from wagtail.models import Site
+
+from landing.models import LandingPage
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.fixture
+def landing_page():
+    landing_page = LandingPage(title="Measured Page", slug="measured-page")
+    Site.objects.get(is_default_site=True).root_page.add_child(instance=landing_page)
+    landing_page.save_revision().publish()
+    return landing_page
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(client):
+    client.get(reverse("search"), {"query": "anything"})
+    response = client.get(reverse("metrics"))
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain")
+    content = response.content.decode("utf-8")
+    assert 'django_view_duration_seconds_count{view="search"}' in content
+    assert "django_db_query_duration_seconds_count" in content
+
+
+@override_settings(METRICS_ALLOWED_NETWORKS=["10.0.0.0/8"])
+@pytest.mark.django_db
+def test_metrics_endpoint_is_internal_only(client):
+    assert client.get(reverse("metrics"), REMOTE_ADDR="203.0.113.7").status_code == 404
+    assert client.get(reverse("metrics"), REMOTE_ADDR="127.0.0.1").status_code == 404
+    assert client.get(reverse("metrics"), REMOTE_ADDR="10.1.2.3").status_code == 200
+
+
+@pytest.mark.django_db
+def test_view_latency_queries_and_template_rendering(client):
+    views = sample("django_view_duration_seconds_count", view="search")
+    queries = sample("django_db_query_duration_seconds_count", alias="default")
+    renders = sample(
+        "django_template_render_duration_seconds_count", template="search/search.html"
+    )
+
+    client.get(reverse("search"), {"query": "anything"})
+
+    assert sample("django_view_duration_seconds_count", view="search") == views + 1
+    assert sample("django_db_query_duration_seconds_count", alias="default") > queries
+    assert sample(
+        "django_template_render_duration_seconds_count", template="search/search.html"
+    ) == renders + 1
+
+
+@pytest.mark.django_db
+def test_page_latency_by_page_type(client, landing_page):
+    pages = sample("wagtail_page_duration_seconds_count", page_type="landing.LandingPage")
+
+    assert client.get(landing_page.url).status_code == 200
+
+    assert sample(
+        "wagtail_page_duration_seconds_count", page_type="landing.LandingPage"
+    ) == pages + 1
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+@pytest.mark.django_db
+def test_page_cache_hits_are_labelled(client, landing_page):
+    hits = sample("django_view_duration_seconds_count", view="page_cache")
+
+    client.get(landing_page.url)
+    client.get(landing_page.url)
+
+    assert sample("django_view_duration_seconds_count", view="page_cache") == hits + 1
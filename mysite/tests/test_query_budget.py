@@ -0,0 +1,75 @@
+import logging
+
+import pytest
+from django.template import engines
+from django.test.utils import override_settings
+from django.urls import reverse
+from wagtail.models import Page
+
+from mysite.query_budget import get_query_shape, query_budget, record_queries
+
+
+def test_get_query_shape():
+    assert get_query_shape(
+        'SELECT "id"  FROM "page"\n WHERE "id" IN (%s, %s, %s) AND "slug" = \'home\' LIMIT 21'
+    ) == 'SELECT "id" FROM "page" WHERE "id" IN (...) AND "slug" = ? LIMIT ?'
+    assert get_query_shape('SELECT 1 WHERE "id" IN (%s)') == get_query_shape(
+        'SELECT 2 WHERE "id" IN (%s, %s)'
+    )
+
+
+@pytest.mark.django_db
+def test_repeated_queries_are_traced_to_the_template():
+    template = engines['django'].from_string(
+        "{% for id in ids %}{{ pages.get.title }}{% endfor %}",
+    )
+    template.template.origin.template_name = 'loop.html'
+
+    class Pages:
+        def get(self):
+            return Page.objects.get(depth=1)
+
+    with record_queries() as log:
+        template.render({'ids': range(6), 'pages': Pages()})
+
+    assert len(log) == 6
+    [(shape, sources)] = log.get_repeated().items()
+    assert shape.startswith('SELECT')
+    assert sources == ['loop.html:1'] * 6
+    assert '6 x SELECT' in log.report()
+
+
+@pytest.mark.django_db
+def test_query_budget_fails_over_budget_or_on_repeats():
+    with query_budget(2):
+        Page.objects.count()
+
+    with pytest.raises(AssertionError, match='3 queries run, 2 allowed'):
+        with query_budget(2, threshold=4):
+            for _ in range(3):
+                Page.objects.count()
+
+    with pytest.raises(AssertionError, match='Repeated queries:\n3 x SELECT'):
+        with query_budget(10, threshold=3):
+            for _ in range(3):
+                Page.objects.count()
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGETS={'search': 1})
+@pytest.mark.django_db
+def test_middleware_logs_views_over_budget(client, caplog):
+    with caplog.at_level(logging.WARNING, logger='mysite.query_budget'):
+        client.get(reverse('search'), {'query': 'anything'})
+
+    assert any(
+        'over the 1 allowed for search' in record.getMessage() for record in caplog.records
+    )
+
+
+@override_settings(QUERY_BUDGETS={'search': 1})
+@pytest.mark.django_db
+def test_middleware_is_off_by_default_outside_debug(client, caplog):
+    with caplog.at_level(logging.WARNING, logger='mysite.query_budget'):
+        client.get(reverse('search'), {'query': 'anything'})
+
+    assert not caplog.records
@@ -1,28 +1,32 @@
 from django.conf import settings
 from django.urls import include, path
 from django.contrib import admin
-from django.http import JsonResponse
 
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail import urls as wagtail_urls
 from wagtail.documents import urls as wagtaildocs_urls
 
 from search import views as search_views
-from landing.views import RobotsView, SitemapView, manifest_view
-def health_check(request):
-    """Health check endpoint for monitoring."""
-    return JsonResponse({"status": "ok"})
+from landing.views import RobotsView, SitemapIndexView, SitemapView, TagView, manifest_view
+from mysite import health
+from mysite.metrics import metrics_view
 
 urlpatterns = [
     path("django-admin/", admin.site.urls),
     path("admin/", include(wagtailadmin_urls)),
     path("documents/", include(wagtaildocs_urls)),
     path("search/", search_views.search, name="search"),
-    path("healthz/", health_check, name="health_check"),
+    path("search/autocomplete/", search_views.autocomplete, name="search_autocomplete"),
+    path("healthz/", health.liveness, name="health_check"),
+    path("healthz/live/", health.liveness, name="health_live"),
+    path("healthz/ready/", health.readiness, name="health_ready"),
+    path("metrics", metrics_view, name="metrics"),
      # SEO URLs
     path('robots.txt', RobotsView.as_view(), name='robots'),
-    path('sitemap.xml', SitemapView.as_view(), name='sitemap'),
+    path('sitemap.xml', SitemapIndexView.as_view(), name='sitemap'),
+    path('sitemap-<int:section>.xml', SitemapView.as_view(), name='sitemap_section'),
     path('manifest.json', manifest_view, name='manifest'),
+    path('tags/<slug:slug>/', TagView.as_view(), name='tag'),
 ]
 
 
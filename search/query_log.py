@@ -0,0 +1,154 @@
+"""
+Buffered logging of search query hits for the "Promoted search results"
+module (``wagtail.contrib.search_promotions``).
+
+``Query.get(query_string).add_hit()`` runs a get-or-create and an update for
+every search. Instead, ``record_hit`` only counts the hit in a per-process
+buffer, keyed by normalized query string and date. When the
+``SEARCH_QUERY_LOG_BACKGROUND_FLUSH`` setting is true, a background thread
+writes the buffered counts every ``SEARCH_QUERY_LOG_FLUSH_INTERVAL`` seconds,
+or as soon as ``SEARCH_QUERY_LOG_BATCH_SIZE`` hits are waiting, using a fixed
+number of queries per flush whatever the number of distinct queries.
+Otherwise nothing is written until ``flush()`` is called; the tests swap in
+such a buffer, so no test depends on a thread writing outside its
+transaction.
+
+Hits still in the buffer when a process exits are lost, so popular-query
+figures may trail the real traffic by one flush interval.
+"""
+import logging
+import os
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from wagtail.contrib.search_promotions.models import Query, QueryDailyHits
+from wagtail.search.utils import normalise_query_string
+
+logger = logging.getLogger(__name__)
+
+# Seconds between flushes of the buffered hits
+SEARCH_QUERY_LOG_FLUSH_INTERVAL = 10
+
+# Number of buffered hits that triggers a flush before the interval is up
+SEARCH_QUERY_LOG_BATCH_SIZE = 1000
+
+
+def write_hits(hits):
+    """
+    Add hit counts to the database. ``hits`` maps ``(query string, date)``
+    to the number of hits, with query strings already normalized.
+    """
+    query_strings = {query_string for query_string, date in hits}
+    with transaction.atomic():
+        Query.objects.bulk_create(
+            [Query(query_string=query_string) for query_string in query_strings],
+            ignore_conflicts=True,
+        )
+        query_ids = dict(
+            Query.objects.filter(query_string__in=query_strings).values_list('query_string', 'id')
+        )
+
+        QueryDailyHits.objects.bulk_create(
+            [
+                QueryDailyHits(query_id=query_ids[query_string], date=date)
+                for query_string, date in hits
+            ],
+            ignore_conflicts=True,
+        )
+        counts = {
+            (query_ids[query_string], date): count for (query_string, date), count in hits.items()
+        }
+        daily_hits = QueryDailyHits.objects.filter(
+            query_id__in=query_ids.values(), date__in={date for query_string, date in hits}
+        ).values_list('id', 'query_id', 'date')
+        increments = {
+            daily_hits_id: counts[query_id, date]
+            for daily_hits_id, query_id, date in daily_hits
+            if (query_id, date) in counts
+        }
+
+        # Add every count in a single UPDATE
+        QueryDailyHits.objects.filter(id__in=increments).update(
+            hits=models.F('hits') + models.Case(
+                *[
+                    models.When(id=daily_hits_id, then=count)
+                    for daily_hits_id, count in increments.items()
+                ],
+                default=0,
+            )
+        )
+
+
+class QueryHitBuffer:
+    """
+    Counts search query hits in memory and writes them in bulk. With
+    ``background=False`` nothing is written until ``flush()`` is called, and
+    by default the ``SEARCH_QUERY_LOG_BACKGROUND_FLUSH`` setting decides.
+    """
+
+    def __init__(self, background=None):
+        self.background = background
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.pending = 0
+        self.wake = threading.Event()
+        self.pid = None
+
+    def add(self, query_string, date=None):
+        key = (normalise_query_string(query_string), date or timezone.localdate())
+        with self.lock:
+            self.hits[key] += 1
+            self.pending += 1
+            pending = self.pending
+            if self.flushes_in_background():
+                self.ensure_flusher()
+
+        batch_size = getattr(settings, 'SEARCH_QUERY_LOG_BATCH_SIZE', SEARCH_QUERY_LOG_BATCH_SIZE)
+        if pending >= batch_size:
+            self.wake.set()
+
+    def flushes_in_background(self):
+        if self.background is None:
+            return getattr(settings, 'SEARCH_QUERY_LOG_BACKGROUND_FLUSH', False)
+        return self.background
+
+    def ensure_flusher(self):
+        # Threads don't survive a fork, so each worker process starts its own
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        interval = getattr(
+            settings, 'SEARCH_QUERY_LOG_FLUSH_INTERVAL', SEARCH_QUERY_LOG_FLUSH_INTERVAL
+        )
+        while True:
+            self.wake.wait(interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to write search query hits")
+            finally:
+                connection.close()
+
+    def flush(self):
+        """Write the buffered hits to the database. Return how many were written."""
+        with self.lock:
+            hits, self.hits = self.hits, Counter()
+            pending, self.pending = self.pending, 0
+        if hits:
+            write_hits(hits)
+        return pending
+
+
+query_hits = QueryHitBuffer()
+
+
+def record_hit(query_string):
+    """Count a hit for a search query, to be written on the next flush."""
+    query_hits.add(query_string)
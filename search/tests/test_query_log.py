@@ -0,0 +1,58 @@
+import datetime
+
+import pytest
+from django.urls import reverse
+from wagtail.contrib.search_promotions.models import Query, QueryDailyHits
+
+from search import query_log
+
+
+@pytest.mark.django_db
+def test_search_buffers_hits(client, query_hits, django_assert_num_queries):
+    client.get(reverse("search"), {"query": "Pricing"})
+    client.get(reverse("search"), {"query": "  pricing "})
+    client.get(reverse("search"), {"query": "security"})
+
+    assert not Query.objects.exists()
+
+    with django_assert_num_queries(7):
+        # Savepoint and release, two bulk inserts, two lookups and the update
+        assert query_hits.flush() == 3
+
+    assert Query.get("pricing").hits == 2
+    assert Query.get("security").hits == 1
+
+
+@pytest.mark.django_db
+def test_flush_adds_to_existing_hits(query_hits):
+    today = datetime.date(2026, 1, 2)
+    Query.get("pricing").add_hit(date=today)
+
+    query_hits.add("pricing", date=today)
+    query_hits.add("Pricing", date=today)
+    query_hits.add("pricing", date=today + datetime.timedelta(days=1))
+    query_hits.flush()
+
+    daily_hits = dict(QueryDailyHits.objects.values_list("date", "hits"))
+    assert daily_hits == {today: 3, today + datetime.timedelta(days=1): 1}
+    assert query_hits.flush() == 0
+
+
+@pytest.mark.django_db
+def test_batch_size_wakes_flusher(query_hits, settings):
+    settings.SEARCH_QUERY_LOG_BATCH_SIZE = 2
+
+    query_hits.add("pricing")
+    assert not query_hits.wake.is_set()
+    query_hits.add("pricing")
+    assert query_hits.wake.is_set()
+
+
+def test_background_flush_is_opt_in(settings):
+    buffer = query_log.QueryHitBuffer()
+    del settings.SEARCH_QUERY_LOG_BACKGROUND_FLUSH
+    assert not buffer.flushes_in_background()
+
+    settings.SEARCH_QUERY_LOG_BACKGROUND_FLUSH = True
+    assert buffer.flushes_in_background()
+    assert not query_log.QueryHitBuffer(background=False).flushes_in_background()
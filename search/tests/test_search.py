@@ -0,0 +1,127 @@
+import pytest
+from django.urls import reverse
+from wagtail.models import Page, Site
+
+from search import views
+
+
+@pytest.fixture
+def pages():
+    root_page = Site.objects.get(is_default_site=True).root_page
+    pages = []
+    for i in range(25):
+        page = Page(title="Searchable page %d" % i, slug="searchable-%d" % i)
+        root_page.add_child(instance=page)
+        pages.append(page)
+    return pages
+
+
+def test_normalize_query():
+    assert views.normalize_query("  Landing   PAGES ") == "landing pages"
+
+
+@pytest.mark.django_db
+def test_search_paginates_cached_results(client, pages):
+    response = client.get(reverse("search"), {"query": "Searchable"})
+
+    assert response.status_code == 200
+    results = response.context["search_results"]
+    assert len(results) == views.SEARCH_RESULTS_PER_PAGE
+    assert results.has_next()
+    assert all(isinstance(result, Page) for result in results)
+
+    assert not response.context["results_capped"]
+    assert "best" not in response.content.decode("utf-8")
+
+    site = Site.objects.get(is_default_site=True)
+    result_ids, capped = views.get_result_ids(site, "searchable")
+    assert sorted(result_ids) == sorted(page.id for page in pages)
+    assert not capped
+
+
+@pytest.mark.django_db
+def test_search_says_when_results_are_capped(client, pages, settings):
+    settings.SEARCH_MAX_RESULTS = 20
+
+    response = client.get(reverse("search"), {"query": "Searchable"})
+
+    assert response.context["results_capped"]
+    assert response.context["search_results"].paginator.count == 20
+    assert "Showing the best 20 matches only" in response.content.decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_search_next_page_does_not_rerun_query(client, pages, django_assert_num_queries):
+    client.get(reverse("search"), {"query": "Searchable"})
+
+    # The site lookup and fetching the pages shown, but no search or COUNT
+    with django_assert_num_queries(2):
+        response = client.get(reverse("search"), {"query": " searchable ", "page": 3})
+
+    results = response.context["search_results"]
+    assert len(results) == 5
+    assert not results.has_next()
+    assert response.context["search_query"] == " searchable "
+
+
+@pytest.mark.django_db
+def test_search_skips_unpublished_cached_results(client, pages):
+    client.get(reverse("search"), {"query": "Searchable"})
+    Page.objects.filter(id__in=[page.id for page in pages]).update(live=False)
+
+    response = client.get(reverse("search"), {"query": "Searchable"})
+
+    assert list(response.context["search_results"]) == []
+
+
+@pytest.mark.django_db
+def test_autocomplete_matches_prefixes(client, pages):
+    response = client.get(reverse("search_autocomplete"), {"q": "Searcha"})
+
+    assert response.status_code == 200
+    assert "public" in response["Cache-Control"]
+    data = response.json()
+    assert data["query"] == "searcha"
+    assert len(data["results"]) == views.AUTOCOMPLETE_MAX_RESULTS
+    assert data["results"][0]["title"].startswith("Searchable page")
+    assert data["results"][0]["url"].startswith("/searchable-")
+
+
+@pytest.mark.django_db
+def test_autocomplete_ignores_short_queries(client, pages, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        response = client.get(reverse("search_autocomplete"), {"q": " s "})
+
+    assert response.json() == {"query": "s", "results": []}
+
+
+@pytest.mark.django_db
+def test_autocomplete_is_cached(client, pages, django_assert_num_queries):
+    client.get(reverse("search_autocomplete"), {"q": "searcha"})
+
+    with django_assert_num_queries(0):
+        response = client.get(reverse("search_autocomplete"), {"q": "Searcha"})
+
+    assert len(response.json()["results"]) == views.AUTOCOMPLETE_MAX_RESULTS
+
+
+@pytest.mark.django_db
+def test_search_facets_and_tag_filter(client):
+    from landing.models import LandingPage
+
+    root_page = Site.objects.get(is_default_site=True).root_page
+    for i in range(3):
+        page = LandingPage(title="Faceted page %d" % i, slug="faceted-%d" % i)
+        root_page.add_child(instance=page)
+        page.tags.add("news" if i else "events")
+        page.save_revision().publish()
+
+    response = client.get(reverse("search"), {"query": "Faceted"})
+    assert response.context["facets"] == [
+        {"name": "news", "slug": "news", "count": 2},
+        {"name": "events", "slug": "events", "count": 1},
+    ]
+
+    response = client.get(reverse("search"), {"query": "Faceted", "tag": "events"})
+    assert [page.title for page in response.context["search_results"]] == ["Faceted page 0"]
+    assert len(response.context["facets"]) == 2
@@ -1,34 +1,143 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.http import JsonResponse
 from django.template.response import TemplateResponse
+from django.utils.cache import patch_cache_control
+
+from wagtail.models import Page, Site
+
+from landing import tags
+
+from . import query_log
+
+SEARCH_RESULTS_PER_PAGE = 10
+
+# Maximum number of ranked results kept for a query
+SEARCH_MAX_RESULTS = 500
+
+# How long the ranked results of a query are cached, in seconds
+SEARCH_CACHE_TIMEOUT = 60 * 5
+
+# Autocomplete suggestions returned per query, and the shortest prefix looked up
+AUTOCOMPLETE_MAX_RESULTS = 8
+AUTOCOMPLETE_MIN_LENGTH = 2
+
+# How long browsers and proxies may reuse an autocomplete response, in seconds
+AUTOCOMPLETE_MAX_AGE = 60
+
+
+def normalize_query(search_query):
+    """Collapse whitespace and case, so equivalent queries share a cache entry."""
+    return " ".join(search_query.lower().split())
+
 
-from wagtail.models import Page
+def get_cache_key(site, search_query, prefix="search:results"):
+    query_hash = hashlib.sha1(search_query.encode("utf-8")).hexdigest()
+    return "%s:%d:%s" % (prefix, site.id if site else 0, query_hash)
 
-# To enable logging of search queries for use with the "Promoted search results" module
-# <https://docs.wagtail.org/en/stable/reference/contrib/searchpromotions.html>
-# uncomment the following line and the lines indicated in the search function
-# (after adding wagtail.contrib.search_promotions to INSTALLED_APPS):
 
-# from wagtail.contrib.search_promotions.models import Query
+def get_result_ids(site, search_query):
+    """
+    Return the ids of the live pages matching a query, best match first, and
+    whether there were more matches than the ``SEARCH_MAX_RESULTS`` kept.
+
+    The ranking query runs once per site and normalized query; later pages of
+    results (and repeated searches) are sliced from the cached ids.
+    """
+    max_results = getattr(settings, "SEARCH_MAX_RESULTS", SEARCH_MAX_RESULTS)
+    cache_key = get_cache_key(site, search_query)
+    result_ids = cache.get(cache_key)
+    if result_ids is None:
+        pages = Page.objects.live()
+        if site is not None:
+            pages = pages.in_site(site)
+        # One extra result tells whether any were left out, without a COUNT
+        results = pages.only("id").search(search_query)[:max_results + 1]
+        result_ids = [page.id for page in results]
+        timeout = getattr(settings, "SEARCH_CACHE_TIMEOUT", SEARCH_CACHE_TIMEOUT)
+        cache.set(cache_key, result_ids, timeout)
+    return result_ids[:max_results], len(result_ids) > max_results
+
+
+def get_suggestions(request, search_query):
+    """
+    Return the title and URL of the live pages whose title, description or
+    tags start with the words of a query, best match first.
+
+    Suggestions are cached by host rather than by site, so a cached response
+    doesn't even need the site lookup.
+    """
+    query_hash = hashlib.sha1(search_query.encode("utf-8")).hexdigest()
+    cache_key = "search:autocomplete:%s:%s" % (request.get_host(), query_hash)
+    suggestions = cache.get(cache_key)
+    if suggestions is None:
+        site = Site.find_for_request(request)
+        pages = Page.objects.live()
+        if site is not None:
+            pages = pages.in_site(site)
+        results = pages.autocomplete(search_query)[:AUTOCOMPLETE_MAX_RESULTS]
+        suggestions = [
+            {"title": page.title, "url": page.get_url(request=request)}
+            for page in results
+        ]
+        timeout = getattr(settings, "SEARCH_CACHE_TIMEOUT", SEARCH_CACHE_TIMEOUT)
+        cache.set(cache_key, suggestions, timeout)
+    return suggestions
+
+
+def autocomplete(request):
+    """Return search-as-you-type suggestions for the ``q`` parameter as JSON."""
+    search_query = normalize_query(request.GET.get("q", ""))
+    if len(search_query) < AUTOCOMPLETE_MIN_LENGTH:
+        suggestions = []
+    else:
+        suggestions = get_suggestions(request, search_query)
+
+    response = JsonResponse({"query": search_query, "results": suggestions})
+    patch_cache_control(response, public=True, max_age=AUTOCOMPLETE_MAX_AGE)
+    return response
+
+
+def get_facets(site, search_query, result_ids):
+    """Return the tags of a query's results with their counts, cached like the results."""
+    cache_key = get_cache_key(site, search_query, prefix="search:facets")
+    facets = cache.get(cache_key)
+    if facets is None:
+        facets = tags.get_facets(result_ids)
+        timeout = getattr(settings, "SEARCH_CACHE_TIMEOUT", SEARCH_CACHE_TIMEOUT)
+        cache.set(cache_key, facets, timeout)
+    return facets
 
 
 def search(request):
     search_query = request.GET.get("query", None)
+    search_tag = request.GET.get("tag", None)
     page = request.GET.get("page", 1)
 
     # Search
+    facets = []
+    results_capped = False
     if search_query:
-        search_results = Page.objects.live().search(search_query)
-
-        # To log this query for use with the "Promoted search results" module:
+        site = Site.find_for_request(request)
+        normalized_query = normalize_query(search_query)
+        result_ids, results_capped = get_result_ids(site, normalized_query)
+        facets = get_facets(site, normalized_query, result_ids)
+        if search_tag:
+            result_ids = tags.filter_by_tag(result_ids, search_tag)
 
-        # query = Query.get(search_query)
-        # query.add_hit()
+        # Log the query for the "Promoted search results" module
+        # <https://docs.wagtail.org/en/stable/reference/contrib/searchpromotions.html>
+        query_log.record_hit(search_query)
 
     else:
-        search_results = Page.objects.none()
+        result_ids = []
 
-    # Pagination
-    paginator = Paginator(search_results, 10)
+    # Pagination. Paginating the cached ids needs no COUNT query, and only
+    # the pages shown are fetched.
+    paginator = Paginator(result_ids, SEARCH_RESULTS_PER_PAGE)
     try:
         search_results = paginator.page(page)
     except PageNotAnInteger:
@@ -36,11 +145,21 @@ def search(request):
     except EmptyPage:
         search_results = paginator.page(paginator.num_pages)
 
+    # Pages unpublished since the results were cached are left out
+    pages = Page.objects.live().in_bulk(search_results.object_list)
+    search_results.object_list = [
+        pages[page_id] for page_id in search_results.object_list if page_id in pages
+    ]
+
     return TemplateResponse(
         request,
         "search/search.html",
         {
             "search_query": search_query,
+            "search_tag": search_tag,
             "search_results": search_results,
+            # Only the best matches are kept, so say when some were left out
+            "results_capped": results_capped,
+            "facets": facets,
         },
     )